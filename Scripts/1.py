@@ -1,107 +1,143 @@
+import os
+import sys
 import pygame
 from pygame.locals import *
 from OpenGL.GL import *
-from OpenGL.GLUT import *
-from OpenGL.GLU import *
-import time
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from graphics.batch import PrimitiveBatch
+from graphics.plot import Series, TimePlot, sampled
+from graphics.text import TextRenderer
+from physics import integrators, motion
+from physics.clock import SimulationClock
+from scene_host import run_scene
 
 # Constants
 WINDOW_WIDTH = 800
 WINDOW_HEIGHT = 600
+WINDOW_SIZE = (WINDOW_WIDTH, WINDOW_HEIGHT)
 CONSTANT_VELOCITY = 0.01
 ACCELERATION = 0.0001
 VELOCITY_STEP = 0.001
 ACCELERATION_STEP = 0.00001
-
-# Initial positions
-x1 = -1.0
-x2 = -1.0
-velocity1 = CONSTANT_VELOCITY
-acceleration2 = ACCELERATION
-velocity2 = 0.0
+FRAME_TIME = 1 / 60  # Velocities and accelerations above are per frame of this length
+
+# Red moves at a constant velocity, blue accelerates from rest and
+# starts from rest again every time it wraps around
+RED, BLUE = 0, 1
+bodies = motion.initial_state(x=[-1.0, -1.0],
+                              velocity=[CONSTANT_VELOCITY, 0.0],
+                              acceleration=[0.0, ACCELERATION])
+RESET_ON_WRAP = np.array([False, True])
+previous = bodies.copy()
+
+# Physics runs in fixed steps of half a frame, independent of the display rate
+sim_clock = SimulationClock(dt=FRAME_TIME / 2)
+integrator = integrators.configured("semi_implicit_euler")  # I cycles through physics/integrators.py
+text_renderer = None
+controls = None
+shapes = PrimitiveBatch()
+
+# Velocity history with one sample per physics step; G shows or hides the
+# plot and H switches between the last 10 seconds and all of it
+PLOT_SPAN = 10.0
+velocity_plot = None
+velocities = [Series(dt=sim_clock.dt), Series(dt=sim_clock.dt)]
+show_plot = True
+
+def sample_velocities(state):
+    velocities[RED].append(state[RED, motion.VELOCITY])
+    velocities[BLUE].append(state[BLUE, motion.VELOCITY])
 
 def draw_text(position, text_string):
-    font = pygame.font.Font(None, 24)
-    text_surface = font.render(text_string, True, (255, 255, 255, 255), (0, 0, 0, 255))
-    text_data = pygame.image.tostring(text_surface, "RGBA", True)
-    glWindowPos2d(*position)
-    glDrawPixels(text_surface.get_width(), text_surface.get_height(), GL_RGBA, GL_UNSIGNED_BYTE, text_data)
+    text_renderer.draw(position[0], position[1], text_string)
 
 def draw_rect(x, y):
-    glBegin(GL_QUADS)
-    glVertex2f(x, y)
-    glVertex2f(x + 0.1, y)
-    glVertex2f(x + 0.1, y + 0.1)
-    glVertex2f(x, y + 0.1)
-    glEnd()
+    shapes.rect(x, y, 0.1, 0.1)
+
+def init():
+    global text_renderer, controls, velocity_plot
+    text_renderer = TextRenderer(WINDOW_SIZE)
+    velocity_plot = TimePlot(WINDOW_SIZE, (10, 10, 420, 150), "Velocity (per frame)", span=PLOT_SPAN)
+    velocity_plot.add(velocities[RED], (1.0, 0.3, 0.3))
+    velocity_plot.add(velocities[BLUE], (0.4, 0.5, 1.0))
+
+    # The control help never changes, so it is uploaded once
+    controls = text_renderer.block([
+        (10, WINDOW_HEIGHT - 30, "Controls:"),
+        (10, WINDOW_HEIGHT - 60, "UP: Increase velocity of Red rectangle"),
+        (10, WINDOW_HEIGHT - 90, "DOWN: Decrease velocity of Red rectangle"),
+        (10, WINDOW_HEIGHT - 120, "RIGHT: Increase acceleration of Blue rectangle"),
+        (10, WINDOW_HEIGHT - 150, "LEFT: Decrease acceleration of Blue rectangle"),
+        (10, WINDOW_HEIGHT - 180, "G: Show/hide velocity plot, H: Last 10 s/all history"),
+        (10, WINDOW_HEIGHT - 210, "I: Next integrator"),
+    ])
+    sim_clock.reset()
+
+def handle_event(event):
+    global show_plot, integrator
+    if event.type == KEYDOWN:
+        if event.key == K_g:
+            show_plot = not show_plot
+        elif event.key == K_i:
+            integrator = integrators.next_after(integrator)
+        elif event.key == K_h:
+            velocity_plot.span = None if velocity_plot.span else PLOT_SPAN
+        elif event.key == K_UP:
+            bodies[RED, motion.VELOCITY] += VELOCITY_STEP
+        elif event.key == K_DOWN:
+            bodies[RED, motion.VELOCITY] = max(0, bodies[RED, motion.VELOCITY] - VELOCITY_STEP)
+        elif event.key == K_RIGHT:
+            bodies[BLUE, motion.ACCELERATION] += ACCELERATION_STEP
+        elif event.key == K_LEFT:
+            bodies[BLUE, motion.ACCELERATION] = max(0, bodies[BLUE, motion.ACCELERATION] - ACCELERATION_STEP)
+
+def update():
+    # Update positions with the steps that are due
+    sim_clock.step(sampled(motion.step, sample_velocities), bodies, previous,
+                   dt=sim_clock.dt / FRAME_TIME, reset_on_wrap=RESET_ON_WRAP, integrator=integrator)
+
+def render():
+    glMatrixMode(GL_PROJECTION)
+    glLoadIdentity()
+    glOrtho(-1, 1, -1, 1, -1, 1)
+    glMatrixMode(GL_MODELVIEW)
+    glLoadIdentity()
+    glClear(GL_COLOR_BUFFER_BIT | GL_DEPTH_BUFFER_BIT)
+
+    # Draw between the last two steps, except for bodies that just wrapped around
+    x = sim_clock.interpolate(previous[:, motion.X], bodies[:, motion.X])
+    x = np.where(previous[:, motion.X] > bodies[:, motion.X], bodies[:, motion.X], x)
+
+    # Draw objects
+    shapes.color(1, 0, 0)  # Red
+    draw_rect(x[RED], 0.3)
+    shapes.color(0, 0, 1)  # Blue
+    draw_rect(x[BLUE], -0.3)
+    shapes.flush()
+
+    # Display controls and velocities
+    text_renderer.draw_block(controls)
+    if show_plot:
+        velocity_plot.draw(text_renderer)
+
+    # Display velocities at the bottom right corner
+    velocity_texts = [
+        f"Red Rectangle Velocity: {bodies[RED, motion.VELOCITY]:.4f}",
+        f"Blue Rectangle Velocity: {bodies[BLUE, motion.VELOCITY]:.4f}",
+        f"Blue Rectangle Acceleration: {bodies[BLUE, motion.ACCELERATION]:.6f}",
+        f"Integrator: {integrators.get(integrator).label}",
+    ]
+    text_width = max(text_renderer.measure(text)[0] for text in velocity_texts)
+    draw_text((WINDOW_WIDTH - text_width - 10, 30), velocity_texts[0])
+    draw_text((WINDOW_WIDTH - text_width - 10, 60), velocity_texts[1])
+    draw_text((WINDOW_WIDTH - text_width - 10, 90), velocity_texts[2])
+    draw_text((WINDOW_WIDTH - text_width - 10, 120), velocity_texts[3])
+    text_renderer.flush()
 
 def main():
-    global x1, x2, velocity1, acceleration2, velocity2
-
-    pygame.init()
-    pygame.display.set_mode((WINDOW_WIDTH, WINDOW_HEIGHT), DOUBLEBUF | OPENGL)
-    glOrtho(-1, 1, -1, 1, -1, 1)
-    font = pygame.font.Font(None, 24)
-
-    running = True
-    while running:
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                running = False
-            if event.type == KEYDOWN:
-                if event.key == K_ESCAPE:
-                    running = False
-                elif event.key == K_UP:
-                    velocity1 += VELOCITY_STEP
-                elif event.key == K_DOWN:
-                    velocity1 = max(0, velocity1 - VELOCITY_STEP)
-                elif event.key == K_RIGHT:
-                    acceleration2 += ACCELERATION_STEP
-                elif event.key == K_LEFT:
-                    acceleration2 = max(0, acceleration2 - ACCELERATION_STEP)
-
-        glClear(GL_COLOR_BUFFER_BIT | GL_DEPTH_BUFFER_BIT)
-
-        # Update positions
-        x1 += velocity1
-        velocity2 += acceleration2
-        x2 += velocity2
-
-        # Draw objects
-        glColor3f(1, 0, 0)  # Red
-        draw_rect(x1, 0.3)
-        glColor3f(0, 0, 1)  # Blue
-        draw_rect(x2, -0.3)
-
-        # Display controls and velocities
-        glColor3f(1, 1, 1)
-        draw_text((10, WINDOW_HEIGHT - 30), "Controls:")
-        draw_text((10, WINDOW_HEIGHT - 60), "UP: Increase velocity of Red rectangle")
-        draw_text((10, WINDOW_HEIGHT - 90), "DOWN: Decrease velocity of Red rectangle")
-        draw_text((10, WINDOW_HEIGHT - 120), "RIGHT: Increase acceleration of Blue rectangle")
-        draw_text((10, WINDOW_HEIGHT - 150), "LEFT: Decrease acceleration of Blue rectangle")
-
-        # Display velocities at the bottom right corner
-        velocity_texts = [
-            f"Red Rectangle Velocity: {velocity1:.4f}",
-            f"Blue Rectangle Velocity: {velocity2:.4f}",
-            f"Blue Rectangle Acceleration: {acceleration2:.6f}"
-        ]
-        text_width = max(font.size(text)[0] for text in velocity_texts)
-        draw_text((WINDOW_WIDTH - text_width - 10, 30), velocity_texts[0])
-        draw_text((WINDOW_WIDTH - text_width - 10, 60), velocity_texts[1])
-        draw_text((WINDOW_WIDTH - text_width - 10, 90), velocity_texts[2])
-
-        pygame.display.flip()
-        pygame.time.wait(10)
-
-        if x1 > 1.0:
-            x1 = -1.0
-        if x2 > 1.0:
-            x2 = -1.0
-            velocity2 = 0.0
-
-    pygame.quit()
+    run_scene(sys.modules[__name__])
 
 if __name__ == "__main__":
     main()
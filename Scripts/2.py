@@ -1,14 +1,29 @@
+import os
+import sys
 import pygame
 from pygame.locals import *
 from OpenGL.GL import *
-from OpenGL.GLUT import *
-from OpenGL.GLU import *
 import numpy as np
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+from graphics.batch import PrimitiveBatch
+from graphics.plot import PhasePlot, Series, TimePlot, sampled
+from graphics.replay import ReplayControls
+from graphics.text import TextRenderer
+from physics import integrators, pendulum
+from physics.analytics import Analytics
+from physics.clock import SimulationClock
+from physics.recording import Recorder, Recording
+from scene_host import run_scene
 
 # Constants for the first pendulum
 WINDOW_WIDTH = 800
 WINDOW_HEIGHT = 600
+WINDOW_SIZE = (WINDOW_WIDTH, WINDOW_HEIGHT)
 GRAVITY = 0.0005
+FRAME_TIME = 1 / 60  # GRAVITY and the damping factors are per frame of this length
 LENGTH1 = 0.5
 DAMPING1 = 0.99  # Air resistance damping for pendulum 1
 
@@ -17,41 +32,158 @@ LENGTH2 = 0.4
 DAMPING2 = 1.0  # No air resistance for pendulum 2
 hanging_point1 = (-0.3, 0.3)  # Hanging point for the first pendulum
 hanging_point2 = (0.3, -0.3)  # Hanging point for the second pendulum
+LENGTHS = np.array([LENGTH1, LENGTH2])
+DAMPINGS = np.array([DAMPING1, DAMPING2])
+HANGING_POINTS = np.array([hanging_point1, hanging_point2])
+
+# Initial angles (from vertical) and angular velocities for the pendulums:
+# 45 degrees for the first pendulum, 60 for the second, both at rest
+pendulums = pendulum.initial_state([np.pi / 4, np.pi / 3])
+previous = pendulums.copy()
+
+# Physics runs in fixed steps of half a frame, independent of the display rate
+sim_clock = SimulationClock(dt=FRAME_TIME / 2)
+STEP = sim_clock.dt / FRAME_TIME
+integrator = integrators.configured("semi_implicit_euler")  # I cycles through physics/integrators.py
 
-# Initial angles (from vertical) and angular velocities for the pendulums
-theta1 = np.pi / 4  # 45 degrees for the first pendulum
-theta_velocity1 = 0.0
-theta2 = np.pi / 3  # Initial angle for the second pendulum
-theta_velocity2 = 0.0
+# Ensemble mode: many pendulums on one hanging point, advanced and drawn together
+ENSEMBLE_SIZES = (100, 1000, 10000, 50000)
+ENSEMBLE_DEMOS = ("amplitude", "damping")
+ENSEMBLE_ORIGIN = (0.0, 0.2)
+ENSEMBLE_LENGTH = 0.45
+ENSEMBLE_RODS = 256  # rods drawn; beyond this they only fill in the same fan
+ensemble = None
+ensemble_size = ENSEMBLE_SIZES.index(10000)
+ensemble_demo = 0
+update_time = 0.0
+
+# Recording the two pendulums to disk (C) and replaying the last recording (P)
+RECORDING_DIR = os.path.join(ROOT, "recordings")
+recorder = None
+last_recording = None
+replay = None
 
 # Mouse interaction
 is_dragging = False
-is_fullscreen = False
+mouse_pos = (0, 0)
+
+# Angle and energy history of both pendulums, one sample per physics step,
+# and their phase portraits. G shows or hides the plots and H switches the
+# time plots between the last 10 seconds and all of the history.
+PLOT_SPAN = 10.0
+PLOT_COLORS = ((1.0, 0.3, 0.3), (0.4, 0.5, 1.0))
+angles = [Series(dt=sim_clock.dt), Series(dt=sim_clock.dt)]
+energies = [Series(dt=sim_clock.dt), Series(dt=sim_clock.dt)]
+angle_plot = None
+energy_plot = None
+phase_plot = None
+show_plots = False
+
+# Kinetic and potential energy per unit mass and squared length, in the
+# per-frame units of GRAVITY
+def kinetic_potential(state):
+    omega = state[:, pendulum.OMEGA]
+    return 0.5 * omega * omega, GRAVITY / LENGTHS * (1 - np.cos(state[:, pendulum.THETA]))
+
+def energy(state):
+    return sum(kinetic_potential(state))
+
+# Period, damping, energy drift and spectrum of both pendulums, measured on
+# every physics step
+analytics = Analytics(2, sim_clock.dt, lambda state: state[:, pendulum.THETA], kinetic_potential)
+
+def sample_pendulums(state):
+    analytics.sample(state)
+    for i, value in enumerate(energy(state)):
+        angles[i].append(np.degrees(state[i, pendulum.THETA]))
+        energies[i].append(value)
+        phase_plot.append(i, np.degrees(state[i, pendulum.THETA]), state[i, pendulum.OMEGA] / FRAME_TIME)
 
-# Variables for counting oscillations
-oscillations1 = 0
-oscillations2 = 0
-prev_theta_velocity1 = 0.0
-prev_theta_velocity2 = 0.0
+# Text rendering
+text_renderer = None
+shapes = PrimitiveBatch()
+title_block = None
+help_block = None
+ensemble_help_block = None
 
 def draw_text(position, text_string, font_size=64):
-    font = pygame.font.Font(None, font_size)
-    text_surface = font.render(text_string, True, (255, 255, 255, 255), (0, 0, 0, 255))
-    text_data = pygame.image.tostring(text_surface, "RGBA", True)
-    glRasterPos2d(*position)
-    glDrawPixels(text_surface.get_width(), text_surface.get_height(), GL_RGBA, GL_UNSIGNED_BYTE, text_data)
+    text_renderer.draw(*world_to_window(*position), text_string, size=font_size)
+
+def init():
+    global text_renderer, title_block, help_block, ensemble_help_block, angle_plot, energy_plot, phase_plot
+    text_renderer = TextRenderer((WINDOW_WIDTH, WINDOW_HEIGHT))
+    angle_plot = TimePlot(WINDOW_SIZE, (470, 310, 320, 110), "Angle (degrees)", span=PLOT_SPAN)
+    energy_plot = TimePlot(WINDOW_SIZE, (470, 190, 320, 110), "Energy", span=PLOT_SPAN)
+    phase_plot = PhasePlot(WINDOW_SIZE, (470, 75, 320, 105), "Angular velocity (rad/s) against angle")
+    for i, color in enumerate(PLOT_COLORS):
+        angle_plot.add(angles[i], color)
+        energy_plot.add(energies[i], color)
+        phase_plot.add(color)
+    title_block = text_renderer.block([(*world_to_window(-0.6, 0.8), "Pendulums Under Gravity")], size=64)
+    help_block = text_renderer.block([(*world_to_window(-0.95, 0.7), "Press 'F' to toggle fullscreen. Press 'ESC' to exit.")], size=32)
+    ensemble_help_block = text_renderer.block([
+        (*world_to_window(-0.95, 0.63), "E: ensemble mode, M: amplitude/damping sweep, UP/DOWN: number of pendulums"),
+        (*world_to_window(-0.95, 0.56), "C: start/stop recording, P: replay the recording"),
+        (*world_to_window(-0.95, 0.49), "G: show/hide plots, H: last 10 s/all history, I: next integrator"),
+    ], size=24)
+    sim_clock.reset()
 
 def draw_pendulum(origin, x, y):
-    glBegin(GL_LINES)
-    glVertex2f(origin[0], origin[1])
-    glVertex2f(x, y)
-    glEnd()
-    glBegin(GL_QUADS)
-    glVertex2f(x - 0.05, y - 0.05)
-    glVertex2f(x + 0.05, y - 0.05)
-    glVertex2f(x + 0.05, y + 0.05)
-    glVertex2f(x - 0.05, y + 0.05)
-    glEnd()
+    shapes.line(origin, (x, y))
+    shapes.rect(x - 0.05, y - 0.05, 0.1, 0.1)
+
+class PendulumEnsemble:
+    # N pendulums held as arrays: one state row, length, damping factor and
+    # hanging point per pendulum, plus the vertex and colour arrays they are
+    # drawn from
+    def __init__(self, n, demo):
+        fraction = np.linspace(0.0, 1.0, n)
+        self.demo = demo
+        self.lengths = np.full(n, ENSEMBLE_LENGTH)
+        self.origins = np.tile(ENSEMBLE_ORIGIN, (n, 1))
+        if demo == "amplitude":
+            # Undamped, released from 3 to 170 degrees: wide swings take longer
+            angles = np.radians(3 + 167 * fraction)
+            self.dampings = np.ones(n)
+        else:
+            # Released together from 90 degrees with damping from none to strong
+            angles = np.full(n, np.pi / 2)
+            self.dampings = 1.0 - 0.02 * fraction
+        self.state = pendulum.initial_state(angles)
+        self.previous = self.state.copy()
+
+        # Rods are vertex pairs (hanging point, bob); bobs are every second vertex.
+        # Every bob is drawn but only an evenly spaced subset of the rods.
+        self.vertices = np.empty((n, 2, 2), dtype=np.float32)
+        self.vertices[:, 0] = self.origins
+        colors = np.stack([1.0 - fraction, np.full(n, 0.2), fraction], axis=1)
+        self.colors = np.repeat(colors, 2, axis=0).astype(np.float32)
+        self.bob_indices = np.arange(1, 2 * n, 2, dtype=np.uint32)
+        rods = np.unique(np.linspace(0, n - 1, min(n, ENSEMBLE_RODS)).astype(np.uint32))
+        self.rod_indices = np.stack([2 * rods, 2 * rods + 1], axis=1).ravel()
+
+    def __len__(self):
+        return len(self.state)
+
+    def update(self):
+        sim_clock.step(pendulum.step, self.state, self.previous, dt=STEP,
+                       gravity=GRAVITY, length=self.lengths, damping=self.dampings, integrator=integrator)
+        shown = sim_clock.interpolate(self.previous, self.state)
+        x, y = pendulum.bob_positions(shown, self.origins, self.lengths)
+        self.vertices[:, 1, 0] = x
+        self.vertices[:, 1, 1] = y
+
+    # The rods in one draw call and all bobs in another
+    def draw(self):
+        glPushClientAttrib(GL_CLIENT_VERTEX_ARRAY_BIT)
+        glEnableClientState(GL_VERTEX_ARRAY)
+        glEnableClientState(GL_COLOR_ARRAY)
+        glVertexPointer(2, GL_FLOAT, 0, self.vertices)
+        glColorPointer(3, GL_FLOAT, 0, self.colors)
+        glDrawElements(GL_LINES, len(self.rod_indices), GL_UNSIGNED_INT, self.rod_indices)
+        glPointSize(3)
+        glDrawElements(GL_POINTS, len(self), GL_UNSIGNED_INT, self.bob_indices)
+        glPopClientAttrib()
 
 def screen_to_world(mouse_x, mouse_y):
     world_x = (mouse_x / WINDOW_WIDTH) * 2 - 1
@@ -59,112 +191,163 @@ def screen_to_world(mouse_x, mouse_y):
     world_y = -world_y  # Flip y-axis
     return world_x, world_y
 
-def toggle_fullscreen():
-    global is_fullscreen
-    is_fullscreen = not is_fullscreen
-    if is_fullscreen:
-        pygame.display.set_mode((WINDOW_WIDTH, WINDOW_HEIGHT), DOUBLEBUF | OPENGL | FULLSCREEN)
+def world_to_window(world_x, world_y):
+    return (world_x + 1) / 2 * WINDOW_WIDTH, (world_y + 1) / 2 * WINDOW_HEIGHT
+
+def toggle_recording():
+    global recorder, last_recording
+    if recorder:
+        recorder.close()
+        recorder = None
     else:
-        pygame.display.set_mode((WINDOW_WIDTH, WINDOW_HEIGHT), DOUBLEBUF | OPENGL)
+        last_recording = os.path.join(RECORDING_DIR, time.strftime("pendulums_%Y%m%d_%H%M%S.rec"))
+        recorder = Recorder(last_recording, pendulums.shape, sim_clock.dt,
+                            params={"gravity": (), "length": LENGTHS.shape, "damping": DAMPINGS.shape},
+                            scene="Simple Pendulum")
 
-def main():
-    global theta1, theta_velocity1, theta2, theta_velocity2, is_dragging, is_fullscreen, oscillations1, oscillations2, prev_theta_velocity1, prev_theta_velocity2
+def toggle_replay():
+    global replay
+    if replay:
+        replay.recording.close()
+        replay = None
+        sim_clock.reset()
+    elif last_recording:
+        if recorder:
+            toggle_recording()
+        recording = Recording(last_recording)
+        if len(recording):
+            replay = ReplayControls(WINDOW_SIZE, recording, timer=lambda: sim_clock.timer())
 
-    try:
-        pygame.init()
-        pygame.display.set_mode((WINDOW_WIDTH, WINDOW_HEIGHT), DOUBLEBUF | OPENGL)
-        glOrtho(-1, 1, -1, 1, -1, 1)
-
-        running = True
-        clock = pygame.time.Clock()
-
-        while running:
-            for event in pygame.event.get():
-                if event.type == pygame.QUIT:
-                    running = False
-                if event.type == KEYDOWN:
-                    if event.key == K_ESCAPE:
-                        running = False
-                    if event.key == K_f:
-                        toggle_fullscreen()
-                if event.type == MOUSEBUTTONDOWN:
-                    is_dragging = True
-                if event.type == MOUSEBUTTONUP:
-                    is_dragging = False
-
-            if is_dragging:
-                mouse_x, mouse_y = pygame.mouse.get_pos()
-                world_x, world_y = screen_to_world(mouse_x, mouse_y)
-                # Check distance to decide which pendulum is dragged
-                dist1 = np.sqrt((world_x - hanging_point1[0])**2 + (world_y - hanging_point1[1])**2)
-                dist2 = np.sqrt((world_x - hanging_point2[0])**2 + (world_y - hanging_point2[1])**2)
-                
-                if dist1 < dist2:
-                    dx = world_x - hanging_point1[0]
-                    dy = world_y - hanging_point1[1]
-                    theta1 = np.arctan2(dx, -dy)
-                    theta_velocity1 = 0.0
-                else:
-                    dx = world_x - hanging_point2[0]
-                    dy = world_y - hanging_point2[1]
-                    theta2 = np.arctan2(dx, -dy)
-                    theta_velocity2 = 0.0
-
-            glClear(GL_COLOR_BUFFER_BIT | GL_DEPTH_BUFFER_BIT)
-
-            # Draw heading
-            draw_text((-0.6, 0.8), "Pendulums Under Gravity")
-
-            # Draw instructions
-            draw_text((-0.95, 0.7), "Press 'F' to toggle fullscreen. Press 'ESC' to exit.", font_size=32)
-
-            # Pendulum 1 dynamics (with air resistance)
-            gravity_force1 = GRAVITY * np.sin(theta1)
-            theta_acceleration1 = (-gravity_force1 / LENGTH1)
-            theta_velocity1 += theta_acceleration1
-            theta_velocity1 *= DAMPING1
-            theta1 += theta_velocity1
-
-            # Pendulum 2 dynamics (without air resistance)
-            gravity_force2 = GRAVITY * np.sin(theta2)
-            theta_acceleration2 = (-gravity_force2 / LENGTH2)
-            theta_velocity2 += theta_acceleration2
-            theta_velocity2 *= DAMPING2
-            theta2 += theta_velocity2
-
-            # Calculate positions
-            x1 = hanging_point1[0] + LENGTH1 * np.sin(theta1)
-            y1 = hanging_point1[1] - LENGTH1 * np.cos(theta1)
-            x2 = hanging_point2[0] + LENGTH2 * np.sin(theta2)
-            y2 = hanging_point2[1] - LENGTH2 * np.cos(theta2)
-
-            # Count oscillations for pendulum 1
-            if prev_theta_velocity1 * theta_velocity1 < 0:
-                oscillations1 += 1
-            prev_theta_velocity1 = theta_velocity1
-
-            # Count oscillations for pendulum 2
-            if prev_theta_velocity2 * theta_velocity2 < 0:
-                oscillations2 += 1
-            prev_theta_velocity2 = theta_velocity2
-
-            # Draw pendulums
-            glColor3f(1, 0, 0)  # Red for pendulum 1 (with air resistance)
-            draw_pendulum(hanging_point1, x1, y1)
-            glColor3f(0, 0, 1)  # Blue for pendulum 2 (without air resistance)
-            draw_pendulum(hanging_point2, x2, y2)
-
-            # Display oscillations count
-            draw_text((-0.95, -0.9), f"Oscillations: Pendulum 1 - {oscillations1}, Pendulum 2 - {oscillations2}", font_size=24)
-
-            pygame.display.flip()
-            clock.tick(60)
+def handle_event(event):
+    global is_dragging, mouse_pos, ensemble, ensemble_size, ensemble_demo, show_plots, integrator
+    if replay and replay.handle_event(event):
+        return
+    if event.type == KEYDOWN and event.key == K_p and not ensemble:
+        toggle_replay()
+        return
+    if replay:
+        return
+    if event.type == KEYDOWN and event.key == K_c and not ensemble:
+        toggle_recording()
+        return
+    if event.type == KEYDOWN:
+        if event.key == K_f:
+            pygame.display.toggle_fullscreen()
+        if event.key == K_g:
+            show_plots = not show_plots
+        if event.key == K_i:
+            integrator = integrators.next_after(integrator)
+            analytics.reset()
+        if event.key == K_h:
+            angle_plot.span = energy_plot.span = None if angle_plot.span else PLOT_SPAN
+        if event.key == K_e and not recorder:
+            ensemble = None if ensemble else PendulumEnsemble(ENSEMBLE_SIZES[ensemble_size], ENSEMBLE_DEMOS[ensemble_demo])
+        if ensemble and event.key == K_m:
+            ensemble_demo = (ensemble_demo + 1) % len(ENSEMBLE_DEMOS)
+            ensemble = PendulumEnsemble(ENSEMBLE_SIZES[ensemble_size], ENSEMBLE_DEMOS[ensemble_demo])
+        if ensemble and event.key in (K_UP, K_DOWN):
+            ensemble_size += 1 if event.key == K_UP else -1
+            ensemble_size = min(max(ensemble_size, 0), len(ENSEMBLE_SIZES) - 1)
+            ensemble = PendulumEnsemble(ENSEMBLE_SIZES[ensemble_size], ENSEMBLE_DEMOS[ensemble_demo])
+    if event.type in (MOUSEBUTTONDOWN, MOUSEMOTION):
+        mouse_pos = event.pos
+    if event.type == MOUSEBUTTONDOWN:
+        is_dragging = True
+    if event.type == MOUSEBUTTONUP:
+        is_dragging = False
+
+def update():
+    global update_time
+    if ensemble:
+        # One vectorized update for the whole ensemble
+        start = time.perf_counter()
+        ensemble.update()
+        update_time = time.perf_counter() - start
+        return
+    if replay:
+        replay.update()
+        return
+
+    if is_dragging:
+        world_x, world_y = screen_to_world(*mouse_pos)
+        # The pendulum hanging closest to the mouse is dragged
+        dx = world_x - HANGING_POINTS[:, 0]
+        dy = world_y - HANGING_POINTS[:, 1]
+        nearest = np.argmin(dx**2 + dy**2)
+        pendulums[nearest, pendulum.THETA] = np.arctan2(dx[nearest], -dy[nearest])
+        pendulums[nearest, pendulum.OMEGA] = 0.0
+        previous[nearest] = pendulums[nearest]
+        # Measurements start again from the release
+        analytics.reset()
+
+    # Pendulum dynamics with the steps that are due; pendulum 1 has air resistance
+    step = recorder.wrap(pendulum.step) if recorder else pendulum.step
+    sim_clock.step(sampled(step, sample_pendulums), pendulums, previous, dt=STEP,
+                   gravity=GRAVITY, length=LENGTHS, damping=DAMPINGS, integrator=integrator)
+
+def render():
+    glMatrixMode(GL_PROJECTION)
+    glLoadIdentity()
+    glOrtho(-1, 1, -1, 1, -1, 1)
+    glMatrixMode(GL_MODELVIEW)
+    glLoadIdentity()
+    glClear(GL_COLOR_BUFFER_BIT | GL_DEPTH_BUFFER_BIT)
+
+    # Draw heading and instructions
+    text_renderer.draw_block(title_block)
+    text_renderer.draw_block(help_block)
+    text_renderer.draw_block(ensemble_help_block)
+
+    if ensemble:
+        ensemble.draw()
+        draw_text((-0.95, -0.9), f"Ensemble: {len(ensemble)} pendulums, {ensemble.demo} sweep, "
+                                f"{integrators.get(integrator).label}, update {update_time * 1000:.2f} ms", font_size=24)
+        text_renderer.flush()
+        return
+
+    if replay:
+        # Pendulums as they were at the recorded step
+        record = replay.record
+        x, y = pendulum.bob_positions(record["state"], HANGING_POINTS, record["length"])
+    else:
+        # Calculate positions between the last two steps
+        x, y = pendulum.bob_positions(sim_clock.interpolate(previous, pendulums), HANGING_POINTS, LENGTHS)
+
+    # Draw pendulums
+    shapes.color(1, 0, 0)  # Red for pendulum 1 (with air resistance)
+    draw_pendulum(hanging_point1, x[0], y[0])
+    shapes.color(0, 0, 1)  # Blue for pendulum 2 (without air resistance)
+    draw_pendulum(hanging_point2, x[1], y[1])
+    shapes.flush()
+
+    if replay:
+        replay.draw(text_renderer)
+        text_renderer.flush()
+        return
+
+    if show_plots:
+        angle_plot.draw(text_renderer)
+        energy_plot.draw(text_renderer)
+        phase_plot.draw(text_renderer)
 
+    # Oscillations, period from the zero crossings and from the spectrum,
+    # damping ratio and how far the energy has moved
+    spectrum_period = 1 / analytics.spectrum.peak_frequency()
+    for i, y in enumerate((-0.84, -0.92)):
+        draw_text((-0.95, y), f"Pendulum {i + 1}: {analytics.period.oscillations[i]} oscillations, "
+                              f"period {analytics.period.period[i]:.2f} s (spectrum {spectrum_period[i]:.2f} s), "
+                              f"damping ratio {analytics.damping.ratio[i]:.4f}, "
+                              f"energy {analytics.energy.drift[i]:+.1%}", font_size=18)
+    draw_text((-0.95, -0.68), f"Integrator: {integrators.get(integrator).label}", font_size=24)
+    if recorder:
+        draw_text((-0.95, -0.76), f"Recording: {recorder.count} steps", font_size=24)
+    text_renderer.flush()
+
+def main():
+    try:
+        run_scene(sys.modules[__name__])
     except Exception as e:
         print(f"An error occurred: {e}")
 
-    finally:
-        pygame.quit()
-
 if __name__ == "__main__":
     main()
@@ -1,36 +1,263 @@
+import os
+import sys
+import time
+import numpy as np
 import pygame
 from pygame.locals import *
 from OpenGL.GL import *
-from OpenGL.GLUT import *
-from OpenGL.GLU import *
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from graphics.batch import PrimitiveBatch
+from graphics.heatmap import colormap
+from graphics.text import TextRenderer
+from physics import bounce, collisions, integrators, nbody
+from physics.clock import SimulationClock
+from scene_host import run_scene
 
 # Constants
 WINDOW_WIDTH = 800
 WINDOW_HEIGHT = 600
+WINDOW_SIZE = (WINDOW_WIDTH, WINDOW_HEIGHT)
 START_POS_X = 0.0  # Starting x position of the object
 START_POS_Y = 0.9  # Starting y position of the object
 SIZE = 0.1         # Size of the object
+GRAVITY_SCALE = 0.0001  # Per-frame scale applied to the gravity value
+FRAME_TIME = 1 / 60  # Length of the frame the scale and velocities refer to
+RESTITUTION = 0.8
+
+# N-body mode: a disc galaxy of self-gravitating bodies
+NBODY_COUNTS = (1000, 5000, 20000, 50000)
+NBODY_DT = 0.01  # simulated time units per step
+SOFTENING = 0.01
+THETA_STEP = 0.1
+ERROR_SAMPLE = 256  # bodies checked against the direct sum
+ERROR_INTERVAL = 1.0  # seconds between error checks
+STAR_SIZE = 4  # point sprite size in pixels
+
+# Crowd mode: many balls bouncing off the walls, the floor and each other.
+# The box keeps the window's aspect so balls stay round.
+CROWD_COUNTS = (500, 2000, 5000, 10000)
+CROWD_BOUNDS = (-WINDOW_WIDTH / WINDOW_HEIGHT, WINDOW_WIDTH / WINDOW_HEIGHT, -1.0, 1.0)
+CROWD_FILL = 0.3  # share of the box the balls cover
+CROWD_DT = 1 / 240  # seconds per step
+TIMING_INTERVAL = 1.0  # seconds over which phase timings are averaged
 
 # Initial values
 gravity = -9.8
 gravity_step = 0.1  # Initial gravity change step
-y_velocity = 0.0
 is_dragging = False
+mouse_pos = (0, 0)
+text_renderer = None
+static_text = []
+shapes = PrimitiveBatch()
+
+# The body's position is its top-left corner
+body = bounce.initial_state(START_POS_X, START_POS_Y)
+previous = body.copy()
+
+# Physics runs in fixed steps of half a frame, independent of the display rate
+sim_clock = SimulationClock(dt=FRAME_TIME / 2)
+integrator = integrators.configured("semi_implicit_euler")  # I cycles through physics/integrators.py
+
+# N-body state, created when the mode is first switched on. At most one
+# step is taken per frame: a force pass on many bodies can take longer
+# than a frame, and catching up would only make the next frame slower.
+nbody_count = 1
+theta = 0.7
+nbody_method = "tree"
+nbody_integrator = integrators.configured("leapfrog")
+stars = None
+stars_previous = None
+nbody_clock = SimulationClock(dt=FRAME_TIME, max_steps=1)
+step_time = 0.0  # seconds per step, smoothed
+force_error = None  # (median, max) relative error of the last check
+last_error_check = 0.0
+star_texture = None
+nbody_help = None
+
+# Crowd state, also created on first use. Timings are summed by the
+# physics over TIMING_INTERVAL and shown as averages per step.
+crowd_count = 1
+crowd = None
+crowd_previous = None
+crowd_radius = 0.0
+crowd_clock = SimulationClock(dt=CROWD_DT, max_steps=2)
+crowd_timings = {}
+crowd_report = None  # (broad ms, narrow ms, pairs, contacts) per step
+last_timing_report = 0.0
+ball_texture = None
+crowd_help = None
+
+# "bounce" for the single body, "nbody" or "crowd"
+mode = "bounce"
 
 def draw_text(position, text_string, size=64):
-    font = pygame.font.Font(None, size)
-    text_surface = font.render(text_string, True, (255, 255, 255, 255), (0, 0, 0, 255))
-    text_data = pygame.image.tostring(text_surface, "RGBA", True)
-    glRasterPos2d(*position)
-    glDrawPixels(text_surface.get_width(), text_surface.get_height(), GL_RGBA, GL_UNSIGNED_BYTE, text_data)
+    text_renderer.draw(*world_to_window(*position), text_string, size=size)
 
+# The square hangs down from its top-left corner at (x, y)
 def draw_square(x, y, size):
-    glBegin(GL_QUADS)
-    glVertex2f(x, y)
-    glVertex2f(x + size, y)
-    glVertex2f(x + size, y - size)
-    glVertex2f(x, y - size)
-    glEnd()
+    shapes.rect(x, y - size, size, size)
+
+# A round dot texture for point sprites; shape maps the distance from the
+# centre, 0 to 1 at the edge, to opacity
+def make_dot_texture(shape, size=32):
+    r = np.hypot(*np.meshgrid(np.linspace(-1, 1, size), np.linspace(-1, 1, size)))
+    alpha = shape(r)
+    rgba = np.empty((size, size, 4), dtype=np.uint8)
+    rgba[..., :3] = 255
+    rgba[..., 3] = (alpha * 255).astype(np.uint8)
+    texture = glGenTextures(1)
+    glBindTexture(GL_TEXTURE_2D, texture)
+    glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MIN_FILTER, GL_LINEAR)
+    glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MAG_FILTER, GL_LINEAR)
+    glTexImage2D(GL_TEXTURE_2D, 0, GL_RGBA, size, size, 0, GL_RGBA, GL_UNSIGNED_BYTE, rgba)
+    return texture
+
+# All bodies in one draw call, blended additively so dense regions glow
+def draw_stars(position):
+    glPushAttrib(GL_ENABLE_BIT | GL_COLOR_BUFFER_BIT | GL_POINT_BIT | GL_TEXTURE_BIT)
+    glEnable(GL_TEXTURE_2D)
+    glBindTexture(GL_TEXTURE_2D, star_texture)
+    glEnable(GL_POINT_SPRITE)
+    glTexEnvi(GL_POINT_SPRITE, GL_COORD_REPLACE, GL_TRUE)
+    glTexEnvi(GL_TEXTURE_ENV, GL_TEXTURE_ENV_MODE, GL_MODULATE)
+    glPointSize(STAR_SIZE)
+    glEnable(GL_BLEND)
+    glBlendFunc(GL_SRC_ALPHA, GL_ONE)
+    glColor4f(0.6, 0.7, 1.0, 0.8)
+    glEnableClientState(GL_VERTEX_ARRAY)
+    glVertexPointer(2, GL_FLOAT, 0, np.ascontiguousarray(position, dtype=np.float32))
+    glDrawArrays(GL_POINTS, 0, len(position))
+    glDisableClientState(GL_VERTEX_ARRAY)
+    glPopAttrib()
+
+# All balls in one draw call, coloured by speed
+def draw_balls(position, speed):
+    glPushAttrib(GL_ENABLE_BIT | GL_COLOR_BUFFER_BIT | GL_POINT_BIT | GL_TEXTURE_BIT)
+    glEnable(GL_TEXTURE_2D)
+    glBindTexture(GL_TEXTURE_2D, ball_texture)
+    glEnable(GL_POINT_SPRITE)
+    glTexEnvi(GL_POINT_SPRITE, GL_COORD_REPLACE, GL_TRUE)
+    glTexEnvi(GL_TEXTURE_ENV, GL_TEXTURE_ENV_MODE, GL_MODULATE)
+    glPointSize(max(crowd_radius * WINDOW_HEIGHT, 1.0))
+    glEnable(GL_BLEND)
+    glBlendFunc(GL_SRC_ALPHA, GL_ONE_MINUS_SRC_ALPHA)
+    glEnableClientState(GL_VERTEX_ARRAY)
+    glEnableClientState(GL_COLOR_ARRAY)
+    glVertexPointer(2, GL_FLOAT, 0, np.ascontiguousarray(position, dtype=np.float32))
+    glColorPointer(3, GL_UNSIGNED_BYTE, 0, np.ascontiguousarray(colormap(speed, 0.0, 2.0)))
+    glDrawArrays(GL_POINTS, 0, len(position))
+    glDisableClientState(GL_COLOR_ARRAY)
+    glDisableClientState(GL_VERTEX_ARRAY)
+    glPopAttrib()
+
+def reset_nbody():
+    global stars, stars_previous, force_error
+    stars = nbody.galaxy(NBODY_COUNTS[nbody_count])
+    stars_previous = stars.copy()
+    force_error = None
+    nbody_clock.reset()
+
+# Relative error of the accelerations in the state against the exact sum,
+# on a random sample of bodies. Only leapfrog keeps the accelerations.
+def check_force_error():
+    global force_error, last_error_check
+    last_error_check = time.perf_counter()
+    if not np.isfinite(stars[:, nbody.ACCELERATION]).all():
+        force_error = None
+        return
+    sample = np.random.default_rng().choice(len(stars), min(ERROR_SAMPLE, len(stars)), replace=False)
+    exact = nbody.direct_accelerations(stars[:, nbody.POSITION], stars[:, nbody.MASS],
+                                       softening=SOFTENING, targets=sample)
+    error = np.linalg.norm(stars[sample, nbody.ACCELERATION] - exact, axis=1) / np.linalg.norm(exact, axis=1)
+    force_error = (np.median(error), error.max())
+
+def update_nbody():
+    global step_time
+    started = time.perf_counter()
+    stepped = nbody_clock.step(nbody.step, stars, stars_previous, dt=NBODY_DT,
+                               theta=theta, softening=SOFTENING, method=nbody_method, integrator=nbody_integrator)
+    if stepped is not None:
+        step_time += (time.perf_counter() - started - step_time) * 0.2
+        if time.perf_counter() - last_error_check > ERROR_INTERVAL:
+            check_force_error()
+
+def handle_nbody_key(key):
+    global nbody_count, theta, nbody_method, nbody_integrator
+    if key == K_UP and nbody_count < len(NBODY_COUNTS) - 1:
+        nbody_count += 1
+        reset_nbody()
+    elif key == K_DOWN and nbody_count > 0:
+        nbody_count -= 1
+        reset_nbody()
+    elif key == K_RIGHTBRACKET:
+        theta = round(theta + THETA_STEP, 2)
+    elif key == K_LEFTBRACKET:
+        theta = max(round(theta - THETA_STEP, 2), THETA_STEP)
+    elif key == K_b:
+        nbody_method = "direct" if nbody_method == "tree" else "tree"
+    elif key == K_i:
+        nbody_integrator = integrators.next_after(nbody_integrator)
+    elif key == K_r:
+        reset_nbody()
+
+def render_nbody():
+    draw_stars(nbody_clock.interpolate(stars_previous[:, nbody.POSITION], stars[:, nbody.POSITION]))
+    text_renderer.draw_block(nbody_help)
+    method = "brute force" if nbody_method == "direct" else f"Barnes-Hut, theta {theta:.1f}"
+    draw_text((-0.95, 0.9), f"{len(stars)} bodies, {method}", size=24)
+    draw_text((-0.95, 0.85), f"Step: {step_time * 1000:.1f} ms, {integrators.get(nbody_integrator).label}", size=24)
+    if force_error is not None:
+        draw_text((-0.95, 0.8), f"Force error: median {force_error[0]:.2e}, max {force_error[1]:.2e}", size=24)
+
+# Equal balls covering CROWD_FILL of the box, dropped from the top
+def reset_crowd():
+    global crowd, crowd_previous, crowd_radius, crowd_report
+    left, right, floor, top = CROWD_BOUNDS
+    n = CROWD_COUNTS[crowd_count]
+    crowd_radius = np.sqrt(CROWD_FILL * (right - left) * (top - floor) / (n * np.pi))
+    crowd = collisions.fill(n, crowd_radius, CROWD_BOUNDS)
+    crowd_previous = crowd.copy()
+    crowd_report = None
+    crowd_timings.clear()
+    crowd_clock.reset()
+
+def update_crowd():
+    global crowd_report, last_timing_report
+    crowd_clock.step(collisions.step, crowd, crowd_previous, gravity=gravity * GRAVITY_SCALE / FRAME_TIME ** 2,
+                     radius=crowd_radius, bounds=CROWD_BOUNDS, restitution=RESTITUTION, timings=crowd_timings)
+    now = time.perf_counter()
+    if now - last_timing_report > TIMING_INTERVAL and crowd_timings.get("steps"):
+        steps = crowd_timings["steps"]
+        crowd_report = (crowd_timings["broad"] / steps * 1000, crowd_timings["narrow"] / steps * 1000,
+                        crowd_timings["pairs"], crowd_timings["contacts"])
+        crowd_timings.clear()
+        last_timing_report = now
+
+def handle_crowd_key(key):
+    global crowd_count
+    if key == K_UP and crowd_count < len(CROWD_COUNTS) - 1:
+        crowd_count += 1
+        reset_crowd()
+    elif key == K_DOWN and crowd_count > 0:
+        crowd_count -= 1
+        reset_crowd()
+    elif key == K_r:
+        reset_crowd()
+
+def render_crowd():
+    glMatrixMode(GL_PROJECTION)
+    glLoadIdentity()
+    glOrtho(*CROWD_BOUNDS, -1, 1)
+    glMatrixMode(GL_MODELVIEW)
+    shown = crowd_clock.interpolate(crowd_previous, crowd)
+    draw_balls(shown[:, collisions.POSITION], np.hypot(crowd[:, collisions.VX], crowd[:, collisions.VY]))
+    text_renderer.draw_block(crowd_help)
+    draw_text((-0.95, 0.9), f"{len(crowd)} balls", size=24)
+    if crowd_report is not None:
+        broad, narrow, pairs, contacts = crowd_report
+        draw_text((-0.95, 0.85), f"Broad phase: {broad:.2f} ms, {pairs} candidate pairs", size=24)
+        draw_text((-0.95, 0.8), f"Narrow phase: {narrow:.2f} ms, {contacts} contacts", size=24)
 
 def screen_to_world(mouse_x, mouse_y):
     world_x = (mouse_x / WINDOW_WIDTH) * 2 - 1
@@ -38,85 +265,124 @@ def screen_to_world(mouse_x, mouse_y):
     world_y = -world_y  # Flip y-axis
     return world_x, world_y
 
+def world_to_window(world_x, world_y):
+    return (world_x + 1) / 2 * WINDOW_WIDTH, (world_y + 1) / 2 * WINDOW_HEIGHT
+
 def init():
-    pygame.init()
-    pygame.display.set_mode((WINDOW_WIDTH, WINDOW_HEIGHT), DOUBLEBUF | OPENGL)
+    global text_renderer, static_text, star_texture, ball_texture, nbody_help, crowd_help
+    text_renderer = TextRenderer(WINDOW_SIZE)
+    star_texture = make_dot_texture(lambda r: np.clip(1 - r, 0, 1) ** 2)
+    ball_texture = make_dot_texture(lambda r: np.clip((1 - r) * 16, 0, 1))
+
+    # Static heading and control help, uploaded once
+    static_text = [
+        text_renderer.block([(*world_to_window(-0.35, 0.8), "Gravity Demonstration")], size=48),
+        text_renderer.block([(*world_to_window(-0.9, -0.9), "Controls:")], size=24),
+        text_renderer.block([(*world_to_window(x, y), line) for x, y, line in [
+            (-0.9, -0.95, "Press N for the N-body galaxy, M for many bouncing balls"),
+            (-0.9, -1.0, "Press UP arrow key to decrease gravity"),
+            (-0.9, -1.05, "Press DOWN arrow key to increase gravity"),
+            (-0.9, -1.1, "Click and drag to move the object"),
+            (-0.9, -1.15, "Scroll mouse wheel to adjust gravity"),
+            (-0.9, -1.2, "Press ESC key to quit"),
+        ]], size=20),
+    ]
+    nbody_help = text_renderer.block([(*world_to_window(x, y), line) for x, y, line in [
+        (-0.95, -0.8, "UP/DOWN: number of bodies, [ and ]: opening angle theta"),
+        (-0.95, -0.85, "B: Barnes-Hut / brute force, I: next integrator, R: restart, N: back to the bouncing body"),
+    ]], size=20)
+    crowd_help = text_renderer.block([(*world_to_window(x, y), line) for x, y, line in [
+        (-0.95, 0.72, "UP/DOWN: number of balls, R: restart, M: back to the bouncing body"),
+    ]], size=20)
+    sim_clock.reset()
+
+def handle_event(event):
+    global is_dragging, mouse_pos, gravity, gravity_step, mode, integrator
+    if event.type == KEYDOWN and event.key in (K_n, K_m):
+        chosen = "nbody" if event.key == K_n else "crowd"
+        mode = "bounce" if mode == chosen else chosen
+        if mode == "nbody" and stars is None:
+            reset_nbody()
+        if mode == "crowd" and crowd is None:
+            reset_crowd()
+        nbody_clock.reset()
+        crowd_clock.reset()
+        sim_clock.reset()
+    elif mode == "nbody":
+        if event.type == KEYDOWN:
+            handle_nbody_key(event.key)
+    elif mode == "crowd":
+        if event.type == KEYDOWN:
+            handle_crowd_key(event.key)
+    elif event.type == KEYDOWN:
+        if event.key == K_UP:
+            gravity -= gravity_step
+            gravity_step += 0.01  # Increase the step size
+        elif event.key == K_DOWN:
+            gravity += gravity_step
+            gravity_step += 0.01  # Increase the step size
+        elif event.key == K_i:
+            integrator = integrators.next_after(integrator)
+    elif event.type == MOUSEBUTTONDOWN:
+        is_dragging = True
+        mouse_pos = event.pos
+    elif event.type == MOUSEBUTTONUP:
+        is_dragging = False
+    elif event.type == MOUSEMOTION:
+        mouse_pos = event.pos
+    elif event.type == MOUSEWHEEL:
+        gravity += event.y * gravity_step
+        gravity_step += 0.01  # Increase the step size
+
+def update():
+    if mode == "nbody":
+        update_nbody()
+        return
+    if mode == "crowd":
+        update_crowd()
+        return
+    if is_dragging:
+        body[0, bounce.X], body[0, bounce.Y] = screen_to_world(*mouse_pos)
+        body[0, bounce.VY] = 0.0
+        previous[:] = body
+
+    # Apply gravity unless the body is held, then bounce off the ground
+    sim_clock.step(bounce.step, body, previous, dt=sim_clock.dt / FRAME_TIME,
+                   gravity=0.0 if is_dragging else gravity * GRAVITY_SCALE,
+                   floor=-1 + SIZE, restitution=RESTITUTION, integrator=integrator)
+
+def render():
+    glMatrixMode(GL_PROJECTION)
     glLoadIdentity()
     glOrtho(-1, 1, -1, 1, -1, 1)
+    glMatrixMode(GL_MODELVIEW)
+    glLoadIdentity()
+    glClear(GL_COLOR_BUFFER_BIT | GL_DEPTH_BUFFER_BIT)
+    if mode != "bounce":
+        if mode == "nbody":
+            render_nbody()
+        else:
+            render_crowd()
+        text_renderer.flush()
+        return
+
+    # Draw heading, controls and gravity value
+    for block in static_text:
+        text_renderer.draw_block(block)
+    draw_text((-0.2, 0.7), f"Gravity: {abs(gravity):.4f}", size=32)
+
+    # Display velocity
+    draw_text((-0.2, 0.6), f"Velocity: {body[0, bounce.VY]:.4f}", size=32)
+    draw_text((-0.2, 0.5), f"Integrator: {integrators.get(integrator).label} (I)", size=24)
+
+    shown = sim_clock.interpolate(previous, body)
+    shapes.color(1, 0, 0)  # Red
+    draw_square(shown[0, bounce.X], shown[0, bounce.Y], SIZE)
+    shapes.flush()
+    text_renderer.flush()
 
 def main():
-    global y_velocity, is_dragging, gravity, gravity_step
-
-    init()
-
-    clock = pygame.time.Clock()
-
-    pos_x = START_POS_X
-    pos_y = START_POS_Y
-
-    running = True
-    while running:
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                running = False
-            elif event.type == KEYDOWN:
-                if event.key == K_ESCAPE:
-                    running = False
-                elif event.key == K_UP:
-                    gravity -= gravity_step
-                    gravity_step += 0.01  # Increase the step size
-                elif event.key == K_DOWN:
-                    gravity += gravity_step
-                    gravity_step += 0.01  # Increase the step size
-            elif event.type == MOUSEBUTTONDOWN:
-                is_dragging = True
-            elif event.type == MOUSEBUTTONUP:
-                is_dragging = False
-            elif event.type == MOUSEWHEEL:
-                gravity += event.y * gravity_step
-                gravity_step += 0.01  # Increase the step size
-
-        if is_dragging:
-            mouse_x, mouse_y = pygame.mouse.get_pos()
-            pos_x, pos_y = screen_to_world(mouse_x, mouse_y)
-            y_velocity = 0.0
-
-        glClear(GL_COLOR_BUFFER_BIT | GL_DEPTH_BUFFER_BIT)
-
-        # Draw heading and gravity value
-        draw_text((-0.35, 0.8), "Gravity Demonstration", size=48)
-        draw_text((-0.2, 0.7), f"Gravity: {abs(gravity):.4f}", size=32)
-        
-        # Display velocity
-        draw_text((-0.2, 0.6), f"Velocity: {y_velocity:.4f}", size=32)
-        
-        # Display controls
-        draw_text((-0.9, -0.9), "Controls:", size=24)
-        draw_text((-0.9, -0.95), "Press UP arrow key to decrease gravity", size=20)
-        draw_text((-0.9, -1.0), "Press DOWN arrow key to increase gravity", size=20)
-        draw_text((-0.9, -1.05), "Click and drag to move the object", size=20)
-        draw_text((-0.9, -1.1), "Scroll mouse wheel to adjust gravity", size=20)
-        draw_text((-0.9, -1.15), "Press ESC key to quit", size=20)
-
-        if not is_dragging:
-            # Apply gravity
-            y_velocity += gravity * 0.0001  # Scale gravity to match previous value
-
-        # Update position
-        pos_y += y_velocity
-
-        # Collision with ground
-        if pos_y - SIZE < -1:
-            pos_y = -1 + SIZE
-            y_velocity = -y_velocity * 0.8  # Bounce effect
-
-        glColor3f(1, 0, 0)  # Red
-        draw_square(pos_x, pos_y, SIZE)
-
-        pygame.display.flip()
-        clock.tick(60)  # Adjust frame rate (60 FPS here)
-
-    pygame.quit()
+    run_scene(sys.modules[__name__])
 
 if __name__ == "__main__":
     main()
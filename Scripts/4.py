@@ -1,3 +1,5 @@
+import os
+import sys
 import pygame
 from pygame.locals import *
 from OpenGL.GL import *
@@ -5,25 +7,51 @@ from OpenGL.GLU import *
 import numpy as np
 import math
 
-# Initialize Pygame and OpenGL
-pygame.init()
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from graphics.heatmap import HeatMap
+from graphics.meshes import SphereCache
+from graphics.salvo import Salvo
+from graphics.text import TextRenderer
+from graphics.trails import TrailBuffer
+from physics import integrators, projectile
+from physics.clock import SimulationClock
+from scene_host import FRAME_RATE, run_scene
+
 display = (1200, 800)
-screen = pygame.display.set_mode(display, DOUBLEBUF | OPENGL)
-gluPerspective(45, (display[0] / display[1]), 0.1, 100.0)
-glTranslatef(0.0, 0.0, -20)
+WINDOW_SIZE = display
+FIELD_OF_VIEW = 45
+CAMERA_DISTANCE = 20.0
+
+# Text rendering, cached sphere meshes and the salvo, created by init()
+text_renderer = None
+spheres = None
+salvo = None
 
 # Parameters for projectile motion
 height = 1.0
 force = 10.0
 angle = 45.0
-velocity = np.array([force * math.cos(math.radians(angle)),
-                     force * math.sin(math.radians(angle)),
-                     0.0])
-position = np.array([0.0, height, 0.0])
+state = projectile.initial_state([0.0, height, 0.0], projectile.launch_velocity(force, angle))
+position = state[0, projectile.POSITION]
+velocity = state[0, projectile.VELOCITY]
+previous = state.copy()
 gravity = np.array([0.0, -9.81, 0.0])
-trajectory = []
+trajectory = TrailBuffer(simplify=True)
 projecting = False
-range_displayed = False
+
+# Physics runs in fixed steps independent of the display rate; [ and ]
+# slow the simulation down or speed it up
+sim_clock = SimulationClock(dt=1 / 120)
+integrator = integrators.configured("semi_implicit_euler")  # I cycles through physics/integrators.py
+
+# Exact range, time of flight and apex for the current launch parameters
+flight = projectile.flight(height, force, angle, g=-gravity[1])
+
+# Range heat map over launch angle (across) and speed (up) at the current height
+RANGE_MAP_ANGLES = np.linspace(0.0, 90.0, 181)
+RANGE_MAP_SPEEDS = np.linspace(1.0, 30.0, 146)
+RANGE_MAP_RECT = (display[0] - 420, 20, 400, 300)
+range_map = None
 
 # Camera control variables
 camera_angle_x = 0
@@ -34,132 +62,169 @@ mouse_last_x, mouse_last_y = 0, 0
 
 # Function to reset the projectile
 def reset_projectile():
-    global position, velocity, trajectory, projecting, range_displayed
-    position = np.array([0.0, height, 0.0])
-    velocity = np.array([force * math.cos(math.radians(angle)),
-                         force * math.sin(math.radians(angle)),
-                         0.0])
-    trajectory = []
+    global projecting, flight
+    position[:] = (0.0, height, 0.0)
+    velocity[:] = projectile.launch_velocity(force, angle)
+    previous[:] = state
+    trajectory.clear()
     projecting = False
-    range_displayed = False
+    salvo.clear()
+    flight = projectile.flight(height, force, angle, g=-gravity[1])
+    if range_map:
+        update_range_map()
+
+# Solve the whole (speed, angle) grid in one call
+def update_range_map():
+    table = projectile.flight(height, RANGE_MAP_SPEEDS[:, None], RANGE_MAP_ANGLES[None, :], g=-gravity[1])
+    range_map.update(table.range)
+
+def toggle_range_map():
+    global range_map
+    if range_map:
+        range_map = None
+    else:
+        range_map = HeatMap(display)
+        update_range_map()
+
+# Control help, uploaded once as a static text block
+controls = [
+    "Controls:",
+    "Mouse: Rotate camera",
+    "Mouse Scroll: Zoom in/out",
+    "Up/Down: Adjust height",
+    "Left/Right: Adjust force",
+    "W/S: Adjust angle",
+    "Space: Start motion",
+    "K: Reset",
+    "[/]: Slower/faster",
+    "H: Range heat map",
+    "V: Fire a salvo, -/=: Salvo size",
+    "I: Next integrator",
+    "Q: Quit"
+]
+controls_block = None
+
+def init():
+    global text_renderer, spheres, salvo, controls_block
+    text_renderer = TextRenderer(display)
+    spheres = SphereCache(FIELD_OF_VIEW, display[1])
+    salvo = Salvo(spheres, sim_clock.dt, timer=lambda: sim_clock.timer())
+    controls_block = text_renderer.block(
+        [(10, display[1] - 30 - 30 * i, line) for i, line in enumerate(controls)], size=36)
+    sim_clock.reset()
 
 # Function to display controls and other text
 def display_text():
-    controls = [
-        "Controls:",
-        "Mouse: Rotate camera",
-        "Mouse Scroll: Zoom in/out",
-        "Up/Down: Adjust height",
-        "Left/Right: Adjust force",
-        "W/S: Adjust angle",
-        "Space: Start motion",
-        "K: Reset",
-        "Q: Quit"
-    ]
     height_text = f"Height: {height:.2f}"
     angle_text = f"Angle: {angle:.2f} degrees"
     velocity_text = f"Velocity: ({velocity[0]:.2f}, {velocity[1]:.2f}, {velocity[2]:.2f})"
-    range_text = f"Range: {trajectory[-1][0]:.2f}" if range_displayed else ""
-    y = 10
-    for line in controls:
-        render_text(line, 10, display[1] - y - 20)
-        y += 30
+    range_text = f"Range: {flight.range:.2f}"
+    flight_text = f"Time of flight: {flight.time:.2f} s, apex: {flight.apex:.2f}"
+    text_renderer.draw_block(controls_block)
+    y = 10 + 30 * len(controls)
     render_text(height_text, 10, display[1] - y - 20)
     y += 30
     render_text(angle_text, 10, display[1] - y - 20)
     y += 30
     render_text(velocity_text, 10, display[1] - y - 20)
-    if range_displayed:
-        y += 30
-        render_text(range_text, 10, display[1] - y - 20)
-
-# Function to draw a sphere
-def draw_sphere(radius, lat_bands, long_bands):
-    for i in range(lat_bands):
-        lat0 = math.pi * (-0.5 + float(i) / lat_bands)
-        z0 = math.sin(lat0)
-        zr0 = math.cos(lat0)
-        
-        lat1 = math.pi * (-0.5 + float(i + 1) / lat_bands)
-        z1 = math.sin(lat1)
-        zr1 = math.cos(lat1)
-
-        glBegin(GL_QUAD_STRIP)
-        for j in range(long_bands + 1):
-            lng = 2 * math.pi * float(j) / long_bands
-            x = math.cos(lng)
-            y = math.sin(lng)
-            glNormal3f(x * zr0, y * zr0, z0)
-            glVertex3f(x * zr0 * radius, y * zr0 * radius, z0 * radius)
-            glNormal3f(x * zr1, y * zr1, z1)
-            glVertex3f(x * zr1 * radius, y * zr1 * radius, z1 * radius)
-        glEnd()
+    y += 30
+    render_text(range_text, 10, display[1] - y - 20)
+    y += 30
+    render_text(flight_text, 10, display[1] - y - 20)
+    y += 30
+    render_text(f"Time scale: x{sim_clock.time_scale:.2f}, {integrators.get(integrator).label}", 10, display[1] - y - 20)
+    y += 30
+    render_text(f"Salvo: {salvo.count} ({len(salvo)} fired, {salvo.in_flight} in flight)", 10, display[1] - y - 20)
+    if range_map:
+        x, y, w, h = RANGE_MAP_RECT
+        text_renderer.draw(x, y + h + 6, "Range by angle 0-90 (across), speed 1-30 (up)", size=24)
 
 # Function to render text using OpenGL
 def render_text(text, x, y):
-    font = pygame.font.Font(None, 36)
-    text_surface = font.render(text, True, (255, 255, 255), (0, 0, 0))
-    text_data = pygame.image.tostring(text_surface, "RGBA", True)
-    glWindowPos2i(x, y)
-    glDrawPixels(text_surface.get_width(), text_surface.get_height(), GL_RGBA, GL_UNSIGNED_BYTE, text_data)
-
-# Main loop
-running = True
-clock = pygame.time.Clock()
-while running:
-    for event in pygame.event.get():
-        if event.type == pygame.QUIT or (event.type == KEYDOWN and event.key == K_q):
-            running = False
-        elif event.type == MOUSEBUTTONDOWN:
-            if event.button == 1:
-                mouse_down = True
-                mouse_last_x, mouse_last_y = event.pos
-            elif event.button == 4:
-                zoom *= 1.1
-            elif event.button == 5:
-                zoom /= 1.1
-        elif event.type == MOUSEBUTTONUP:
-            if event.button == 1:
-                mouse_down = False
-        elif event.type == MOUSEMOTION:
-            if mouse_down:
-                dx, dy = event.pos[0] - mouse_last_x, event.pos[1] - mouse_last_y
-                camera_angle_x += dy * 0.1
-                camera_angle_y += dx * 0.1
-                mouse_last_x, mouse_last_y = event.pos
-        elif event.type == KEYDOWN:
-            if event.key == K_UP:
-                height += 0.1
-                reset_projectile()
-            elif event.key == K_DOWN:
-                height -= 0.1
-                reset_projectile()
-            elif event.key == K_LEFT:
-                force -= 1.0
-                reset_projectile()
-            elif event.key == K_RIGHT:
-                force += 1.0
-                reset_projectile()
-            elif event.key == K_w:
-                angle += 1.0
-                reset_projectile()
-            elif event.key == K_s:
-                angle -= 1.0
-                reset_projectile()
-            elif event.key == K_SPACE and not projecting:
-                projecting = True
-            elif event.key == K_k:
-                reset_projectile()
-
-    if projecting:
-        velocity += gravity * clock.get_time() / 1000.0
-        position += velocity * clock.get_time() / 1000.0
-        trajectory.append(position.copy())
-        if position[1] <= 0:
-            position[1] = 0
+    text_renderer.draw(x, y, text, size=36)
+
+def handle_event(event):
+    global height, force, angle, projecting, zoom, mouse_down, mouse_last_x, mouse_last_y, camera_angle_x, camera_angle_y
+    global integrator
+    if event.type == KEYDOWN and event.key == K_q:
+        pygame.event.post(pygame.event.Event(pygame.QUIT))
+    elif event.type == MOUSEBUTTONDOWN:
+        if event.button == 1:
+            mouse_down = True
+            mouse_last_x, mouse_last_y = event.pos
+        elif event.button == 4:
+            zoom *= 1.1
+        elif event.button == 5:
+            zoom /= 1.1
+    elif event.type == MOUSEBUTTONUP:
+        if event.button == 1:
+            mouse_down = False
+    elif event.type == MOUSEMOTION:
+        if mouse_down:
+            dx, dy = event.pos[0] - mouse_last_x, event.pos[1] - mouse_last_y
+            camera_angle_x += dy * 0.1
+            camera_angle_y += dx * 0.1
+            mouse_last_x, mouse_last_y = event.pos
+    elif event.type == KEYDOWN:
+        if event.key == K_UP:
+            height += 0.1
+            reset_projectile()
+        elif event.key == K_DOWN:
+            height -= 0.1
+            reset_projectile()
+        elif event.key == K_LEFT:
+            force -= 1.0
+            reset_projectile()
+        elif event.key == K_RIGHT:
+            force += 1.0
+            reset_projectile()
+        elif event.key == K_w:
+            angle += 1.0
+            reset_projectile()
+        elif event.key == K_s:
+            angle -= 1.0
+            reset_projectile()
+        elif event.key == K_SPACE and not projecting:
+            projecting = True
+        elif event.key == K_k:
+            reset_projectile()
+        elif event.key == K_h:
+            toggle_range_map()
+        elif event.key == K_v:
+            salvo.fire((0.0, height, 0.0), projectile.launch_velocity(force, angle))
+        elif event.key == K_EQUALS:
+            salvo.bigger()
+        elif event.key == K_MINUS:
+            salvo.smaller()
+        elif event.key == K_i:
+            integrator = integrators.next_after(integrator)
+        elif event.key == K_LEFTBRACKET:
+            sim_clock.time_scale /= 2
+        elif event.key == K_RIGHTBRACKET:
+            sim_clock.time_scale *= 2
+
+def update():
+    global projecting
+    sim_clock.paused = not projecting
+    salvo.update(sim_clock.time_scale, gravity=gravity, ground=0.0, integrator=integrator)
+    landed = sim_clock.step(projectile.step, state, previous, gravity=gravity, ground=0.0, integrator=integrator)
+    if landed is not None:
+        trajectory.append(position)
+        if landed[0]:
+            previous[:] = state
             projecting = False
-            range_displayed = True
 
+# Nothing moves between launches unless a salvo is still in the air
+def frame_rate():
+    return FRAME_RATE if projecting or salvo.in_flight else 0
+
+def render():
+    glMatrixMode(GL_PROJECTION)
+    glLoadIdentity()
+    gluPerspective(FIELD_OF_VIEW, (display[0] / display[1]), 0.1, 100.0)
+    glMatrixMode(GL_MODELVIEW)
+    glLoadIdentity()
+    glTranslatef(0.0, 0.0, -CAMERA_DISTANCE)
     glClear(GL_COLOR_BUFFER_BIT | GL_DEPTH_BUFFER_BIT)
     glPushMatrix()
     glScalef(zoom, zoom, zoom)
@@ -176,29 +241,31 @@ while running:
     glEnd()
 
     # Draw projectile
+    # Zooming scales the scene, which looks the same as moving the camera closer
     glColor3f(1, 0, 0)
-    glPushMatrix()
-    glTranslatef(*position)
-    draw_sphere(0.1, 20, 20)
-    glPopMatrix()
+    spheres.draw(sim_clock.interpolate(previous, state)[0, projectile.POSITION], 0.1, CAMERA_DISTANCE / zoom)
 
     # Draw trajectory
     glColor3f(0, 1, 0)
-    glBegin(GL_LINE_STRIP)
-    for point in trajectory:
-        glVertex3fv(point)
-    glEnd()
+    trajectory.draw()
+
+    # Every projectile of the salvo in one draw, and all their trails in another
+    glColor3f(1, 0.3, 0)
+    salvo.draw(0.1, CAMERA_DISTANCE / zoom)
 
     glPopMatrix()
 
+    # Range heat map with the current launch marked
+    if range_map:
+        marker = (np.clip(angle / 90.0, 0, 1), np.clip((force - 1.0) / 29.0, 0, 1))
+        range_map.draw(*RANGE_MAP_RECT, marker=marker)
+
     # Display controls and other text
-    glPushMatrix()
-    glLoadIdentity()
-    glOrtho(0, display[0], 0, display[1], -1, 1)
     display_text()
-    glPopMatrix()
+    text_renderer.flush()
 
-    pygame.display.flip()
-    clock.tick(60)
+def main():
+    run_scene(sys.modules[__name__])
 
-pygame.quit()
+if __name__ == "__main__":
+    main()
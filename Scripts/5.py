@@ -0,0 +1,203 @@
+import os
+import sys
+import pygame
+from pygame.locals import *
+from OpenGL.GL import *
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+from graphics.heatmap import HeatMap
+from graphics.text import TextRenderer
+from graphics.trails import TrailBuffer
+from physics import chaos_map, double_pendulum, integrators
+from physics.clock import SimulationClock
+from scene_host import FRAME_RATE, run_scene
+
+WINDOW_WIDTH = 1200
+WINDOW_HEIGHT = 800
+WINDOW_SIZE = (WINDOW_WIDTH, WINDOW_HEIGHT)
+
+# The swinging pendulum on the left, drawn in pixels from its pivot
+PIVOT = (300, 520)
+PIXELS_PER_METRE = 120
+PARAMS = {name: value for name, value in chaos_map.DEFAULT_PARAMS.items() if name not in ("dt", "max_time")}
+
+# The chaos map on the right: every pixel is a pendulum released at rest
+# from its (theta1, theta2), coloured by the log of the time until it
+# first flips a rod over the top. Grey pixels never flip, or are not
+# computed yet. Finished tiles are kept in CACHE_DIR.
+MAP_RECT = (640, 170, 512, 512)
+TILE_RATE = 4  # frames per second while paused with tiles being computed
+CACHE_DIR = os.path.join(ROOT, "cache", "chaos_map")
+chaos = None
+heat_map = None
+
+# Released from rest at these angles; a click on the map picks new ones
+release = (2.0, 2.5)
+state = double_pendulum.initial_state(*release)
+previous = state.copy()
+sim_clock = SimulationClock(dt=1 / 240)
+integrator = integrators.configured("rk4")  # I cycles through physics/integrators.py
+path = TrailBuffer(2048)
+released_at = 0.0  # clock time of the release
+flip_time = None
+is_paused = False
+
+text_renderer = None
+help_block = None
+
+
+def init():
+    global text_renderer, help_block, chaos, heat_map
+    text_renderer = TextRenderer(WINDOW_SIZE)
+    help_block = text_renderer.block([
+        (10, 770, "Double Pendulum"),
+        (10, 60, "Click the map to release the pendulum from there, SPACE to pause, R to restart, I: integrator"),
+        (10, 30, "Arrow keys pan the map, = and - or the mouse wheel zoom"),
+    ])
+    chaos = chaos_map.ChaosMap(CACHE_DIR)
+    heat_map = HeatMap(WINDOW_SIZE)
+    sim_clock.reset()
+
+
+def restart():
+    global flip_time, released_at
+    state[:] = double_pendulum.initial_state(*release)
+    previous[:] = state
+    path.clear()
+    flip_time = None
+    released_at = sim_clock.time
+    sim_clock.reset()
+
+
+# (u, v) across the map for a window position, or None outside it
+def map_point(pos):
+    x, y, w, h = MAP_RECT
+    u = (pos[0] - x) / w
+    v = (WINDOW_HEIGHT - pos[1] - y) / h
+    return (u, v) if 0 <= u <= 1 and 0 <= v <= 1 else None
+
+
+def handle_event(event):
+    global release, is_paused, integrator
+    if event.type == KEYDOWN:
+        if event.key == K_SPACE:
+            is_paused = not is_paused
+        elif event.key == K_i:
+            integrator = integrators.next_after(integrator)
+        elif event.key == K_r:
+            restart()
+        elif event.key == K_LEFT:
+            chaos.pan(-1, 0)
+        elif event.key == K_RIGHT:
+            chaos.pan(1, 0)
+        elif event.key == K_UP:
+            chaos.pan(0, 1)
+        elif event.key == K_DOWN:
+            chaos.pan(0, -1)
+        elif event.key == K_EQUALS:
+            chaos.zoom(1)
+        elif event.key == K_MINUS:
+            chaos.zoom(-1)
+    elif event.type == MOUSEBUTTONDOWN:
+        point = map_point(event.pos)
+        if point is None:
+            return
+        if event.button == 1:
+            release = chaos.angles(*point)
+            restart()
+        elif event.button == 4:
+            chaos.zoom(1, *point)
+        elif event.button == 5:
+            chaos.zoom(-1, *point)
+
+
+def update():
+    global flip_time
+    # Collect finished tiles and hand out more work
+    chaos.update()
+    if chaos.changed:
+        params = chaos.params
+        heat_map.update(np.log10(chaos.image()), np.log10(params["dt"]), np.log10(params["max_time"]))
+
+    sim_clock.paused = is_paused
+    if sim_clock.step(double_pendulum.step, state, previous, integrator=integrator, **PARAMS) is not None:
+        _, _, x2, y2 = double_pendulum.bob_positions(state, PIVOT, PIXELS_PER_METRE, PIXELS_PER_METRE)
+        path.append((x2[0], y2[0], 0.0))
+        if flip_time is None and np.any(np.abs(state[0, :2]) > np.pi):
+            flip_time = sim_clock.time - released_at
+
+
+# Paused, the scene only changes when a tile comes in
+def frame_rate():
+    if not is_paused:
+        return FRAME_RATE
+    return TILE_RATE if chaos.pending else 0
+
+
+def draw_pendulum(shown):
+    x1, y1, x2, y2 = double_pendulum.bob_positions(shown, PIVOT, PIXELS_PER_METRE, PIXELS_PER_METRE)
+    glColor3f(0.3, 0.5, 1.0)
+    path.draw()
+    glColor3f(1, 1, 1)
+    glLineWidth(3)
+    glBegin(GL_LINE_STRIP)
+    glVertex2f(*PIVOT)
+    glVertex2f(x1[0], y1[0])
+    glVertex2f(x2[0], y2[0])
+    glEnd()
+    glLineWidth(1)
+    glPointSize(14)
+    glBegin(GL_POINTS)
+    glColor3f(1, 0.3, 0.2)
+    glVertex2f(x1[0], y1[0])
+    glVertex2f(x2[0], y2[0])
+    glEnd()
+    glPointSize(1)
+
+
+def render():
+    glMatrixMode(GL_PROJECTION)
+    glLoadIdentity()
+    glOrtho(0, WINDOW_WIDTH, 0, WINDOW_HEIGHT, -1, 1)
+    glMatrixMode(GL_MODELVIEW)
+    glLoadIdentity()
+    glClear(GL_COLOR_BUFFER_BIT | GL_DEPTH_BUFFER_BIT)
+
+    draw_pendulum(sim_clock.interpolate(previous, state))
+
+    # The map, with the current release point marked when it is in view
+    x, y, size = chaos.extent()
+    marker = (((release[0] - x) % (2 * np.pi)) / size, ((release[1] - y) % (2 * np.pi)) / size)
+    heat_map.draw(*MAP_RECT, marker if max(marker) <= 1 else None)
+
+    draw = text_renderer.draw
+    text_renderer.draw_block(help_block)
+    draw(10, 730, f"Released from theta1 {np.degrees(release[0]):.2f}, theta2 {np.degrees(release[1]):.2f} degrees")
+    draw(10, 700, f"First flip: {flip_time:.2f} s" if flip_time is not None else
+         f"No flip yet ({sim_clock.time - released_at:.1f} s)")
+    released = double_pendulum.energy(double_pendulum.initial_state(*release), **PARAMS)[0]
+    drift = double_pendulum.energy(state, **PARAMS)[0] - released
+    draw(10, 670, f"{integrators.get(integrator).label}, energy drift {drift:+.2e} J")
+    done, total = chaos.progress()
+    draw(640, 730, f"theta1 {np.degrees(x):.2f} to {np.degrees(x + size):.2f}, "
+                   f"theta2 {np.degrees(y):.2f} to {np.degrees(y + size):.2f} (zoom {2 ** chaos.level}x)")
+    draw(640, 130, f"Tiles: {done}/{total} at full resolution, {len(chaos.pending)} being computed "
+                   f"on {chaos.workers} workers")
+    failed = f", {len(chaos.failed)} failed" if chaos.failed else ""
+    draw(640, 100, f"{chaos.computed} pendulums computed, {chaos.loaded} tiles from the cache{failed}")
+    text_renderer.flush()
+
+
+# The map's worker processes end with the scene
+def close():
+    chaos.close()
+
+
+def main():
+    run_scene(sys.modules[__name__])
+
+
+if __name__ == "__main__":
+    main()
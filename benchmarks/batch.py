@@ -0,0 +1,105 @@
+# Cost of drawing many squares on rods, as Scripts/2.py draws its
+# pendulums: a glBegin/glEnd block per primitive against a PrimitiveBatch
+# filled one primitive at a time and filled with arrays.
+#
+#   python benchmarks/batch.py [--counts 10 100 1000 10000] [--frames 20]
+#
+# Runs without a window through EGL (see export.py) and draws into an
+# offscreen framebuffer. Times include glFinish, so they cover the work
+# the driver does as well as the Python calls.
+import argparse
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+from graphics.headless import create_context  # before anything imports OpenGL
+
+import numpy as np
+from OpenGL.GL import *
+
+from graphics.batch import PrimitiveBatch
+from graphics.capture import FrameCapture
+
+SIZE = 512
+HALF = 0.01
+
+
+def immediate(origins, bobs):
+    for origin, bob in zip(origins, bobs):
+        glBegin(GL_LINES)
+        glVertex2f(*origin)
+        glVertex2f(*bob)
+        glEnd()
+        x, y = bob
+        glBegin(GL_QUADS)
+        glVertex2f(x - HALF, y - HALF)
+        glVertex2f(x + HALF, y - HALF)
+        glVertex2f(x + HALF, y + HALF)
+        glVertex2f(x - HALF, y + HALF)
+        glEnd()
+    return 2 * len(bobs)
+
+
+def batched(batch):
+    def draw(origins, bobs):
+        for origin, bob in zip(origins, bobs):
+            batch.line(origin, bob)
+            batch.rect(bob[0] - HALF, bob[1] - HALF, 2 * HALF, 2 * HALF)
+        batch.flush()
+        return batch.draw_calls
+    return draw
+
+
+def batched_arrays(batch):
+    def draw(origins, bobs):
+        batch.lines_many(origins, bobs)
+        batch.squares_many(bobs, HALF)
+        batch.flush()
+        return batch.draw_calls
+    return draw
+
+
+# Milliseconds per frame and draw calls per frame
+def per_frame(draw, origins, bobs, frames):
+    draw(origins, bobs)  # let arrays grow to size first
+    glFinish()
+    start = time.perf_counter()
+    for _ in range(frames):
+        glClear(GL_COLOR_BUFFER_BIT)
+        calls = draw(origins, bobs)
+    glFinish()
+    return (time.perf_counter() - start) / frames * 1000, calls
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Cost of drawing many squares on rods with glBegin/glEnd against a PrimitiveBatch.')
+    parser.add_argument("--counts", type=int, nargs="+", default=[10, 100, 1000, 10000])
+    parser.add_argument("--frames", type=int, default=20)
+    args = parser.parse_args()
+
+    create_context()
+    capture = FrameCapture(SIZE, SIZE)
+    capture.bind()
+    glMatrixMode(GL_PROJECTION)
+    glOrtho(-1, 1, -1, 1, -1, 1)
+    glMatrixMode(GL_MODELVIEW)
+    glColor3f(1, 0, 0)
+
+    rng = np.random.default_rng(0)
+    methods = {"glBegin": immediate, "batch": batched(PrimitiveBatch()),
+               "arrays": batched_arrays(PrimitiveBatch())}
+    print(f"{'bodies':>8}" + "".join(f"{name + ' ms':>12}{'calls':>8}" for name in methods))
+    for count in args.counts:
+        origins = rng.uniform(-1, 1, (count, 2)).astype(np.float32)
+        bobs = (origins + rng.uniform(-0.1, 0.1, (count, 2))).astype(np.float32)
+        row = f"{count:>8}"
+        for draw in methods.values():
+            ms, calls = per_frame(draw, origins, bobs, args.frames)
+            row += f"{ms:>12.2f}{calls:>8}"
+        print(row)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+# Steps needed to land a projectile within a given distance of its true
+# impact point: adaptive Dormand-Prince (physics/drag.py) against the
+# fixed-step Euler that samp.py used, which stops at the first step below
+# the ground.
+#
+#   python benchmarks/drag.py [--tolerances 1e-2 1e-4 1e-6] [--max-steps 2000000]
+#
+# The true impact comes from the adaptive solver at a tolerance of 1e-12.
+# Euler's step is halved until its impact point is close enough or the
+# flight would take more than --max-steps steps.
+import argparse
+import math
+import os
+import sys
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+from physics import drag, projectile
+
+COEFFICIENTS = {"none": 0.0, "linear": 0.3, "quadratic": 0.02}
+WIND = (0.0, 0.0, 3.0)
+
+
+# Semi-implicit Euler as in projectile.step, on plain floats for speed.
+# Returns the impact point and the number of steps taken.
+def euler_impact(y0, dt, model, k, wind, max_steps):
+    x, y, z, vx, vy, vz = map(float, y0)
+    g = float(projectile.GRAVITY[1])
+    wx, wy, wz = wind
+    for n in range(1, max_steps + 1):
+        rx, ry, rz = vx - wx, vy - wy, vz - wz
+        scale = k if model == "linear" else k * math.sqrt(rx * rx + ry * ry + rz * rz) if model == "quadratic" else 0.0
+        vx -= scale * rx * dt
+        vy += (g - scale * ry) * dt
+        vz -= scale * rz * dt
+        x, y, z = x + vx * dt, y + vy * dt, z + vz * dt
+        if y <= 0.0:
+            return np.array([x, 0.0, z]), n
+    return None, max_steps
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Steps the adaptive solver and fixed-step Euler need to land within a distance of the true impact.')
+    parser.add_argument("--tolerances", type=float, nargs="+", default=[1e-2, 1e-4, 1e-6])
+    parser.add_argument("--max-steps", type=int, default=2_000_000)
+    args = parser.parse_args()
+
+    y0 = np.r_[0.0, 0.0, 0.0, projectile.launch_velocity(15.0, 45.0)]
+    print(f"{'model':<10}{'tolerance':>10}{'RK45 steps':>12}{'evals':>8}{'error':>10}"
+          f"{'Euler steps':>14}{'error':>10}")
+    for model, k in COEFFICIENTS.items():
+        wind = WIND if k else (0.0, 0.0, 0.0)
+        exact = drag.solve(y0, model=model, k=k, wind=wind, rtol=1e-12, atol=1e-12).impact[1][:3]
+        for tolerance in args.tolerances:
+            flight = drag.solve(y0, model=model, k=k, wind=wind, rtol=tolerance, atol=tolerance * 1e-3)
+            error = np.linalg.norm(flight.impact[1][:3] - exact)
+
+            dt, euler_error, steps = 0.05, math.inf, 0
+            while euler_error > tolerance and steps < args.max_steps:
+                point, steps = euler_impact(y0, dt, model, k, wind, args.max_steps)
+                if point is None:
+                    break
+                euler_error = np.linalg.norm(point - exact)
+                dt /= 2
+            euler = f"{steps}" if euler_error <= tolerance else f">{args.max_steps}"
+            print(f"{model:<10}{tolerance:>10.0e}{flight.steps + flight.rejected:>12}{flight.evaluations:>8}"
+                  f"{error:>10.1e}{euler:>14}{euler_error:>10.1e}")
+
+
+if __name__ == "__main__":
+    main()
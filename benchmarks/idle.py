@@ -0,0 +1,61 @@
+# CPU used by each scene left alone in its own window, as a share of one
+# core, with the frames per second it drew.
+#
+#   python benchmarks/idle.py [--seconds 10] [--settle 4] [--save results.json]
+#
+# Every scene runs untouched for the given time; readings from the first
+# --settle seconds are left out, which gives the projectile scenes time to
+# land. Scenes that stop changing should sit near zero, while the ones
+# that keep animating show what a full-rate window costs for comparison.
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+from scene_host import SCENES
+
+
+# Median CPU share and frame rate of a scene after it has settled
+def measure(name, seconds, settle):
+    env = dict(os.environ, CPU_BENCHMARK=str(seconds))
+    command = [sys.executable, os.path.join(ROOT, "scene_host.py"), name]
+    result = subprocess.run(command, env=env, cwd=ROOT, capture_output=True, text=True, timeout=seconds + 120)
+    readings = [line.split() for line in result.stdout.splitlines() if line.startswith("cpu ")]
+    settled = readings[int(settle):]
+    if not settled:
+        error = (result.stderr.strip().splitlines() or ["no CPU readings reported"])[-1]
+        raise RuntimeError(error)
+    return {"cpu": statistics.median(float(r[1]) for r in settled),
+            "fps": statistics.median(float(r[3]) for r in settled)}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='CPU share and frame rate of every scene left alone in its own window.')
+    parser.add_argument("--seconds", type=float, default=10, help="how long each scene runs")
+    parser.add_argument("--settle", type=float, default=4, help="seconds left out at the start")
+    parser.add_argument("--save", help="write the results to this JSON file")
+    args = parser.parse_args(argv)
+
+    results = {}
+    print(f"{'scene':<20} {'cpu %':>7} {'fps':>6}")
+    for name in SCENES:
+        try:
+            results[name] = measure(name, args.seconds, args.settle)
+        except (RuntimeError, subprocess.TimeoutExpired) as e:
+            print(f"{name:<20} failed: {e}")
+            continue
+        print(f"{name:<20} {results[name]['cpu'] * 100:7.1f} {results[name]['fps']:6.1f}")
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(results, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,230 @@
+# Accuracy against cost of every integrator in physics/integrators.py on
+# every model that can use one, to pick the cheapest integrator that meets
+# an accuracy target.
+#
+#   python benchmarks/integrators.py [--models pendulum nbody] [--bodies 100] [--levels 7]
+#                                    [--target 1e-6] [--metric position] [--plot integrators.png]
+#
+# Each model runs a batch of bodies for a fixed simulated time under each
+# integrator, at step counts that double from a coarse start. A run
+# reports the CPU time its steps took, the largest position error at the
+# end against a reference (Runge-Kutta 4 at four times the finest step
+# count), and the largest energy drift, relative to the starting energy,
+# seen at 20 points along the way. Floors and walls are kept where they
+# shape the motion: the bounce keeps its floor, with a restitution of 1
+# so that energy is conserved, which holds every integrator to first
+# order there.
+#
+# The table ends with the cheapest run of each model within --target for
+# --metric. --plot draws error against CPU time for every model, both
+# metrics, one line per integrator, into a PNG.
+#
+# Each model's own scheme runs compiled for 64 or more bodies when Numba
+# is installed (physics/kernels.py), which makes it look cheaper than
+# the same scheme through the registry; PHYSICS_BACKEND=numpy compares
+# NumPy with NumPy.
+import argparse
+import itertools
+import math
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+
+import numpy as np
+import pygame
+
+from physics import bounce, double_pendulum, integrators, kernels, motion, nbody, pendulum, projectile
+
+SAMPLES = 20  # energy checks per run
+FLOOR = 1e-16  # errors below this are drawn at it
+REFERENCE = "rk4"
+DOUBLE_PENDULUM = {"gravity": 9.81, "length1": 1.0, "length2": 1.0, "mass1": 1.0, "mass2": 1.0}
+LOWEST = double_pendulum.potential(0.0, 0.0, **DOUBLE_PENDULUM)
+
+
+# One test problem per model: (name, state, step(state, dt, n_steps,
+# integrator), energy(state), position columns, simulated seconds, coarsest
+# step count). Energies are measured from each model's lowest point, so
+# that the drift relative to them means the same for every model.
+def problems(n, rng):
+    state = motion.initial_state(np.zeros(n), rng.uniform(0.5, 1.5, n), rng.uniform(-1, 1, n))
+    yield ("motion", state,
+           lambda s, dt, steps, name: motion.step(s, dt, steps, x_max=np.inf, integrator=name),
+           lambda s: 0.5 * s[:, motion.VELOCITY] ** 2 - s[:, motion.ACCELERATION] * s[:, motion.X] + 2,
+           slice(motion.X, motion.X + 1), 2.0, 20)
+
+    state = pendulum.initial_state(rng.uniform(0.1, 3.0, n))
+    yield ("pendulum", state,
+           lambda s, dt, steps, name: pendulum.step(s, dt, steps, gravity=9.81, integrator=name),
+           lambda s: 0.5 * s[:, pendulum.OMEGA] ** 2 + 9.81 * (1 - np.cos(s[:, pendulum.THETA])),
+           slice(pendulum.THETA, pendulum.THETA + 1), 10.0, 100)
+
+    state = bounce.initial_state(np.zeros(n), rng.uniform(-0.5, 0.5, n), rng.uniform(-1, 1, n))
+    yield ("bounce", state,
+           lambda s, dt, steps, name: bounce.step(s, dt, steps, gravity=-9.81, restitution=1.0, integrator=name),
+           lambda s: 0.5 * (s[:, bounce.VX] ** 2 + s[:, bounce.VY] ** 2) + 9.81 * (s[:, bounce.Y] + 1),
+           slice(bounce.X, bounce.Y + 1), 3.0, 60)
+
+    state = projectile.salvo((0.0, 1.0, 0.0), (10.0, 10.0, 0.0), n, rng=rng)
+    yield ("projectile", state,
+           lambda s, dt, steps, name: projectile.step(s, dt, steps, ground=-np.inf, integrator=name),
+           lambda s: 0.5 * np.einsum("ij,ij->i", s[:, projectile.VELOCITY], s[:, projectile.VELOCITY])
+           + 9.81 * s[:, 1] + 100,
+           projectile.POSITION, 2.0, 20)
+
+    state = double_pendulum.initial_state(rng.uniform(0.5, 1.5, n), rng.uniform(0.5, 1.5, n))
+    yield ("double_pendulum", state,
+           lambda s, dt, steps, name: double_pendulum.step(s, dt, steps, integrator=name, **DOUBLE_PENDULUM),
+           lambda s: double_pendulum.energy(s, **DOUBLE_PENDULUM) - LOWEST,
+           slice(double_pendulum.THETA1, double_pendulum.THETA2 + 1), 5.0, 250)
+
+    # The whole galaxy is one system, so its energy is a single number
+    state = nbody.galaxy(n)
+    yield ("nbody", state,
+           lambda s, dt, steps, name: nbody.step(s, dt, steps, method="direct", integrator=name),
+           lambda s: np.atleast_1d(nbody.energy(s)),
+           nbody.POSITION, 0.5, 25)
+
+
+# CPU seconds, final state and largest relative energy drift of one run
+def run(state, step, energy, duration, steps, name):
+    state = state.copy()
+    start_energy = energy(state)
+    drift = 0.0
+    cpu = 0.0
+    for chunk in np.array_split(np.arange(steps), min(SAMPLES, steps)):
+        started = time.process_time()
+        step(state, duration / steps, len(chunk), name)
+        cpu += time.process_time() - started
+        drift = max(drift, np.max(np.abs(energy(state) - start_energy) / np.abs(start_energy)))
+    return cpu, state, drift
+
+
+def cheapest(runs, metric, target):
+    within = [run for run in runs if run[metric] <= target]
+    return min(within, key=lambda run: run["cpu"]) if within else None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Accuracy against CPU time of every integrator on every model.")
+    parser.add_argument("--models", nargs="+", help="models to run (default: all)")
+    parser.add_argument("--integrators", nargs="+", default=list(integrators.INTEGRATORS),
+                        choices=list(integrators.INTEGRATORS))
+    parser.add_argument("--bodies", type=int, default=100)
+    parser.add_argument("--levels", type=int, default=7, help="step counts per integrator, doubling each time")
+    parser.add_argument("--target", type=float, default=1e-6, help="accuracy to meet")
+    parser.add_argument("--metric", choices=("position", "energy"), default="position")
+    parser.add_argument("--plot", help="draw error against CPU time into this PNG")
+    args = parser.parse_args()
+
+    print(f"Physics kernels: {kernels.describe()}")
+    kernels.warm_up()
+    rng = np.random.default_rng(0)
+    report = {}
+    for model, state, step, energy, positions, duration, coarse in problems(args.bodies, rng):
+        if args.models and model not in args.models:
+            continue
+        finest = coarse * 2 ** (args.levels - 1)
+        _, reference, _ = run(state, step, energy, duration, 4 * finest, REFERENCE)
+        print(f"\n{model}: {len(state)} bodies for {duration} s, reference {REFERENCE} with {4 * finest} steps")
+        print(f"{'integrator':<28}{'steps':>8}{'dt':>11}{'CPU ms':>10}{'position error':>16}{'energy drift':>14}")
+        runs = report[model] = []
+        for name in args.integrators:
+            for level in range(args.levels):
+                steps = coarse * 2 ** level
+                cpu, final, drift = run(state, step, energy, duration, steps, name)
+                error = np.max(np.abs(final[:, positions] - reference[:, positions]))
+                runs.append({"integrator": name, "steps": steps, "cpu": cpu, "position": error, "energy": drift})
+                print(f"{integrators.get(name).label:<28}{steps:>8}{duration / steps:>11.2e}{cpu * 1000:>10.1f}"
+                      f"{error:>16.2e}{drift:>14.2e}")
+
+    print(f"\nCheapest within {args.target:g} {args.metric} error:")
+    for model, runs in report.items():
+        best = cheapest(runs, args.metric, args.target)
+        if best is None:
+            print(f"  {model:<16} none; try more --levels")
+        else:
+            print(f"  {model:<16} {integrators.get(best['integrator']).label}, {best['steps']} steps, "
+                  f"{best['cpu'] * 1000:.1f} ms ({best[args.metric]:.1e})")
+    if args.plot:
+        plot(report, args.target, args.plot)
+        print(f"Saved {args.plot}")
+
+
+# One panel per model and metric, errors against CPU time on log axes
+PANEL = (440, 240)
+MARGIN = (64, 36, 16, 28)  # left, bottom, right, top
+PALETTE = [(230, 70, 60), (240, 170, 40), (60, 170, 90), (60, 120, 230), (170, 90, 210), (40, 180, 190)]
+
+
+def plot(report, target, path):
+    pygame.font.init()
+    font = pygame.font.Font(None, 20)
+    names = list(dict.fromkeys(run["integrator"] for runs in report.values() for run in runs))
+    colors = dict(zip(names, itertools.cycle(PALETTE)))
+    legend = 30
+    surface = pygame.Surface((2 * PANEL[0], legend + len(report) * PANEL[1]))
+    surface.fill((255, 255, 255))
+    x = 10
+    for name in names:
+        pygame.draw.line(surface, colors[name], (x, 15), (x + 20, 15), 3)
+        label = font.render(integrators.get(name).label, True, (0, 0, 0))
+        surface.blit(label, (x + 26, 8))
+        x += 40 + label.get_width()
+    for row, (model, runs) in enumerate(report.items()):
+        for column, metric in enumerate(("position", "energy")):
+            rect = pygame.Rect(column * PANEL[0], legend + row * PANEL[1], *PANEL)
+            title = f"{model}: {'position error' if metric == 'position' else 'energy drift'} against CPU s"
+            draw_panel(surface, font, rect, title, runs, metric, colors, target)
+    pygame.image.save(surface, path)
+
+
+def draw_panel(surface, font, rect, title, runs, metric, colors, target):
+    left, bottom, right, top = MARGIN
+    area = rect.move(left, top)
+    area.size = (rect.width - left - right, rect.height - top - bottom)
+    xs = [math.log10(max(run["cpu"], 1e-6)) for run in runs]
+    ys = [math.log10(max(run[metric], FLOOR)) for run in runs]
+    x_range = (math.floor(min(xs)), math.ceil(max(xs)) + (min(xs) == max(xs)))
+    y_range = (math.floor(min(ys)), math.ceil(max(ys)) + (min(ys) == max(ys)))
+
+    def to_pixels(x, y):
+        u = (x - x_range[0]) / (x_range[1] - x_range[0])
+        v = (y - y_range[0]) / (y_range[1] - y_range[0])
+        return area.left + u * area.width, area.bottom - v * area.height
+
+    black, grey = (0, 0, 0), (220, 220, 220)
+    surface.blit(font.render(title, True, black), (rect.left + left, rect.top + 6))
+    y_step = max(1, (y_range[1] - y_range[0]) // 6)
+    for decade in range(y_range[0], y_range[1] + 1, y_step):
+        _, y = to_pixels(x_range[0], decade)
+        pygame.draw.line(surface, grey, (area.left, y), (area.right, y))
+        label = font.render(f"1e{decade}", True, black)
+        surface.blit(label, (area.left - label.get_width() - 4, y - 7))
+    for decade in range(x_range[0], x_range[1] + 1):
+        x, _ = to_pixels(decade, y_range[0])
+        pygame.draw.line(surface, grey, (x, area.top), (x, area.bottom))
+        label = font.render(f"1e{decade}", True, black)
+        surface.blit(label, (x - label.get_width() / 2, area.bottom + 6))
+    pygame.draw.rect(surface, black, area, 1)
+
+    # The target as a dashed line
+    level = math.log10(target)
+    if y_range[0] <= level <= y_range[1]:
+        _, y = to_pixels(x_range[0], level)
+        for x in range(area.left, area.right, 8):
+            pygame.draw.line(surface, black, (x, y), (min(x + 4, area.right), y))
+    for name in colors:
+        points = [to_pixels(x, y) for run, x, y in zip(runs, xs, ys) if run["integrator"] == name]
+        if len(points) > 1:
+            pygame.draw.lines(surface, colors[name], False, points, 2)
+        for point in points:
+            pygame.draw.circle(surface, colors[name], point, 3)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+# Step cost of the pendulum, bounce and projectile models with the
+# compiled kernels against the NumPy code they fall back to, for batches
+# of different sizes, and how far the two backends' results drift apart.
+#
+#   python benchmarks/kernels.py [--bodies 100 10000 1000000] [--steps 100]
+#
+# Starts by reporting the backend and the time the kernels take to get
+# ready: the first run on a machine compiles them, later runs load them
+# from the disk cache. Without Numba only the NumPy column is filled in.
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+from physics import bounce, kernels, pendulum, projectile
+
+
+# (name, state, step(state, steps)) for each model with n bodies
+def models(n, rng):
+    lengths = rng.uniform(0.5, 1.5, n)
+    yield "pendulum", pendulum.initial_state(rng.uniform(-3, 3, n)), \
+        lambda state, steps: pendulum.step(state, 0.5, steps, length=lengths, damping=0.999)
+    yield "bounce", bounce.initial_state(np.zeros(n), rng.uniform(0, 1, n)), \
+        lambda state, steps: bounce.step(state, 0.01, steps, floor=-1.0, restitution=0.8)
+    yield "projectile", projectile.salvo((0, 1, 0), (10, 10, 0), n, rng=rng), \
+        lambda state, steps: projectile.step(state, 0.001, steps)
+
+
+
+# Seconds per body-step and the final state for one backend
+def run(backend, state, step, steps):
+    kernels.BACKEND = backend
+    state = state.copy()
+    step(state.copy(), 1)  # compile or load before timing
+    start = time.perf_counter()
+    step(state, steps)
+    return (time.perf_counter() - start) / (steps * len(state)), state
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Step cost of the compiled kernels against their NumPy fallback, and how far the two drift apart.')
+    parser.add_argument("--bodies", type=int, nargs="+", default=[100, 10_000, 1_000_000])
+    parser.add_argument("--steps", type=int, default=100)
+    args = parser.parse_args()
+
+    available = kernels.BACKEND
+    print(f"Physics kernels: {kernels.describe()}")
+    for name, elapsed in kernels.warm_up().items():
+        print(f"  ready {name:<11}{elapsed * 1000:9.1f} ms")
+
+    rng = np.random.default_rng(0)
+    print(f"{'model':<11}{'bodies':>9}{'numpy ns':>10}{'numba ns':>10}{'speedup':>9}{'max diff':>10}")
+    for n in args.bodies:
+        for name, state, step in models(n, rng):
+            numpy_time, expected = run("numpy", state, step, args.steps)
+            row = f"{name:<11}{n:>9}{numpy_time * 1e9:>10.1f}"
+            if available == "numba":
+                numba_time, result = run("numba", state, step, args.steps)
+                row += f"{numba_time * 1e9:>10.1f}{numpy_time / numba_time:>9.1f}" \
+                       f"{np.abs(result - expected).max():>10.1e}"
+            print(row)
+    kernels.BACKEND = available
+
+
+if __name__ == "__main__":
+    main()
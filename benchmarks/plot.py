@@ -0,0 +1,49 @@
+# Cost of appending a sample to a plot series and of computing the columns
+# a plot panel draws, for histories of different lengths.
+#
+#   python benchmarks/plot.py [--histories 1000 100000 10000000] [--width 800]
+#
+# Every history lives in a series of the same capacity, so only the number
+# of samples held changes. Columns are timed for the whole history and for
+# the last 10% of it; both should stay flat as the history grows.
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+from graphics.plot import Series
+
+
+def per_call(function, repeats):
+    start = time.perf_counter()
+    for _ in range(repeats):
+        function()
+    return (time.perf_counter() - start) / repeats
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Cost of appending to a plot series and of computing the columns a panel draws, by history length.')
+    parser.add_argument("--histories", type=int, nargs="+", default=[1_000, 100_000, 10_000_000])
+    parser.add_argument("--width", type=int, default=800, help="panel width in pixels")
+    parser.add_argument("--capacity", type=int, default=1 << 24)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    print(f"{'samples':>10}{'append us':>11}{'all us':>9}{'recent us':>11}{'columns':>9}")
+    for history in args.histories:
+        series = Series(args.capacity)
+        series.extend(np.cumsum(rng.normal(size=history)))
+        values = iter(rng.normal(size=20000))
+        append = per_call(lambda: series.append(next(values)), 20000)
+        whole = per_call(lambda: series.columns(series.first, series.count, args.width), 200)
+        recent = per_call(lambda: series.columns(series.count - len(series) // 10, series.count, args.width), 200)
+        columns = len(series.columns(series.first, series.count, args.width)[0])
+        print(f"{len(series):>10}{append * 1e6:>11.2f}{whole * 1e6:>9.1f}{recent * 1e6:>11.1f}{columns:>9}")
+
+
+if __name__ == "__main__":
+    main()
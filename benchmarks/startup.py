@@ -0,0 +1,93 @@
+# Cold and warm startup benchmark: time from starting a fresh interpreter
+# to the first frame on screen, for the launcher and for every scene.
+#
+#   python benchmarks/startup.py [--runs 5] [--save results.json] [--baseline results.json]
+#
+# A cold run gets an empty bytecode cache, so everything it imports is
+# compiled again, as on a first launch. Warm runs share a cache that has
+# already been filled. With --baseline, any median more than --tolerance
+# slower than the saved one is reported and the exit status is 1.
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+from scene_host import SCENES
+
+
+def targets():
+    yield "launcher", [sys.executable, os.path.join(ROOT, "main.py")]
+    for name in SCENES:
+        yield name, [sys.executable, os.path.join(ROOT, "scene_host.py"), name]
+
+
+# Seconds from spawning the command to its first frame
+def time_to_first_frame(command, cache_dir):
+    env = dict(os.environ, STARTUP_BENCHMARK="1", PYTHONPYCACHEPREFIX=cache_dir)
+    start = time.time()
+    result = subprocess.run(command, env=env, cwd=ROOT, capture_output=True, text=True, timeout=120)
+    for line in result.stdout.splitlines():
+        if line.startswith("first frame "):
+            return float(line.split()[2]) - start
+    error = (result.stderr.strip().splitlines() or ["no first frame reported"])[-1]
+    raise RuntimeError(error)
+
+
+def measure(command, runs):
+    cold = []
+    for _ in range(runs):
+        with tempfile.TemporaryDirectory() as cache_dir:
+            cold.append(time_to_first_frame(command, cache_dir))
+    with tempfile.TemporaryDirectory() as cache_dir:
+        time_to_first_frame(command, cache_dir)  # fill the cache
+        warm = [time_to_first_frame(command, cache_dir) for _ in range(runs)]
+    return {"cold": statistics.median(cold), "warm": statistics.median(warm),
+            "cold_min": min(cold), "warm_min": min(warm)}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Time from a fresh interpreter to the first frame, cold and warm, for the launcher and every scene.')
+    parser.add_argument("--runs", type=int, default=5, help="runs per target and mode")
+    parser.add_argument("--save", help="write the results to this JSON file")
+    parser.add_argument("--baseline", help="compare against results saved earlier")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed slowdown, as a fraction")
+    args = parser.parse_args(argv)
+
+    results = {}
+    print(f"{'target':<20} {'cold ms':>9} {'warm ms':>9}")
+    for name, command in targets():
+        try:
+            results[name] = measure(command, args.runs)
+        except (RuntimeError, subprocess.TimeoutExpired) as e:
+            print(f"{name:<20} failed: {e}")
+            continue
+        print(f"{name:<20} {results[name]['cold'] * 1000:9.1f} {results[name]['warm'] * 1000:9.1f}")
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(results, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = [
+            f"{name} {mode}: {baseline[name][mode] * 1000:.1f} -> {times[mode] * 1000:.1f} ms"
+            for name, times in results.items() if name in baseline
+            for mode in ("cold", "warm")
+            if times[mode] > baseline[name][mode] * (1 + args.tolerance)
+        ]
+        for line in regressions:
+            print("slower:", line)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,360 @@
+# Regression benchmark suite: physics steps per second for every scene
+# model, frame times of every scene at several body and trajectory
+# sizes, the cost of drawing text and of the sphere drawing in
+# Scripts/4.py and samp.py.
+#
+#   python benchmarks/suite.py run [--quick] [--only physics frames text spheres] [--save results.json]
+#   python benchmarks/suite.py compare baseline.json results.json [--threshold 0.15]
+#
+# Everything is drawn into an offscreen framebuffer through EGL, as in
+# export.py, so the suite runs on CPU-only machines with software Mesa
+# (llvmpipe) and no display. Frame and draw times include glFinish, so
+# they cover the rasterising as well as the Python side. Scene clocks
+# follow a simulated 60 frames per second, which makes every run draw the
+# same frames.
+#
+# Results are saved as JSON together with the machine they came from.
+# compare lists every measurement in both files, flags those that got
+# worse by more than --threshold and exits with status 1 if any did. It
+# also warns when the two files come from different CPUs or renderers,
+# since their numbers are then not comparable.
+import argparse
+import datetime
+import importlib.metadata
+import json
+import os
+import platform as host  # OpenGL.GL exports a module called platform too
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+from graphics.headless import create_context  # before anything imports OpenGL
+
+import numpy as np
+import pygame
+from OpenGL.GL import *
+
+from graphics.capture import FrameCapture
+from graphics.meshes import SphereCache
+from graphics.text import TextRenderer
+from physics import (bounce, collisions, double_pendulum, drag, kernels, motion, nbody, pendulum,
+                     projectile)
+from physics.clock import SimulationClock
+from scene_host import SCENES, close_scenes, load_scene
+
+GROUPS = ("physics", "frames", "text", "spheres")
+FRAME_RATE = 60  # simulated frames per second
+PACKAGES = ("numpy", "pygame", "PyOpenGL", "numba")
+
+
+# Median seconds per call of function, called until seconds have passed
+# and at least five times, after one call to warm up
+def per_call(function, seconds):
+    function()
+    times = []
+    while sum(times) < seconds or len(times) < 5:
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+
+def result(value, unit, better):
+    return {"value": value, "unit": unit, "better": better}
+
+
+# Physics: one step of every model at a few batch sizes, as each scene
+# calls them. Each case is (model, bodies, state, step(state)).
+def physics_cases(quick):
+    rng = np.random.default_rng(0)
+    sizes = (1, 1000) if quick else (1, 1000, 100_000)
+    for n in sizes:
+        state = motion.initial_state(rng.uniform(-1, 1, n), 0.01, 0.0001)
+        yield "motion", n, state, lambda s: motion.step(s, 0.5, reset_on_wrap=True)
+        state = pendulum.initial_state(rng.uniform(-1, 1, n))
+        yield "pendulum", n, state, lambda s: pendulum.step(s, 0.5, damping=0.999)
+        state = bounce.initial_state(np.zeros(n), rng.uniform(-1, 1, n))
+        yield "bounce", n, state, lambda s: bounce.step(s, 0.5, gravity=-0.001)
+        state = projectile.salvo((0, 1, 0), (10, 10, 0), n, rng=rng)
+        yield "projectile", n, state, lambda s: projectile.step(s, 0.001, ground=-1e9)
+        state = double_pendulum.initial_state(rng.uniform(-3, 3, n), rng.uniform(-3, 3, n))
+        yield "double_pendulum", n, state, lambda s: double_pendulum.step(s, 0.01)
+    for n in (1000,) if quick else (1000, 5000):
+        yield "nbody", n, nbody.galaxy(n), lambda s: nbody.step(s, 0.01)
+    for n in (500,) if quick else (500, 2000):
+        radius = np.sqrt(0.3 * 4 / (n * np.pi))
+        state = collisions.fill(n, radius, (-1, 1, -1, 1))
+        yield "collisions", n, state, lambda s, r=radius: collisions.step(s, 1 / 240, radius=r)
+
+
+def run_physics(quick):
+    results = {}
+    seconds = 0.2 if quick else 1.0
+    for model, n, state, step in physics_cases(quick):
+        steps = 1 / per_call(lambda: step(state), seconds)
+        results[f"physics/{model}/{n}"] = result(steps, "steps/s", "higher")
+        print(f"  {model:<16}{n:>8} bodies {steps:12.0f} steps/s")
+    # samp.py solves each flight ahead with the adaptive drag solver
+    for model in drag.MODELS:
+        k = {"none": 0.0, "linear": 0.3, "quadratic": 0.02}[model]
+        start = np.array([-5.0, 0, 0, 10, 10, 0])
+        solve = lambda: drag.solve(start, (0, -9.8, 0), model, k, (0, 0, 3), 0.0)
+        flights = 1 / per_call(solve, seconds)
+        results[f"physics/drag_solve/{model}"] = result(flights, "flights/s", "higher")
+        print(f"  drag solve {model:<10}{flights:21.0f} flights/s")
+    return results
+
+
+# Frames: every scene with keys pressed to reach several sizes. Keys are
+# pressed in order and the cases of a scene build on each other, so
+# ("salvo 1000", "EQUALS v") follows the case before it. Cases marked
+# full are left out of --quick runs.
+FRAME_CASES = {
+    "Simple Motion": [("default", "", False), ("no plot", "g", False)],
+    "Simple Pendulum": [("two pendulums", "", False), ("plots", "g", False),
+                        ("ensemble 10000", "e", False), ("ensemble 50000", "UP", True)],
+    "Gravity": [("bounce", "", False), ("nbody 5000", "n", False), ("nbody 20000", "UP", True),
+                ("crowd 2000", "m", False), ("crowd 5000", "UP", True)],
+    "Projectile Motion": [("flight", "SPACE", False), ("salvo 100", "v", False),
+                          ("salvo 1000", "EQUALS v", False), ("salvo 5000", "EQUALS v", True)],
+    "Projectile Sandbox": [("flight", "", False), ("salvo 100", "v", False),
+                           ("salvo 1000", "EQUALS v", False), ("salvo 5000", "EQUALS v", True)],
+    "Double Pendulum": [("default", "", False)],
+}
+
+
+def press(scene, keys):
+    for name in keys.split():
+        key = getattr(pygame, "K_" + name)
+        scene.handle_event(pygame.event.Event(pygame.KEYDOWN, key=key, mod=0, unicode=""))
+
+
+def run_frames(quick):
+    results = {}
+    warmup, frames = (5, 20) if quick else (10, 60)
+    for name, cases in FRAME_CASES.items():
+        scene = load_scene(name)
+        capture = FrameCapture(*scene.WINDOW_SIZE)
+        # Every clock in the scene follows the simulated frame time
+        simulated = [0.0]
+        for clock in vars(scene).values():
+            if isinstance(clock, SimulationClock):
+                clock.timer = lambda: simulated[0]
+                clock.reset()
+        frame = 0
+        for label, keys, full in cases:
+            press(scene, keys)
+            if full and quick:
+                continue
+            times = []
+            for i in range(warmup + frames):
+                frame += 1
+                simulated[0] = frame / FRAME_RATE
+                start = time.perf_counter()
+                scene.update()
+                capture.bind()
+                scene.render()
+                glFinish()
+                if i >= warmup:
+                    times.append(time.perf_counter() - start)
+            ms = statistics.median(times) * 1000
+            results[f"frames/{name}/{label}"] = result(ms, "ms", "lower")
+            print(f"  {name:<20}{label:<16}{ms:9.2f} ms/frame (p95 {np.percentile(times, 95) * 1000:.2f})")
+        capture.delete()
+        close_scenes([scene])
+    return results
+
+
+# Text: a frame of HUD lines through TextRenderer.draw and flush, with
+# text that repeats every frame (layouts come from the cache) and with
+# numbers that change every frame (every line laid out again)
+def run_text(quick):
+    results = {}
+    seconds = 0.2 if quick else 1.0
+    capture = FrameCapture(800, 600)
+    capture.bind()
+    renderer = TextRenderer((800, 600))
+    frame = [0]
+    for lines in (10, 100):
+        for label, changing in (("repeated", False), ("changing", True)):
+            def draw():
+                frame[0] += 1
+                for i in range(lines):
+                    value = frame[0] * 0.001 + i if changing else i
+                    renderer.draw(10, 10 + i * 5, f"Velocity {i}: {value:.4f}")
+                renderer.flush()
+                glFinish()
+            us = per_call(draw, seconds) / lines * 1e6
+            results[f"text/{label}/{lines}"] = result(us, "us/line", "lower")
+            print(f"  {lines:>4} {label:<10} lines {us:9.2f} us/line")
+    capture.delete()
+    return results
+
+
+# Spheres: one lit sphere as Scripts/4.py and samp.py draw their
+# projectile, and salvos drawn at once as their salvos are
+def run_spheres(quick):
+    results = {}
+    seconds = 0.2 if quick else 1.0
+    width, height = 1200, 800
+    capture = FrameCapture(width, height)
+    capture.bind()
+    glMatrixMode(GL_PROJECTION)
+    glLoadIdentity()
+    glFrustum(-0.055, 0.055, -0.0414, 0.0414, 0.1, 100.0)
+    glMatrixMode(GL_MODELVIEW)
+    glLoadIdentity()
+    glTranslatef(0, 0, -20)
+    glEnable(GL_DEPTH_TEST)
+    glEnable(GL_LIGHTING)
+    glEnable(GL_LIGHT0)
+    glEnable(GL_COLOR_MATERIAL)
+    spheres = SphereCache(45, height)
+    rng = np.random.default_rng(0)
+
+    # Each draw is timed from a cleared frame to glFinish; the time an
+    # empty frame takes is taken off, leaving what the spheres cost
+    def frame(draw):
+        def timed():
+            glClear(GL_COLOR_BUFFER_BIT | GL_DEPTH_BUFFER_BIT)
+            draw()
+            glFinish()
+        return timed
+    empty = per_call(frame(lambda: None), seconds)
+
+    ms = (per_call(frame(lambda: spheres.draw((0.0, 1.0, 0.0), 0.1, 20.0)), seconds) - empty) * 1000
+    results["spheres/single"] = result(ms, "ms", "lower")
+    print(f"  single sphere {ms:9.3f} ms (empty frame {empty * 1000:.3f} ms)")
+
+    for count in (100, 1000) if quick else (100, 1000, 5000):
+        positions = rng.uniform(-5, 5, (count, 3))
+        ms = (per_call(frame(lambda: spheres.draw_many(positions, 0.1, 20.0)), seconds) - empty) * 1000
+        results[f"spheres/salvo/{count}"] = result(ms, "ms", "lower")
+        print(f"  salvo of {count:<5} {ms:9.3f} ms")
+    capture.delete()
+    return results
+
+
+def package_version(name):
+    try:
+        return importlib.metadata.version(name)
+    except importlib.metadata.PackageNotFoundError:
+        return None
+
+
+def cpu_model():
+    try:
+        with open("/proc/cpuinfo") as f:
+            for line in f:
+                if line.startswith("model name"):
+                    return line.split(":", 1)[1].strip()
+    except OSError:
+        pass
+    return host.processor() or host.machine()
+
+
+def git_commit():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                                text=True, check=True).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=ROOT,
+                               capture_output=True, text=True).stdout.strip()
+        return commit + ("+changes" if dirty else "")
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+# Where the numbers came from; needs the GL context to be current
+def machine():
+    return {
+        "time": datetime.datetime.now().astimezone().isoformat(timespec="seconds"),
+        "host": host.node(),
+        "platform": host.platform(),
+        "python": host.python_version(),
+        "cpu": cpu_model(),
+        "cores": os.cpu_count(),
+        "gl_renderer": glGetString(GL_RENDERER).decode(),
+        "gl_version": glGetString(GL_VERSION).decode(),
+        "packages": {name: package_version(name) for name in PACKAGES},
+        "physics_kernels": kernels.describe(),
+        "commit": git_commit(),
+    }
+
+
+def run(args):
+    create_context()
+    pygame.init()
+    report = {"machine": machine(), "quick": args.quick, "results": {}}
+    print(f"{report['machine']['cpu']}, {report['machine']['cores']} cores, {report['machine']['gl_renderer']}")
+    runners = {"physics": run_physics, "frames": run_frames, "text": run_text, "spheres": run_spheres}
+    for group in args.only or GROUPS:
+        print(group)
+        report["results"].update(runners[group](args.quick))
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Saved {len(report['results'])} results to {args.save}")
+    return 0
+
+
+# Changes from baseline to current, worst first; 1 if any measurement got
+# worse by more than threshold
+def compare(args):
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.current) as f:
+        current = json.load(f)
+    for key in ("cpu", "cores", "gl_renderer"):
+        if baseline["machine"].get(key) != current["machine"].get(key):
+            print(f"warning: {key} differs: {baseline['machine'].get(key)} -> {current['machine'].get(key)}")
+
+    rows = []
+    for name, new in current["results"].items():
+        old = baseline["results"].get(name)
+        if old is None or not old["value"]:
+            continue
+        # Positive when worse, as a share of the baseline
+        change = new["value"] / old["value"] - 1
+        worse = -change if new["better"] == "higher" else change
+        rows.append((worse, name, old["value"], new["value"], new["unit"]))
+    rows.sort(reverse=True)
+
+    print(f"{'measurement':<44}{'baseline':>12}{'current':>12} {'unit':<10}{'change':>8}")
+    regressions = 0
+    for worse, name, old, new, unit in rows:
+        flag = ""
+        if worse > args.threshold:
+            flag = "  SLOWER"
+            regressions += 1
+        elif worse < -args.threshold:
+            flag = "  faster"
+        print(f"{name:<44}{old:12.4g}{new:12.4g} {unit:<10}{-worse:+8.1%}{flag}")
+    missing = sorted(set(baseline["results"]) - set(current["results"]))
+    if missing:
+        print(f"{len(missing)} measurements of the baseline not in {args.current}")
+    print(f"{regressions} of {len(rows)} measurements more than {args.threshold:.0%} slower")
+    return 1 if regressions else 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Physics, frame, text and sphere benchmarks.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    run_parser = commands.add_parser("run", help="run the benchmarks")
+    run_parser.add_argument("--quick", action="store_true", help="fewer sizes and shorter timings")
+    run_parser.add_argument("--only", nargs="+", choices=GROUPS, help="groups to run")
+    run_parser.add_argument("--save", help="write the results to this JSON file")
+    compare_parser = commands.add_parser("compare", help="compare results against a baseline")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("current")
+    compare_parser.add_argument("--threshold", type=float, default=0.15,
+                                help="allowed slowdown, as a fraction")
+    args = parser.parse_args(argv)
+    return run(args) if args.command == "run" else compare(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,149 @@
+# Render a scene without a window and write its frames to disk or to a
+# video encoder, at a fixed simulated frame rate:
+#
+#   python export.py "Projectile Motion" --seconds 5 --key 0:SPACE --png frames/
+#   python export.py Gravity --frames 600 --video gravity.mp4
+#   python export.py "Simple Pendulum" --pipe "x264 --input-res 800x600 ..."
+#
+# Frames are drawn into an offscreen framebuffer through EGL, so this works
+# on servers with no display or GPU. Simulated time advances exactly
+# 1/fps per frame however long a frame takes to render, which also makes
+# exported frames repeatable for regression snapshots.
+import argparse
+import os
+import queue
+import shlex
+import subprocess
+import sys
+import threading
+import time
+
+from graphics.headless import create_context  # before anything imports OpenGL
+
+import pygame
+from OpenGL.GL import *
+
+from graphics.capture import FrameCapture
+from physics.clock import SimulationClock
+from scene_host import SCENES, close_scenes, load_scene
+
+QUEUE_FRAMES = 8  # frames waiting for the writer before rendering blocks
+
+
+class FrameWriter:
+    # Writes frames on a background thread so encoding and disk writes
+    # overlap with rendering the next frames
+    def __init__(self, size, png_dir=None, command=None):
+        self.size = size
+        self.png_dir = png_dir
+        self.encoder = None
+        if png_dir:
+            os.makedirs(png_dir, exist_ok=True)
+        if command:
+            self.encoder = subprocess.Popen(command, shell=True, stdin=subprocess.PIPE)
+        self.queue = queue.Queue(QUEUE_FRAMES)
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def write(self, index, pixels):
+        self.queue.put((index, pixels))
+
+    def _run(self):
+        while True:
+            item = self.queue.get()
+            if item is None:
+                return
+            index, pixels = item
+            if self.png_dir:
+                # Rows come bottom-up from OpenGL
+                image = pygame.transform.flip(pygame.image.frombuffer(pixels, self.size, "RGB"), False, True)
+                pygame.image.save(image, os.path.join(self.png_dir, f"frame_{index:06d}.png"))
+            if self.encoder:
+                self.encoder.stdin.write(pixels)
+
+    def close(self):
+        self.queue.put(None)
+        self.thread.join()
+        if self.encoder:
+            self.encoder.stdin.close()
+            self.encoder.wait()
+
+
+# Raw bottom-up RGB frames into ffmpeg, flipped upright
+def ffmpeg_command(size, fps, path):
+    return (f"ffmpeg -loglevel error -y -f rawvideo -pix_fmt rgb24 -s {size[0]}x{size[1]} -r {fps} -i - "
+            f"-vf vflip -pix_fmt yuv420p {shlex.quote(path)}")
+
+
+# "30:SPACE" -> (30, K_SPACE)
+def parse_key(text):
+    frame, _, name = text.partition(":")
+    key = getattr(pygame, "K_" + name, None) or getattr(pygame, "K_" + name.lower(), None)
+    if key is None:
+        raise argparse.ArgumentTypeError(f"Unknown key: {name}")
+    return int(frame), key
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Render a scene offscreen and export its frames.")
+    parser.add_argument("scene", choices=list(SCENES))
+    parser.add_argument("--fps", type=float, default=60.0, help="simulated frames per second")
+    length = parser.add_mutually_exclusive_group()
+    length.add_argument("--frames", type=int, default=300)
+    length.add_argument("--seconds", type=float)
+    parser.add_argument("--png", metavar="DIR", help="write frame_NNNNNN.png files here")
+    parser.add_argument("--video", metavar="FILE", help="encode with ffmpeg to this file")
+    parser.add_argument("--pipe", metavar="COMMAND", help="pipe raw bottom-up RGB frames to this command")
+    parser.add_argument("--key", type=parse_key, action="append", default=[], metavar="FRAME:KEY",
+                        help="press a key at a frame, e.g. 0:SPACE (repeatable)")
+    args = parser.parse_args(argv)
+    frames = round(args.seconds * args.fps) if args.seconds is not None else args.frames
+
+    create_context()
+    scene = load_scene(args.scene)
+    size = scene.WINDOW_SIZE
+    capture = FrameCapture(*size)
+    command = args.pipe or (ffmpeg_command(size, args.fps, args.video) if args.video else None)
+    writer = FrameWriter(size, args.png, command) if args.png or command else None
+
+    # Every clock in the scene follows the simulated frame time instead of the wall clock
+    simulated = [0.0]
+    for clock in vars(scene).values():
+        if isinstance(clock, SimulationClock):
+            clock.timer = lambda: simulated[0]
+            clock.reset()
+
+    keys = {}
+    for frame, key in args.key:
+        keys.setdefault(frame, []).append(key)
+
+    wall_start, cpu_start = time.perf_counter(), time.process_time()
+    for frame in range(frames):
+        simulated[0] = frame / args.fps
+        for key in keys.get(frame, ()):
+            scene.handle_event(pygame.event.Event(pygame.KEYDOWN, key=key, mod=0, unicode=""))
+        scene.update()
+        capture.bind()
+        scene.render()
+        pixels = capture.read()
+        if writer and pixels is not None:
+            writer.write(frame - 1, pixels)
+    if writer:
+        if frames:
+            writer.write(frames - 1, capture.finish())
+        writer.close()
+    else:
+        glFinish()
+    wall = time.perf_counter() - wall_start
+    cpu = time.process_time() - cpu_start
+
+    # CPU time covers this process and its writer thread, not an encoder process
+    print(f"{frames} frames of {size[0]}x{size[1]} in {wall:.2f} s: {frames / wall:.1f} frames/s, "
+          f"{frames / cpu:.1f} frames/s per core ({cpu / wall:.2f} cores busy)")
+    capture.delete()
+    close_scenes([scene])
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
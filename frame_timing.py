@@ -0,0 +1,125 @@
+import cProfile
+import csv
+import io
+import pstats
+import time
+
+import numpy as np
+
+# Phases of a frame in the order they happen, then the whole frame
+PHASES = ("events", "update", "draw", "text", "flip")
+COLUMNS = PHASES + ("frame",)
+HISTORY = 600  # frames kept for the rolling percentiles
+
+
+class FrameTimer:
+    # Per-phase frame times in nanoseconds, kept in a ring buffer of the
+    # last HISTORY frames. Between begin_frame() and end_frame(), each
+    # mark(phase) charges the time since the previous mark to that phase.
+    # Records can also be streamed to a CSV file, one row per frame.
+    def __init__(self, history=HISTORY):
+        self.samples = np.zeros((history, len(COLUMNS)), dtype=np.int64)
+        self.count = 0  # frames recorded in total
+        self._row = np.zeros(len(COLUMNS), dtype=np.int64)
+        self._index = {phase: i for i, phase in enumerate(COLUMNS)}
+        self._csv_file = None
+        self._csv = None
+        self._profile = None
+
+    def begin_frame(self):
+        self._row[:] = 0
+        self._start = self._last = time.perf_counter_ns()
+
+    def mark(self, phase):
+        now = time.perf_counter_ns()
+        self._row[self._index[phase]] += now - self._last
+        self._last = now
+
+    # Move time already charged to one phase over to another, for work
+    # measured inside a phase (text is drawn during the draw phase)
+    def move(self, source, target, ns):
+        self._row[self._index[source]] -= ns
+        self._row[self._index[target]] += ns
+
+    def end_frame(self):
+        self._row[-1] = self._last - self._start
+        self.samples[self.count % len(self.samples)] = self._row
+        self.count += 1
+        if self._csv:
+            self._csv.writerow([self.count, *self._row])
+
+    # (p50, p99) in milliseconds per column over the recorded history
+    def percentiles(self):
+        filled = self.samples[:min(self.count, len(self.samples))]
+        if not len(filled):
+            return {}
+        p50, p99 = np.percentile(filled, [50, 99], axis=0) / 1e6
+        return {column: (p50[i], p99[i]) for i, column in enumerate(COLUMNS)}
+
+    @property
+    def recording(self):
+        return self._csv is not None
+
+    def start_csv(self, path):
+        self.stop_csv()
+        self._csv_file = open(path, "w", newline="")
+        self._csv = csv.writer(self._csv_file)
+        self._csv.writerow(["frame", *(f"{column}_ns" for column in COLUMNS)])
+
+    def stop_csv(self):
+        if self._csv_file:
+            self._csv_file.close()
+        self._csv_file = self._csv = None
+
+    @property
+    def profiling(self):
+        return self._profile is not None
+
+    def start_profile(self):
+        self._profile = cProfile.Profile()
+        self._profile.enable()
+
+    # Stop profiling, save the stats to path and return the top entries
+    def stop_profile(self, path, top=20):
+        self._profile.disable()
+        self._profile.dump_stats(path)
+        report = io.StringIO()
+        pstats.Stats(self._profile, stream=report).sort_stats("cumulative").print_stats(top)
+        self._profile = None
+        return report.getvalue()
+
+    def close(self):
+        self.stop_csv()
+        if self._profile:
+            self._profile.disable()
+            self._profile = None
+
+
+class CpuMeter:
+    # Share of one core the process used, and frames drawn per second, over
+    # windows of period wall seconds. A window closes on the first tick()
+    # after it is over, so an idle host that sleeps in long waits still
+    # gets a reading every time it wakes.
+    def __init__(self, period=1.0):
+        self.period = period
+        self.share = 0.0
+        self.fps = 0.0
+        self.readings = 0  # windows closed so far
+        self._frames = 0
+        self._wall = time.perf_counter()
+        self._cpu = time.process_time()
+
+    # Count the frames drawn since the last call; True when a window closed
+    def tick(self, frames=0):
+        self._frames += frames
+        wall = time.perf_counter()
+        elapsed = wall - self._wall
+        if elapsed < self.period:
+            return False
+        cpu = time.process_time()
+        self.share = (cpu - self._cpu) / elapsed
+        self.fps = self._frames / elapsed
+        self.readings += 1
+        self._frames = 0
+        self._wall, self._cpu = wall, cpu
+        return True
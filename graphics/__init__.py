@@ -0,0 +1 @@
+# Shared OpenGL drawing helpers used by the visualization scripts
@@ -0,0 +1,112 @@
+import ctypes
+
+import numpy as np
+from OpenGL.GL import *
+
+# Interleaved vertex layout per primitive type: position, then RGBA
+MODES = {"lines": (GL_LINES, 2), "quads": (GL_QUADS, 4)}
+
+
+class PrimitiveBatch:
+    # Queues lines and quads during a frame and draws them with one call per
+    # primitive type, the way TextRenderer does for text. Vertices go
+    # straight into preallocated float32 arrays of position and RGBA that
+    # double in size when a frame needs more, so after the first few frames
+    # nothing is allocated; flush() draws from them as client-side arrays.
+    # Lines are drawn before quads, so a bob covers the end of its rod.
+    #
+    # dimensions is 2 for scenes drawn in the plane and 3 for 3D ones. Each
+    # primitive takes the colour last given to color(), like glColor; the
+    # *_many methods take one colour per primitive or none.
+    def __init__(self, dimensions=2, capacity=256):
+        self.dimensions = dimensions
+        self.current = np.array([1.0, 1.0, 1.0, 1.0], dtype=np.float32)
+        self._vertices = {kind: np.zeros((capacity * per, dimensions + 4), dtype=np.float32)
+                          for kind, (_, per) in MODES.items()}
+        self._counts = dict.fromkeys(MODES, 0)
+        self.draw_calls = 0  # calls made by the last flush
+
+    def __len__(self):
+        return sum(count // MODES[kind][1] for kind, count in self._counts.items())
+
+    def color(self, r, g, b, a=1.0):
+        self.current[:] = (r, g, b, a)
+
+    # Room for n more vertices of one kind; returns the slice to fill
+    def _reserve(self, kind, n):
+        start = self._counts[kind]
+        vertices = self._vertices[kind]
+        if start + n > len(vertices):
+            grown = np.zeros((max(2 * len(vertices), start + n), vertices.shape[1]), dtype=np.float32)
+            grown[:start] = vertices[:start]
+            self._vertices[kind] = vertices = grown
+        self._counts[kind] = start + n
+        return vertices[start:start + n]
+
+    def line(self, start, end):
+        vertices = self._reserve("lines", 2)
+        vertices[0, :self.dimensions] = start
+        vertices[1, :self.dimensions] = end
+        vertices[:, self.dimensions:] = self.current
+
+    # Four corners in drawing order
+    def quad(self, a, b, c, d):
+        vertices = self._reserve("quads", 4)
+        vertices[:, :self.dimensions] = (a, b, c, d)
+        vertices[:, self.dimensions:] = self.current
+
+    # Axis-aligned rectangle in the plane from its lower-left corner
+    def rect(self, x, y, width, height):
+        self.quad((x, y), (x + width, y), (x + width, y + height), (x, y + height))
+
+    # Segments from starts[i] to ends[i]
+    def lines_many(self, starts, ends, colors=None):
+        n = len(starts)
+        vertices = self._reserve("lines", 2 * n).reshape(n, 2, -1)
+        vertices[:, 0, :self.dimensions] = starts
+        vertices[:, 1, :self.dimensions] = ends
+        self._fill_colors(vertices, colors)
+
+    # Squares in the plane centred on centers, half_size from centre to edge
+    def squares_many(self, centers, half_size, colors=None):
+        centers = np.asarray(centers, dtype=np.float32)
+        n = len(centers)
+        vertices = self._reserve("quads", 4 * n).reshape(n, 4, -1)
+        half = np.reshape(np.asarray(half_size, dtype=np.float32), (-1, 1, 1))
+        corners = np.array([[-1, -1], [1, -1], [1, 1], [-1, 1]], dtype=np.float32)
+        vertices[:, :, :2] = centers[:, None, :] + corners[None] * half
+        self._fill_colors(vertices, colors)
+
+    def _fill_colors(self, vertices, colors):
+        if colors is None:
+            vertices[..., self.dimensions:] = self.current
+            return
+        colors = np.asarray(colors, dtype=np.float32)
+        vertices[..., self.dimensions:self.dimensions + colors.shape[-1]] = colors[:, None, :]
+        if colors.shape[-1] == 3:
+            vertices[..., -1] = 1.0
+
+    # Draw everything queued since the last flush and start over
+    def flush(self):
+        self.draw_calls = 0
+        if not any(self._counts.values()):
+            return
+        stride = (self.dimensions + 4) * 4
+        glPushClientAttrib(GL_CLIENT_VERTEX_ARRAY_BIT)
+        glPushAttrib(GL_CURRENT_BIT)
+        glBindBuffer(GL_ARRAY_BUFFER, 0)
+        glEnableClientState(GL_VERTEX_ARRAY)
+        glEnableClientState(GL_COLOR_ARRAY)
+        for kind, (mode, _) in MODES.items():
+            count = self._counts[kind]
+            if not count:
+                continue
+            # Addresses rather than arrays, so the colour pointer keeps the stride
+            address = self._vertices[kind].ctypes.data
+            glVertexPointer(self.dimensions, GL_FLOAT, stride, ctypes.c_void_p(address))
+            glColorPointer(4, GL_FLOAT, stride, ctypes.c_void_p(address + self.dimensions * 4))
+            glDrawArrays(mode, 0, count)
+            self.draw_calls += 1
+            self._counts[kind] = 0
+        glPopAttrib()
+        glPopClientAttrib()
@@ -0,0 +1,74 @@
+import ctypes
+
+from OpenGL.GL import *
+
+
+class FrameCapture:
+    # Renders into an offscreen framebuffer and reads frames back through
+    # two pixel buffer objects. read() queues the copy of the frame just
+    # drawn into one PBO and maps the other, which holds the frame before
+    # it, so the CPU never waits for the frame the GPU is still drawing.
+    # Frames come out one call late; finish() returns the last one.
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+        self.frame_bytes = width * height * 3
+
+        self.fbo = glGenFramebuffers(1)
+        self.color, self.depth = glGenRenderbuffers(2)
+        glBindRenderbuffer(GL_RENDERBUFFER, self.color)
+        glRenderbufferStorage(GL_RENDERBUFFER, GL_RGBA8, width, height)
+        glBindRenderbuffer(GL_RENDERBUFFER, self.depth)
+        glRenderbufferStorage(GL_RENDERBUFFER, GL_DEPTH_COMPONENT24, width, height)
+        glBindRenderbuffer(GL_RENDERBUFFER, 0)
+        glBindFramebuffer(GL_FRAMEBUFFER, self.fbo)
+        glFramebufferRenderbuffer(GL_FRAMEBUFFER, GL_COLOR_ATTACHMENT0, GL_RENDERBUFFER, self.color)
+        glFramebufferRenderbuffer(GL_FRAMEBUFFER, GL_DEPTH_ATTACHMENT, GL_RENDERBUFFER, self.depth)
+        status = glCheckFramebufferStatus(GL_FRAMEBUFFER)
+        glBindFramebuffer(GL_FRAMEBUFFER, 0)
+        if status != GL_FRAMEBUFFER_COMPLETE:
+            raise RuntimeError(f"Framebuffer incomplete: 0x{status:x}")
+
+        self.pbos = glGenBuffers(2)
+        for pbo in self.pbos:
+            glBindBuffer(GL_PIXEL_PACK_BUFFER, pbo)
+            glBufferData(GL_PIXEL_PACK_BUFFER, self.frame_bytes, None, GL_STREAM_READ)
+        glBindBuffer(GL_PIXEL_PACK_BUFFER, 0)
+        self.frames = 0
+
+    # Direct drawing into the offscreen framebuffer
+    def bind(self):
+        glBindFramebuffer(GL_FRAMEBUFFER, self.fbo)
+        glViewport(0, 0, self.width, self.height)
+
+    # Start reading the frame just drawn and return the previous one as
+    # bottom-up RGB bytes, or None after the first frame
+    def read(self):
+        glBindFramebuffer(GL_READ_FRAMEBUFFER, self.fbo)
+        glPixelStorei(GL_PACK_ALIGNMENT, 1)
+        glBindBuffer(GL_PIXEL_PACK_BUFFER, self.pbos[self.frames % 2])
+        glReadPixels(0, 0, self.width, self.height, GL_RGB, GL_UNSIGNED_BYTE, ctypes.c_void_p(0))
+        glBindBuffer(GL_PIXEL_PACK_BUFFER, 0)
+        self.frames += 1
+        if self.frames == 1:
+            return None
+        return self._map(self.pbos[self.frames % 2])
+
+    # The frame still in flight after the last read()
+    def finish(self):
+        if not self.frames:
+            return None
+        return self._map(self.pbos[(self.frames - 1) % 2])
+
+    def _map(self, pbo):
+        glBindBuffer(GL_PIXEL_PACK_BUFFER, pbo)
+        pointer = glMapBuffer(GL_PIXEL_PACK_BUFFER, GL_READ_ONLY)
+        pixels = ctypes.string_at(pointer, self.frame_bytes)
+        glUnmapBuffer(GL_PIXEL_PACK_BUFFER)
+        glBindBuffer(GL_PIXEL_PACK_BUFFER, 0)
+        return pixels
+
+    def delete(self):
+        glDeleteBuffers(2, self.pbos)
+        glDeleteRenderbuffers(2, [self.color, self.depth])
+        glDeleteFramebuffers(1, [self.fbo])
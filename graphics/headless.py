@@ -0,0 +1,48 @@
+# OpenGL without a window, through EGL, for rendering on servers with no
+# display (software Mesa included). PyOpenGL picks its platform when
+# OpenGL is first imported, so this module must be imported before
+# anything else imports OpenGL.
+import ctypes
+import os
+
+os.environ.setdefault("PYOPENGL_PLATFORM", "egl")
+
+from OpenGL import EGL
+
+EGL_PLATFORM_SURFACELESS_MESA = 0x31DD
+
+
+# Make a compatibility-profile context current with no window surface.
+# Everything is drawn into framebuffer objects, so the context only gets
+# a 1x1 pbuffer where the driver needs one.
+def create_context():
+    try:
+        display = EGL.eglGetPlatformDisplayEXT(EGL_PLATFORM_SURFACELESS_MESA, EGL.EGL_DEFAULT_DISPLAY, None)
+    except Exception:
+        display = EGL.EGL_NO_DISPLAY
+    if display == EGL.EGL_NO_DISPLAY:
+        display = EGL.eglGetDisplay(EGL.EGL_DEFAULT_DISPLAY)
+    major, minor = EGL.EGLint(), EGL.EGLint()
+    if not EGL.eglInitialize(display, ctypes.pointer(major), ctypes.pointer(minor)):
+        raise RuntimeError("EGL could not be initialised")
+
+    attributes = (EGL.EGLint * 11)(
+        EGL.EGL_SURFACE_TYPE, EGL.EGL_PBUFFER_BIT,
+        EGL.EGL_RED_SIZE, 8, EGL.EGL_GREEN_SIZE, 8, EGL.EGL_BLUE_SIZE, 8,
+        EGL.EGL_RENDERABLE_TYPE, EGL.EGL_OPENGL_BIT,
+        EGL.EGL_NONE)
+    config = EGL.EGLConfig()
+    count = EGL.EGLint()
+    EGL.eglChooseConfig(display, attributes, ctypes.pointer(config), 1, ctypes.pointer(count))
+    if not count.value:
+        raise RuntimeError("No EGL configuration supports desktop OpenGL")
+
+    EGL.eglBindAPI(EGL.EGL_OPENGL_API)
+    context = EGL.eglCreateContext(display, config, EGL.EGL_NO_CONTEXT, None)
+    if context == EGL.EGL_NO_CONTEXT:
+        raise RuntimeError("EGL could not create an OpenGL context")
+    size = (EGL.EGLint * 5)(EGL.EGL_WIDTH, 1, EGL.EGL_HEIGHT, 1, EGL.EGL_NONE)
+    surface = EGL.eglCreatePbufferSurface(display, config, size)
+    if not EGL.eglMakeCurrent(display, surface, surface, context):
+        raise RuntimeError("EGL could not make the context current")
+    return display, context
@@ -0,0 +1,101 @@
+import numpy as np
+from OpenGL.GL import *
+
+# Anchor colours of the default colormap, dark blue through green to yellow
+COLORMAP_ANCHORS = np.array([
+    (0.27, 0.00, 0.33),
+    (0.23, 0.32, 0.55),
+    (0.13, 0.57, 0.55),
+    (0.37, 0.79, 0.38),
+    (0.99, 0.91, 0.15),
+])
+NAN_COLOR = (40, 40, 40)
+
+
+# Map a 2D array of values to RGB bytes; nan cells get NAN_COLOR
+def colormap(values, vmin=None, vmax=None, anchors=COLORMAP_ANCHORS):
+    values = np.asarray(values, dtype=float)
+    finite = np.isfinite(values)
+    if vmin is None:
+        vmin = values[finite].min() if finite.any() else 0.0
+    if vmax is None:
+        vmax = values[finite].max() if finite.any() else 1.0
+    scale = (np.where(finite, values, vmin) - vmin) / max(vmax - vmin, 1e-12)
+    position = np.clip(scale, 0.0, 1.0) * (len(anchors) - 1)
+    lower = np.minimum(position.astype(int), len(anchors) - 2)
+    blend = (position - lower)[..., None]
+    rgb = anchors[lower] * (1 - blend) + anchors[lower + 1] * blend
+    rgb = (rgb * 255).astype(np.uint8)
+    rgb[~finite] = NAN_COLOR
+    return rgb
+
+
+class HeatMap:
+    # A 2D scalar field shown as a colour-mapped texture in a window-pixel
+    # rectangle. Row 0 of the values is drawn at the bottom.
+    def __init__(self, window_size):
+        self.window_size = window_size
+        self.texture = glGenTextures(1)
+        self.shape = None
+
+    def update(self, values, vmin=None, vmax=None):
+        rgb = np.ascontiguousarray(colormap(values, vmin, vmax))
+        glBindTexture(GL_TEXTURE_2D, self.texture)
+        glPixelStorei(GL_UNPACK_ALIGNMENT, 1)
+        if rgb.shape[:2] != self.shape:
+            glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MIN_FILTER, GL_LINEAR)
+            glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MAG_FILTER, GL_LINEAR)
+            glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_S, GL_CLAMP_TO_EDGE)
+            glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_T, GL_CLAMP_TO_EDGE)
+            glTexImage2D(GL_TEXTURE_2D, 0, GL_RGB, rgb.shape[1], rgb.shape[0], 0, GL_RGB, GL_UNSIGNED_BYTE, rgb)
+            self.shape = rgb.shape[:2]
+        else:
+            glTexSubImage2D(GL_TEXTURE_2D, 0, 0, 0, rgb.shape[1], rgb.shape[0], GL_RGB, GL_UNSIGNED_BYTE, rgb)
+
+    # Draw into the rectangle at (x, y) of size (w, h) pixels; marker is an
+    # optional (u, v) point in 0..1 across the map to draw a cross at
+    def draw(self, x, y, w, h, marker=None):
+        if self.shape is None:
+            return
+        glPushAttrib(GL_ENABLE_BIT | GL_TEXTURE_BIT | GL_CURRENT_BIT)
+        glMatrixMode(GL_PROJECTION)
+        glPushMatrix()
+        glLoadIdentity()
+        glOrtho(0, self.window_size[0], 0, self.window_size[1], -1, 1)
+        glMatrixMode(GL_MODELVIEW)
+        glPushMatrix()
+        glLoadIdentity()
+        glDisable(GL_DEPTH_TEST)
+        glDisable(GL_LIGHTING)
+
+        glEnable(GL_TEXTURE_2D)
+        glBindTexture(GL_TEXTURE_2D, self.texture)
+        glTexEnvi(GL_TEXTURE_ENV, GL_TEXTURE_ENV_MODE, GL_REPLACE)
+        glBegin(GL_QUADS)
+        glTexCoord2f(0, 0)
+        glVertex2f(x, y)
+        glTexCoord2f(1, 0)
+        glVertex2f(x + w, y)
+        glTexCoord2f(1, 1)
+        glVertex2f(x + w, y + h)
+        glTexCoord2f(0, 1)
+        glVertex2f(x, y + h)
+        glEnd()
+        glDisable(GL_TEXTURE_2D)
+
+        if marker is not None:
+            mx = x + marker[0] * w
+            my = y + marker[1] * h
+            glColor3f(1, 1, 1)
+            glBegin(GL_LINES)
+            glVertex2f(mx - 6, my)
+            glVertex2f(mx + 6, my)
+            glVertex2f(mx, my - 6)
+            glVertex2f(mx, my + 6)
+            glEnd()
+
+        glMatrixMode(GL_PROJECTION)
+        glPopMatrix()
+        glMatrixMode(GL_MODELVIEW)
+        glPopMatrix()
+        glPopAttrib()
@@ -0,0 +1,193 @@
+import ctypes
+import math
+
+import numpy as np
+from OpenGL.GL import *
+from OpenGL.GL import shaders
+
+# Band counts a sphere can be tessellated at, coarse to fine
+SPHERE_LEVELS = (6, 8, 12, 16, 20, 24, 32, 48, 64)
+# Target length in pixels of one band along the sphere's silhouette
+PIXELS_PER_BAND = 4.0
+
+# Instanced spheres: the unit mesh scaled and moved by a per-instance
+# offset, flat shaded in the current colour like the single-sphere draw
+INSTANCE_VERTEX_SHADER = """
+#version 120
+attribute vec3 offset;
+uniform float radius;
+void main() {
+    gl_FrontColor = gl_Color;
+    gl_Position = gl_ModelViewProjectionMatrix * vec4(gl_Vertex.xyz * radius + offset, 1.0);
+}
+"""
+INSTANCE_FRAGMENT_SHADER = """
+#version 120
+void main() {
+    gl_FragColor = gl_Color;
+}
+"""
+
+# Unit sphere with the poles on the z axis, in the same layout as the old
+# immediate-mode draw_sphere: positions double as normals
+def tessellate_sphere(lat_bands, long_bands):
+    lat = np.pi * (-0.5 + np.arange(lat_bands + 1) / lat_bands)
+    lng = 2 * np.pi * np.arange(long_bands + 1) / long_bands
+    zr = np.cos(lat)[:, None]
+    vertices = np.empty((lat_bands + 1, long_bands + 1, 3), dtype=np.float32)
+    vertices[..., 0] = np.cos(lng)[None, :] * zr
+    vertices[..., 1] = np.sin(lng)[None, :] * zr
+    vertices[..., 2] = np.sin(lat)[:, None]
+
+    # Two triangles per quad between neighbouring latitude rings
+    row = long_bands + 1
+    i, j = np.meshgrid(np.arange(lat_bands), np.arange(long_bands), indexing="ij")
+    a = i * row + j
+    b = a + row
+    indices = np.stack([a, a + 1, b + 1, a, b + 1, b], axis=-1).astype(np.uint32)
+    return vertices.reshape(-1, 3), indices.reshape(-1)
+
+
+class SphereMesh:
+    # One tessellation level stored in a vertex and an index buffer
+    def __init__(self, lat_bands, long_bands=None):
+        vertices, indices = tessellate_sphere(lat_bands, long_bands or lat_bands)
+        self.bands = lat_bands
+        self.count = len(indices)
+        self.vbo, self.ibo = glGenBuffers(2)
+        glBindBuffer(GL_ARRAY_BUFFER, self.vbo)
+        glBufferData(GL_ARRAY_BUFFER, vertices.nbytes, vertices, GL_STATIC_DRAW)
+        glBindBuffer(GL_ELEMENT_ARRAY_BUFFER, self.ibo)
+        glBufferData(GL_ELEMENT_ARRAY_BUFFER, indices.nbytes, indices, GL_STATIC_DRAW)
+        glBindBuffer(GL_ARRAY_BUFFER, 0)
+        glBindBuffer(GL_ELEMENT_ARRAY_BUFFER, 0)
+
+    def draw(self):
+        self.draw_instances(1)
+
+    # Draw the mesh count times with one call; the caller sets up whatever
+    # tells the instances apart (see SphereCache.draw_many)
+    def draw_instances(self, count):
+        glPushClientAttrib(GL_CLIENT_VERTEX_ARRAY_BIT)
+        glBindBuffer(GL_ARRAY_BUFFER, self.vbo)
+        glBindBuffer(GL_ELEMENT_ARRAY_BUFFER, self.ibo)
+        glEnableClientState(GL_VERTEX_ARRAY)
+        glEnableClientState(GL_NORMAL_ARRAY)
+        glVertexPointer(3, GL_FLOAT, 0, ctypes.c_void_p(0))
+        glNormalPointer(GL_FLOAT, 0, ctypes.c_void_p(0))
+        if count == 1:
+            glDrawElements(GL_TRIANGLES, self.count, GL_UNSIGNED_INT, ctypes.c_void_p(0))
+        else:
+            glDrawElementsInstanced(GL_TRIANGLES, self.count, GL_UNSIGNED_INT, ctypes.c_void_p(0), count)
+        glBindBuffer(GL_ARRAY_BUFFER, 0)
+        glBindBuffer(GL_ELEMENT_ARRAY_BUFFER, 0)
+        glPopClientAttrib()
+
+    def delete(self):
+        glDeleteBuffers(2, [self.vbo, self.ibo])
+
+
+# Radius in pixels of a sphere seen at the given eye distance through a
+# perspective projection with vertical field of view fov_y (degrees)
+def projected_radius(radius, distance, fov_y, viewport_height):
+    if distance <= 0:
+        return float(viewport_height)
+    return radius * viewport_height / (2.0 * distance * math.tan(math.radians(fov_y) / 2))
+
+
+class SphereCache:
+    # Builds each level the first time it is needed and picks the level from
+    # the sphere's size on screen
+    def __init__(self, fov_y, viewport_height, levels=SPHERE_LEVELS):
+        self.fov_y = fov_y
+        self.viewport_height = viewport_height
+        self.levels = levels
+        self._meshes = {}
+        self._program = None  # instancing program, False when not available
+        self._offsets = None  # per-instance offset buffer
+        self._unit = {}  # client-side unit meshes for the fallback path
+
+    def mesh(self, bands):
+        mesh = self._meshes.get(bands)
+        if mesh is None:
+            mesh = self._meshes[bands] = SphereMesh(bands)
+        return mesh
+
+    def level_for(self, radius, distance):
+        pixels = projected_radius(radius, distance, self.fov_y, self.viewport_height)
+        wanted = 2 * math.pi * pixels / PIXELS_PER_BAND
+        for bands in self.levels:
+            if bands >= wanted:
+                return bands
+        return self.levels[-1]
+
+    # Draw a sphere at position; distance is the eye distance used for the LOD
+    def draw(self, position, radius, distance):
+        mesh = self.mesh(self.level_for(radius, distance))
+        # The unit sphere is scaled into place, so keep its normals unit length
+        glPushAttrib(GL_ENABLE_BIT)
+        glEnable(GL_RESCALE_NORMAL)
+        glPushMatrix()
+        glTranslatef(*position)
+        glScalef(radius, radius, radius)
+        mesh.draw()
+        glPopMatrix()
+        glPopAttrib()
+
+    # Draw a sphere of the given radius at every row of positions with a
+    # single draw call. With instancing the mesh is stored once and only
+    # the (n, 3) offsets are uploaded; without it the meshes are expanded
+    # into one vertex array in numpy and drawn with one glDrawElements.
+    def draw_many(self, positions, radius, distance):
+        positions = np.ascontiguousarray(positions, dtype=np.float32).reshape(-1, 3)
+        if not len(positions):
+            return
+        bands = self.level_for(radius, distance)
+        if self._program is None:
+            self._program = self._compile()
+        if self._program:
+            self._draw_instanced(self.mesh(bands), positions, radius)
+        else:
+            self._draw_expanded(bands, positions, radius)
+
+    def _compile(self):
+        if not bool(glDrawElementsInstanced) or not bool(glVertexAttribDivisor):
+            return False
+        try:
+            program = shaders.compileProgram(
+                shaders.compileShader(INSTANCE_VERTEX_SHADER, GL_VERTEX_SHADER),
+                shaders.compileShader(INSTANCE_FRAGMENT_SHADER, GL_FRAGMENT_SHADER))
+        except (GLError, RuntimeError):
+            return False
+        self._offset_location = glGetAttribLocation(program, "offset")
+        self._radius_location = glGetUniformLocation(program, "radius")
+        self._offsets = glGenBuffers(1)
+        return program
+
+    def _draw_instanced(self, mesh, positions, radius):
+        glUseProgram(self._program)
+        glUniform1f(self._radius_location, radius)
+        glBindBuffer(GL_ARRAY_BUFFER, self._offsets)
+        # A fresh store each frame so the driver need not wait for the last draw
+        glBufferData(GL_ARRAY_BUFFER, positions.nbytes, positions, GL_STREAM_DRAW)
+        glEnableVertexAttribArray(self._offset_location)
+        glVertexAttribPointer(self._offset_location, 3, GL_FLOAT, GL_FALSE, 0, ctypes.c_void_p(0))
+        glVertexAttribDivisor(self._offset_location, 1)
+        glBindBuffer(GL_ARRAY_BUFFER, 0)
+        mesh.draw_instances(len(positions))
+        glVertexAttribDivisor(self._offset_location, 0)
+        glDisableVertexAttribArray(self._offset_location)
+        glUseProgram(0)
+
+    def _draw_expanded(self, bands, positions, radius):
+        if bands not in self._unit:
+            self._unit[bands] = tessellate_sphere(bands, bands)
+        vertices, indices = self._unit[bands]
+        n = len(positions)
+        batch = (vertices[None] * radius + positions[:, None]).reshape(-1, 3)
+        batch_indices = (indices[None] + (np.arange(n, dtype=np.uint32) * len(vertices))[:, None]).reshape(-1)
+        glPushClientAttrib(GL_CLIENT_VERTEX_ARRAY_BIT)
+        glEnableClientState(GL_VERTEX_ARRAY)
+        glVertexPointer(3, GL_FLOAT, 0, batch)
+        glDrawElements(GL_TRIANGLES, len(batch_indices), GL_UNSIGNED_INT, batch_indices)
+        glPopClientAttrib()
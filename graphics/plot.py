@@ -0,0 +1,263 @@
+import numpy as np
+from OpenGL.GL import *
+
+from graphics.trails import TrailBuffer
+
+BACKGROUND = (0.08, 0.08, 0.1, 0.85)
+FRAME_COLOR = (0.4, 0.4, 0.45)
+
+
+# A step function for SimulationClock.step that takes its steps one at a
+# time and calls sample(state) after each, so plots get one sample per
+# physics step
+def sampled(step, sample):
+    def run(state, dt, n_steps=1, **params):
+        for _ in range(n_steps):
+            step(state, dt, 1, **params)
+            sample(state)
+        return state
+    return run
+
+
+class Series:
+    # Evenly spaced samples of one quantity in a ring of capacity samples
+    # (a power of two), with a min/max pyramid over them: level k holds the
+    # lowest and highest sample of every aligned run of 2**k samples.
+    # Bucket b of level k lives in slot b mod (capacity >> k), so the levels
+    # wrap round with the samples and a bucket is overwritten exactly when
+    # its first sample is.
+    #
+    # Drawing a window of the history picks the level with about one bucket
+    # per pixel, so it reads a couple of buckets per pixel however many
+    # samples the window holds, and every sample still counts towards the
+    # min/max of its pixel.
+    def __init__(self, capacity=1 << 20, dt=1.0):
+        self.capacity = 1 << max(int(capacity) - 1, 1).bit_length()
+        self.dt = dt  # time between samples
+        self.samples = np.zeros(self.capacity, dtype=np.float32)
+        depth = self.capacity.bit_length() - 1
+        # Level 0 is the samples themselves
+        self.lows = [self.samples] + [np.zeros(self.capacity >> k, dtype=np.float32) for k in range(1, depth + 1)]
+        self.highs = [self.samples] + [np.zeros(self.capacity >> k, dtype=np.float32) for k in range(1, depth + 1)]
+        self.count = 0  # samples ever appended
+
+    def __len__(self):
+        return min(self.count, self.capacity)
+
+    def clear(self):
+        self.count = 0
+
+    @property
+    def first(self):
+        return self.count - len(self)
+
+    # Add one sample. A level whose bucket neither starts nor widens leaves
+    # every level above it as it is, so this usually touches a level or two.
+    def append(self, value):
+        i = self.count
+        self.samples[i & (self.capacity - 1)] = value
+        self.count += 1
+        value = self.samples[i & (self.capacity - 1)]
+        for k in range(1, len(self.lows)):
+            slot = (i >> k) & ((self.capacity >> k) - 1)
+            if i & ((1 << k) - 1) == 0:
+                self.lows[k][slot] = self.highs[k][slot] = value
+                continue
+            low, high = self.lows[k], self.highs[k]
+            if value < low[slot]:
+                low[slot] = value
+            elif value > high[slot]:
+                high[slot] = value
+            else:
+                break
+
+    # Add many samples at once, rebuilding each level's touched buckets
+    # from the two below them
+    def extend(self, values):
+        values = np.asarray(values, dtype=np.float32).ravel()
+        if len(values) > self.capacity:
+            self.count += len(values) - self.capacity
+            values = values[-self.capacity:]
+        start, self.count = self.count, self.count + len(values)
+        if not len(values):
+            return
+        self.samples[(start + np.arange(len(values))) & (self.capacity - 1)] = values
+        for k in range(1, len(self.lows)):
+            buckets = np.arange(start >> k, ((self.count - 1) >> k) + 1)
+            slots = buckets & ((self.capacity >> k) - 1)
+            left = 2 * slots
+            # A bucket's second half may not have started yet
+            whole = (2 * buckets + 1) << (k - 1) < self.count
+            right = np.where(whole, left + 1, left)
+            self.lows[k][slots] = np.minimum(self.lows[k - 1][left], self.lows[k - 1][right])
+            self.highs[k][slots] = np.maximum(self.highs[k - 1][left], self.highs[k - 1][right])
+
+    # The samples [start, stop) drawn across width pixels, as arrays of
+    # pixel x and the low and high value in each column. Parts of the
+    # window outside the history are left empty. Windows with fewer samples
+    # than pixels give every sample its own x, with low == high.
+    def columns(self, start, stop, width):
+        window = max(stop - start, 1)
+        first, stop = max(start, self.first), min(stop, self.count)
+        if stop <= first:
+            return np.empty(0), np.empty(0, np.float32), np.empty(0, np.float32)
+        if window <= width:
+            index = np.arange(first, stop)
+            values = self.samples[index & (self.capacity - 1)]
+            return (index - start) * (width / window), values, values
+
+        k = min(int(np.log2(window / width)), len(self.lows) - 1)
+        # Skip a partly overwritten bucket at the old end
+        buckets = np.arange(max(first >> k, -(-self.first >> k)), ((stop - 1) >> k) + 1)
+        slots = buckets & ((self.capacity >> k) - 1)
+        column = np.clip(((buckets << k) - start) * width // window, 0, width - 1)
+        starts = np.flatnonzero(np.r_[True, column[1:] != column[:-1]])
+        return (column[starts].astype(float), np.minimum.reduceat(self.lows[k][slots], starts),
+                np.maximum.reduceat(self.highs[k][slots], starts))
+
+
+# Draw calls shared by the panels, in window pixels
+def _begin_panel(window_size, rect):
+    glPushAttrib(GL_ENABLE_BIT | GL_CURRENT_BIT | GL_COLOR_BUFFER_BIT | GL_LINE_BIT)
+    glMatrixMode(GL_PROJECTION)
+    glPushMatrix()
+    glLoadIdentity()
+    glOrtho(0, window_size[0], 0, window_size[1], -1, 1)
+    glMatrixMode(GL_MODELVIEW)
+    glPushMatrix()
+    glLoadIdentity()
+    glDisable(GL_DEPTH_TEST)
+    glDisable(GL_LIGHTING)
+    glEnable(GL_BLEND)
+    glBlendFunc(GL_SRC_ALPHA, GL_ONE_MINUS_SRC_ALPHA)
+    x, y, w, h = rect
+    glColor4f(*BACKGROUND)
+    glRectf(x, y, x + w, y + h)
+    glColor3f(*FRAME_COLOR)
+    glBegin(GL_LINE_LOOP)
+    glVertex2f(x, y)
+    glVertex2f(x + w, y)
+    glVertex2f(x + w, y + h)
+    glVertex2f(x, y + h)
+    glEnd()
+
+
+def _end_panel():
+    glMatrixMode(GL_PROJECTION)
+    glPopMatrix()
+    glMatrixMode(GL_MODELVIEW)
+    glPopMatrix()
+    glPopAttrib()
+
+
+def _draw_strip(vertices):
+    glEnableClientState(GL_VERTEX_ARRAY)
+    glVertexPointer(2, GL_FLOAT, 0, vertices)
+    glDrawArrays(GL_LINE_STRIP, 0, len(vertices))
+    glDisableClientState(GL_VERTEX_ARRAY)
+
+
+# Lowest and highest value with some room, and never an empty range
+def _padded(low, high):
+    if high - low < 1e-9 * max(abs(low), abs(high), 1e-12):
+        middle = (low + high) / 2
+        pad = max(abs(middle) * 0.1, 1e-6)
+        return middle - pad, middle + pad
+    pad = (high - low) * 0.05
+    return low - pad, high + pad
+
+
+class TimePlot:
+    # A panel in the window-pixel rectangle (x, y, w, h) plotting series
+    # against time: the last span seconds, or all of their history when
+    # span is None. Each pixel column is drawn as a vertical stroke from the
+    # lowest to the highest sample it covers, joined into one line strip,
+    # so a draw is one vertex pair per column whatever the history length.
+    # The value axis fits whatever is in view.
+    def __init__(self, window_size, rect, title, span=None):
+        self.window_size = window_size
+        self.rect = rect
+        self.title = title
+        self.span = span
+        self.lines = []
+
+    def add(self, series, color):
+        self.lines.append((series, color))
+        return series
+
+    def clear(self):
+        for series, _ in self.lines:
+            series.clear()
+
+    def draw(self, text_renderer):
+        x, y, w, h = self.rect
+        width = int(w)
+        strokes = []
+        for series, color in self.lines:
+            stop = series.count
+            start = series.first if self.span is None else stop - int(round(self.span / series.dt))
+            px, low, high = series.columns(start, stop, width)
+            if len(px):
+                strokes.append((px, low, high, color))
+
+        _begin_panel(self.window_size, self.rect)
+        if strokes:
+            bottom, top = _padded(min(float(s[1].min()) for s in strokes), max(float(s[2].max()) for s in strokes))
+            scale = (h - 24) / (top - bottom)  # the title has the top of the panel
+            for px, low, high, color in strokes:
+                vertices = np.empty((2 * len(px), 2), dtype=np.float32)
+                vertices[0::2, 0] = vertices[1::2, 0] = x + px
+                vertices[0::2, 1] = y + (low - bottom) * scale
+                vertices[1::2, 1] = y + (high - bottom) * scale
+                glColor3f(*color)
+                _draw_strip(vertices)
+        _end_panel()
+
+        text_renderer.draw(x + 6, y + h - 20, self.title, size=16)
+        if strokes:
+            text_renderer.draw(x + w - 80, y + h - 20, f"{top:.3g}", size=16)
+            text_renderer.draw(x + w - 80, y + 4, f"{bottom:.3g}", size=16)
+        shown = self.span if self.span is not None else max((len(s) * s.dt for s, _ in self.lines), default=0.0)
+        text_renderer.draw(x + 6, y + 4, f"last {shown:.1f} s", size=16)
+
+
+class PhasePlot:
+    # A panel plotting one quantity against another, such as angle against
+    # angular velocity, with the most recent capacity points of each
+    # curve. The axes fit everything plotted since the last clear().
+    def __init__(self, window_size, rect, title, capacity=8192):
+        self.window_size = window_size
+        self.rect = rect
+        self.title = title
+        self.capacity = capacity
+        self.curves = []
+        self.clear()
+
+    def add(self, color):
+        self.curves.append((TrailBuffer(self.capacity), color))
+        return len(self.curves) - 1
+
+    def clear(self):
+        for trail, _ in self.curves:
+            trail.clear()
+        self.low = np.full(2, np.inf)
+        self.high = np.full(2, -np.inf)
+
+    def append(self, curve, x, y):
+        self.curves[curve][0].append((x, y, 0.0))
+        np.minimum(self.low, (x, y), out=self.low)
+        np.maximum(self.high, (x, y), out=self.high)
+
+    def draw(self, text_renderer):
+        x, y, w, h = self.rect
+        _begin_panel(self.window_size, self.rect)
+        if np.all(self.high >= self.low):
+            (left, right), (bottom, top) = (_padded(lo, hi) for lo, hi in zip(self.low, self.high))
+            glTranslatef(x, y, 0)
+            glScalef(w / (right - left), (h - 24) / (top - bottom), 1)
+            glTranslatef(-left, -bottom, 0)
+            for trail, color in self.curves:
+                glColor3f(*color)
+                trail.draw()
+        _end_panel()
+        text_renderer.draw(x + 6, y + h - 20, self.title, size=16)
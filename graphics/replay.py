@@ -0,0 +1,120 @@
+import time
+
+from pygame.locals import *
+from OpenGL.GL import *
+
+from physics.clock import SimulationClock
+
+BAR_HEIGHT = 10
+BAR_MARGIN = 20
+SEEKS_PER_TRIM = 64  # records visited between releasing the pages read
+
+
+class ReplayControls:
+    # Plays back a Recording at its own speed, with a scrub bar along the
+    # bottom of the window. SPACE pauses, LEFT/RIGHT step one record,
+    # PAGE UP/DOWN jump a tenth of the run, HOME/END go to either end and
+    # dragging on the bar seeks. Only the current record is read. timer is
+    # the scene clock's, so that exports play back at the simulated rate.
+    def __init__(self, window_size, recording, timer=time.perf_counter):
+        self.window_size = window_size
+        self.recording = recording
+        self.frame = 0
+        self.playing = True
+        self.dragging = False
+        self.clock = SimulationClock(recording.dt, timer=timer)
+        self._seeks = 0
+
+    @property
+    def record(self):
+        return self.recording[self.frame]
+
+    def seek(self, frame):
+        frame = min(max(int(frame), 0), len(self.recording) - 1)
+        if frame != self.frame:
+            self.frame = frame
+            self._seeks += 1
+            if self._seeks >= SEEKS_PER_TRIM:
+                self.recording.trim()
+                self._seeks = 0
+
+    # True when the event was used for replay and should go no further
+    def handle_event(self, event):
+        count = len(self.recording)
+        if event.type == KEYDOWN:
+            if event.key == K_SPACE:
+                self.playing = not self.playing
+                self.clock.reset()
+            elif event.key == K_LEFT:
+                self.seek(self.frame - 1)
+            elif event.key == K_RIGHT:
+                self.seek(self.frame + 1)
+            elif event.key == K_PAGEUP:
+                self.seek(self.frame + max(1, count // 10))
+            elif event.key == K_PAGEDOWN:
+                self.seek(self.frame - max(1, count // 10))
+            elif event.key == K_HOME:
+                self.seek(0)
+            elif event.key == K_END:
+                self.seek(count - 1)
+            else:
+                return False
+            return True
+        if event.type == MOUSEBUTTONDOWN and event.button == 1 and self._on_bar(event.pos):
+            self.dragging = True
+            self._seek_to(event.pos[0])
+            return True
+        if event.type == MOUSEMOTION and self.dragging:
+            self._seek_to(event.pos[0])
+            return True
+        if event.type == MOUSEBUTTONUP and self.dragging:
+            self.dragging = False
+            return True
+        return False
+
+    def _on_bar(self, pos):
+        return pos[1] >= self.window_size[1] - BAR_MARGIN - 2 * BAR_HEIGHT
+
+    def _seek_to(self, x):
+        width = self.window_size[0] - 2 * BAR_MARGIN
+        self.seek((x - BAR_MARGIN) / width * (len(self.recording) - 1))
+
+    # Advance through the records in real time while playing
+    def update(self):
+        steps = self.clock.advance()
+        if self.playing and not self.dragging:
+            self.seek(self.frame + steps)
+
+    # The bar in window pixels and a time label, queued on text_renderer
+    def draw(self, text_renderer):
+        w, h = self.window_size
+        left, right = BAR_MARGIN, w - BAR_MARGIN
+        done = left + (right - left) * self.frame / max(len(self.recording) - 1, 1)
+        glPushAttrib(GL_ENABLE_BIT | GL_CURRENT_BIT)
+        glMatrixMode(GL_PROJECTION)
+        glPushMatrix()
+        glLoadIdentity()
+        glOrtho(0, w, 0, h, -1, 1)
+        glMatrixMode(GL_MODELVIEW)
+        glPushMatrix()
+        glLoadIdentity()
+        glDisable(GL_DEPTH_TEST)
+        glDisable(GL_LIGHTING)
+        glBegin(GL_QUADS)
+        glColor3f(0.3, 0.3, 0.3)
+        for x0, x1 in ((left, right), (left, done)):
+            glVertex2f(x0, BAR_MARGIN)
+            glVertex2f(x1, BAR_MARGIN)
+            glVertex2f(x1, BAR_MARGIN + BAR_HEIGHT)
+            glVertex2f(x0, BAR_MARGIN + BAR_HEIGHT)
+            glColor3f(1.0, 0.8, 0.2)
+        glEnd()
+        glMatrixMode(GL_PROJECTION)
+        glPopMatrix()
+        glMatrixMode(GL_MODELVIEW)
+        glPopMatrix()
+        glPopAttrib()
+        state = "playing" if self.playing else "paused"
+        text_renderer.draw(left, BAR_MARGIN + BAR_HEIGHT + 6,
+                           f"Replay {state}: t = {self.record['time']:.2f} s, step {self.frame + 1} / {len(self.recording)}"
+                           "  (SPACE, LEFT/RIGHT, PAGE UP/DOWN, HOME/END, drag bar; P to leave)", size=20)
@@ -0,0 +1,83 @@
+import time
+
+from OpenGL.GL import *
+
+from graphics.trails import TrailBatch
+from physics import projectile
+from physics.clock import SimulationClock
+
+# Number of projectiles per salvo to choose from
+SALVO_SIZES = (1, 10, 100, 1000, 5000)
+TRAIL_ROWS = 128  # trail points kept per projectile
+
+
+class Salvo:
+    # A volley of projectiles simulated as one state array and drawn with
+    # one instanced sphere draw and one batched trail draw, so the frame
+    # costs about the same for one projectile as for thousands. It runs on
+    # its own clock, which the scene keeps in step with its time scale and
+    # pause; pass the scene clock's timer so that exports drive both.
+    def __init__(self, spheres, dt, size=2, timer=time.perf_counter):
+        self.spheres = spheres
+        self.size = size  # index into SALVO_SIZES
+        self.clock = SimulationClock(dt, timer=timer)
+        self.state = None
+        self.previous = None
+        self.trails = None
+        self.in_flight = 0
+
+    def __len__(self):
+        return 0 if self.state is None else len(self.state)
+
+    @property
+    def count(self):
+        return SALVO_SIZES[self.size]
+
+    def bigger(self):
+        self.size = min(self.size + 1, len(SALVO_SIZES) - 1)
+
+    def smaller(self):
+        self.size = max(self.size - 1, 0)
+
+    def fire(self, position, velocity):
+        self.state = projectile.salvo(position, velocity, self.count)
+        self.previous = self.state.copy()
+        self.in_flight = self.count
+        if self.trails is None or self.trails.bodies != self.count:
+            self.clear_trails()
+            self.trails = TrailBatch(self.count, TRAIL_ROWS)
+        self.trails.clear()
+        self.trails.append(self.state[:, projectile.POSITION])
+        self.clock.reset()
+
+    def clear(self):
+        self.state = None
+        self.in_flight = 0
+        self.clear_trails()
+
+    def clear_trails(self):
+        if self.trails is not None:
+            self.trails.delete()
+            self.trails = None
+
+    # Take the steps that are due; trails get a point per frame while any
+    # projectile is still flying
+    def update(self, time_scale=1.0, paused=False, **params):
+        if self.state is None or not self.in_flight:
+            return
+        self.clock.time_scale = time_scale
+        self.clock.paused = paused
+        landed = self.clock.step(projectile.step, self.state, self.previous, **params)
+        if landed is not None:
+            self.in_flight = int((~landed).sum())
+            self.trails.append(self.state[:, projectile.POSITION])
+
+    def draw(self, radius, distance):
+        if self.state is None:
+            return
+        self.spheres.draw_many(self.clock.interpolate(self.previous, self.state)[:, projectile.POSITION],
+                               radius, distance)
+        glPushAttrib(GL_CURRENT_BIT)
+        glColor3f(0.9, 0.6, 0.2)
+        self.trails.draw()
+        glPopAttrib()
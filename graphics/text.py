@@ -0,0 +1,229 @@
+import ctypes
+import time
+from collections import OrderedDict
+from functools import lru_cache
+
+import numpy as np
+import pygame
+from OpenGL.GL import *
+
+# Characters baked into every atlas; anything else is drawn as '?'
+DEFAULT_CHARSET = "".join(chr(code) for code in range(32, 127)) + "°θω±²"
+ATLAS_WIDTH = 1024
+LAYOUT_CACHE_SIZE = 512
+FLOATS_PER_VERTEX = 8  # x, y, u, v, r, g, b, a
+VERTEX_STRIDE = FLOATS_PER_VERTEX * 4
+
+# Fonts are cached per size instead of being loaded for every string
+@lru_cache(maxsize=None)
+def get_font(size):
+    if not pygame.font.get_init():
+        pygame.font.init()
+    return pygame.font.Font(None, size)
+
+
+class GlyphAtlas:
+    # All glyphs of one font size rendered once into a single texture
+    def __init__(self, size, charset=DEFAULT_CHARSET):
+        font = get_font(size)
+        self.size = size
+        self.line_height = font.get_height()
+        glyphs = [(ch, font.render(ch, True, (255, 255, 255))) for ch in charset]
+
+        # Pack the glyphs into rows of at most ATLAS_WIDTH pixels
+        placements = []
+        x = y = 0
+        for ch, surface in glyphs:
+            w = surface.get_width()
+            if x + w > ATLAS_WIDTH:
+                x = 0
+                y += self.line_height + 1
+            placements.append((x, y))
+            x += w + 1
+        atlas_height = y + self.line_height
+
+        # White background keeps the colour channels at full intensity after
+        # blending, so only the alpha channel carries the glyph coverage
+        atlas = pygame.Surface((ATLAS_WIDTH, atlas_height), pygame.SRCALPHA)
+        atlas.fill((255, 255, 255, 0))
+        for (ch, surface), pos in zip(glyphs, placements):
+            atlas.blit(surface, pos)
+
+        # Per-glyph tables indexed by glyph number; lookup maps a code point to it
+        count = len(glyphs)
+        self.advance = np.empty(count, dtype=np.float32)
+        self.uv = np.empty((count, 4), dtype=np.float32)
+        self.width = np.empty(count, dtype=np.float32)
+        for i, ((ch, surface), (gx, gy)) in enumerate(zip(glyphs, placements)):
+            w = surface.get_width()
+            self.advance[i] = font.size(ch)[0]
+            self.width[i] = w
+            # The atlas is flipped on upload, so v runs from the bottom up
+            self.uv[i] = (gx / ATLAS_WIDTH, 1.0 - (gy + self.line_height) / atlas_height,
+                          (gx + w) / ATLAS_WIDTH, 1.0 - gy / atlas_height)
+        # One slot per code point up to the highest in the charset, and one
+        # past it that every higher code point is clamped to
+        self.lookup = np.full(max(map(ord, charset)) + 2, charset.index("?"), dtype=np.intp)
+        for i, ch in enumerate(charset):
+            self.lookup[ord(ch)] = i
+
+        self.texture = glGenTextures(1)
+        glBindTexture(GL_TEXTURE_2D, self.texture)
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MIN_FILTER, GL_NEAREST)
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MAG_FILTER, GL_NEAREST)
+        glPixelStorei(GL_UNPACK_ALIGNMENT, 1)
+        glTexImage2D(GL_TEXTURE_2D, 0, GL_RGBA, ATLAS_WIDTH, atlas_height, 0, GL_RGBA,
+                     GL_UNSIGNED_BYTE, pygame.image.tostring(atlas, "RGBA", True))
+
+        self._layouts = OrderedDict()
+
+    def glyph_indices(self, text):
+        codes = np.frombuffer(text.encode("utf-32-le"), dtype=np.uint32)
+        return self.lookup[np.minimum(codes, len(self.lookup) - 1)]
+
+    def measure(self, text):
+        return int(self.advance[self.glyph_indices(text)].sum()), self.line_height
+
+    # Quad corners and texture coordinates of a string placed at the origin,
+    # as an (n * 4, 4) array of x, y, u, v; recently used strings are cached
+    def layout(self, text):
+        quads = self._layouts.get(text)
+        if quads is not None:
+            self._layouts.move_to_end(text)
+            return quads
+        idx = self.glyph_indices(text)
+        n = len(idx)
+        pen = np.zeros(n, dtype=np.float32)
+        np.cumsum(self.advance[idx][:-1], out=pen[1:])
+        x0, x1 = pen, pen + self.width[idx]
+        u0, v0, u1, v1 = self.uv[idx].T
+        quads = np.empty((n, 4, 4), dtype=np.float32)
+        quads[:, :, 0] = np.stack([x0, x1, x1, x0], axis=1)
+        quads[:, :, 1] = [0.0, 0.0, self.line_height, self.line_height]
+        quads[:, :, 2] = np.stack([u0, u1, u1, u0], axis=1)
+        quads[:, :, 3] = np.stack([v0, v0, v1, v1], axis=1)
+        quads = quads.reshape(-1, 4)
+        self._layouts[text] = quads
+        if len(self._layouts) > LAYOUT_CACHE_SIZE:
+            self._layouts.popitem(last=False)
+        return quads
+
+
+class TextBlock:
+    # Text that never changes (control help etc.) uploaded once into its own buffer
+    def __init__(self, size, vbo, count):
+        self.size = size
+        self.vbo = vbo
+        self.count = count
+
+    def delete(self):
+        if self.vbo:
+            glDeleteBuffers(1, [self.vbo])
+            self.vbo = 0
+
+
+class TextRenderer:
+    # Queues strings during a frame and draws them with one call per font size.
+    # Positions are window pixels measured from the bottom-left corner, the
+    # same convention as glWindowPos.
+
+    # Nanoseconds spent in flush() by all renderers, for frame timing
+    flush_ns = 0
+
+    def __init__(self, window_size):
+        self.window_size = window_size
+        self._atlases = {}
+        self._queue = {}
+        self._blocks = []
+        self._stream_vbo = glGenBuffers(1)
+
+    def atlas(self, size):
+        atlas = self._atlases.get(size)
+        if atlas is None:
+            atlas = self._atlases[size] = GlyphAtlas(size)
+        return atlas
+
+    def measure(self, text, size=24):
+        return self.atlas(size).measure(text)
+
+    def draw(self, x, y, text, size=24, color=(1.0, 1.0, 1.0, 1.0)):
+        if text:
+            self._queue.setdefault(size, []).append((x, y, text, color))
+
+    def draw_block(self, block):
+        self._blocks.append(block)
+
+    # Build a reusable block from (x, y, text) lines that share a size and colour
+    def block(self, lines, size=24, color=(1.0, 1.0, 1.0, 1.0)):
+        vertices = self._build_vertices(size, [(x, y, text, color) for x, y, text in lines])
+        vbo = glGenBuffers(1)
+        glBindBuffer(GL_ARRAY_BUFFER, vbo)
+        glBufferData(GL_ARRAY_BUFFER, vertices.nbytes, vertices, GL_STATIC_DRAW)
+        glBindBuffer(GL_ARRAY_BUFFER, 0)
+        return TextBlock(size, vbo, len(vertices))
+
+    def _build_vertices(self, size, items):
+        atlas = self.atlas(size)
+        layouts = [atlas.layout(text) for _, _, text, _ in items]
+        vertices = np.empty((sum(len(quads) for quads in layouts), FLOATS_PER_VERTEX), dtype=np.float32)
+        start = 0
+        for (x, y, _, color), quads in zip(items, layouts):
+            end = start + len(quads)
+            vertices[start:end, :4] = quads
+            vertices[start:end, 0] += x
+            vertices[start:end, 1] += y
+            vertices[start:end, 4:] = color if len(color) == 4 else (*color, 1.0)
+            start = end
+        return vertices
+
+    def _draw_buffer(self, vbo, size, count):
+        glBindTexture(GL_TEXTURE_2D, self.atlas(size).texture)
+        glBindBuffer(GL_ARRAY_BUFFER, vbo)
+        glVertexPointer(2, GL_FLOAT, VERTEX_STRIDE, ctypes.c_void_p(0))
+        glTexCoordPointer(2, GL_FLOAT, VERTEX_STRIDE, ctypes.c_void_p(8))
+        glColorPointer(4, GL_FLOAT, VERTEX_STRIDE, ctypes.c_void_p(16))
+        glDrawArrays(GL_QUADS, 0, count)
+
+    # Draw everything queued since the last flush
+    def flush(self):
+        if not self._queue and not self._blocks:
+            return
+        start = time.perf_counter_ns()
+        glPushAttrib(GL_ENABLE_BIT | GL_COLOR_BUFFER_BIT | GL_TEXTURE_BIT | GL_CURRENT_BIT)
+        glPushClientAttrib(GL_CLIENT_VERTEX_ARRAY_BIT)
+        glMatrixMode(GL_PROJECTION)
+        glPushMatrix()
+        glLoadIdentity()
+        glOrtho(0, self.window_size[0], 0, self.window_size[1], -1, 1)
+        glMatrixMode(GL_MODELVIEW)
+        glPushMatrix()
+        glLoadIdentity()
+
+        glDisable(GL_DEPTH_TEST)
+        glDisable(GL_LIGHTING)
+        glEnable(GL_TEXTURE_2D)
+        glEnable(GL_BLEND)
+        glBlendFunc(GL_SRC_ALPHA, GL_ONE_MINUS_SRC_ALPHA)
+        glTexEnvi(GL_TEXTURE_ENV, GL_TEXTURE_ENV_MODE, GL_MODULATE)
+        glEnableClientState(GL_VERTEX_ARRAY)
+        glEnableClientState(GL_TEXTURE_COORD_ARRAY)
+        glEnableClientState(GL_COLOR_ARRAY)
+
+        for block in self._blocks:
+            self._draw_buffer(block.vbo, block.size, block.count)
+        for size, items in self._queue.items():
+            vertices = self._build_vertices(size, items)
+            glBindBuffer(GL_ARRAY_BUFFER, self._stream_vbo)
+            glBufferData(GL_ARRAY_BUFFER, vertices.nbytes, vertices, GL_STREAM_DRAW)
+            self._draw_buffer(self._stream_vbo, size, len(vertices))
+        glBindBuffer(GL_ARRAY_BUFFER, 0)
+
+        glMatrixMode(GL_PROJECTION)
+        glPopMatrix()
+        glMatrixMode(GL_MODELVIEW)
+        glPopMatrix()
+        glPopClientAttrib()
+        glPopAttrib()
+        self._queue.clear()
+        self._blocks.clear()
+        TextRenderer.flush_ns += time.perf_counter_ns() - start
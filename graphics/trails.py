@@ -0,0 +1,241 @@
+import ctypes
+
+import numpy as np
+from OpenGL.GL import *
+
+
+class TrailBuffer:
+    # Fixed-size float32 ring of 3D points drawn as one line strip.
+    #
+    # Every point is written twice, at i and i + capacity, so the live points
+    # always form one contiguous window of the storage and the whole trail
+    # can be drawn with a single glDrawArrays call however far it wrapped.
+    #
+    # With simplify=True points that barely change the line's shape replace
+    # the previous point instead of being appended, and once the buffer fills
+    # up every other point between the oldest and the newest is dropped and
+    # the tolerance doubled. The trail then keeps its whole history, launch
+    # point included, within the same vertex budget instead of forgetting
+    # its oldest points.
+    def __init__(self, capacity=4096, simplify=False, tolerance=0.005):
+        self.capacity = capacity
+        self.simplify = simplify
+        self.tolerance = tolerance
+        self._base_tolerance = tolerance
+        self._storage = np.zeros((2 * capacity, 3), dtype=np.float32)
+        self._head = 0  # index of the next write
+        self.count = 0
+        self._direction = None  # unit direction of the current simplified run
+        self._vbo = None
+        self._dirty = []
+
+    def __len__(self):
+        return self.count
+
+    def clear(self):
+        self._head = 0
+        self.count = 0
+        self.tolerance = self._base_tolerance
+        self._direction = None
+        self._dirty.clear()
+
+    @property
+    def first(self):
+        return (self._head - self.count) % self.capacity
+
+    # Live points oldest first, as a view into the storage
+    def points(self):
+        first = self.first
+        return self._storage[first:first + self.count]
+
+    def last(self):
+        return self._storage[(self._head - 1) % self.capacity]
+
+    def _write(self, index, values):
+        end = index + len(values)
+        self._storage[index:end] = values
+        self._storage[index + self.capacity:end + self.capacity] = values
+        self._dirty.append((index, end))
+        self._dirty.append((index + self.capacity, end + self.capacity))
+        if len(self._dirty) > 16:
+            self._dirty = [(min(lo for lo, _ in self._dirty), max(hi for _, hi in self._dirty))]
+
+    # Append an (n, 3) block of points, wrapping around the ring as needed
+    def extend(self, points):
+        points = np.asarray(points, dtype=np.float32).reshape(-1, 3)
+        if self.simplify:
+            for point in points:
+                self.append(point)
+            return
+        if len(points) > self.capacity:
+            points = points[-self.capacity:]
+        split = min(len(points), self.capacity - self._head)
+        self._write(self._head, points[:split])
+        if split < len(points):
+            self._write(0, points[split:])
+        self._head = (self._head + len(points)) % self.capacity
+        self.count = min(self.count + len(points), self.capacity)
+
+    def append(self, point):
+        point = np.asarray(point, dtype=np.float32)
+        if self.simplify and self.count >= 2 and self._redundant(point):
+            # The newest point takes the place of the previous one
+            self._write((self._head - 1) % self.capacity, point[None])
+            return
+        if self.simplify and self.count == self.capacity:
+            self._decimate()
+        if self.simplify and self.count >= 1:
+            self._start_run(self.last(), point)
+        self._write(self._head, point[None])
+        self._head = (self._head + 1) % self.capacity
+        self.count = min(self.count + 1, self.capacity)
+
+    def _start_run(self, anchor, point):
+        segment = point - anchor
+        length = np.sqrt(segment.dot(segment))
+        self._direction = segment / length if length > 0.0 else None
+
+    # True when the new point lies within tolerance of the line that started
+    # at the point before the last one. The direction is fixed for the whole
+    # run, so every point dropped from it stays within tolerance too.
+    def _redundant(self, point):
+        if self._direction is None:
+            return False
+        anchor = self._storage[(self._head - 2) % self.capacity]
+        offset = np.cross(self._direction, point - anchor)
+        return offset.dot(offset) <= self.tolerance * self.tolerance
+
+    # Keep the oldest and newest points and every other one in between, and
+    # coarsen the tolerance
+    def _decimate(self):
+        points = self.points()
+        kept = np.concatenate([points[:1], points[2:-1:2], points[-1:]])
+        self._head = 0
+        self.count = 0
+        self._storage[:] = 0
+        self._write(0, kept)
+        self._dirty = [(0, 2 * self.capacity)]
+        self._head = len(kept)
+        self.count = len(kept)
+        self.tolerance *= 2
+        self._start_run(kept[-2], kept[-1])
+
+    # Upload only the ranges written since the last draw
+    def _sync(self):
+        if self._vbo is None:
+            self._vbo = glGenBuffers(1)
+            glBindBuffer(GL_ARRAY_BUFFER, self._vbo)
+            glBufferData(GL_ARRAY_BUFFER, self._storage.nbytes, self._storage, GL_DYNAMIC_DRAW)
+            self._dirty.clear()
+            return
+        glBindBuffer(GL_ARRAY_BUFFER, self._vbo)
+        for lo, hi in self._dirty:
+            glBufferSubData(GL_ARRAY_BUFFER, lo * 12, (hi - lo) * 12, self._storage[lo:hi])
+        self._dirty.clear()
+
+    def draw(self, mode=GL_LINE_STRIP):
+        if self.count < 2:
+            return
+        self._sync()
+        glPushClientAttrib(GL_CLIENT_VERTEX_ARRAY_BIT)
+        glEnableClientState(GL_VERTEX_ARRAY)
+        glVertexPointer(3, GL_FLOAT, 0, ctypes.c_void_p(0))
+        glDrawArrays(mode, self.first, self.count)
+        glPopClientAttrib()
+        glBindBuffer(GL_ARRAY_BUFFER, 0)
+
+    def delete(self):
+        if self._vbo is not None:
+            glDeleteBuffers(1, [self._vbo])
+            self._vbo = None
+
+
+class TrailBatch:
+    # Trails of many bodies that all move at once, drawn as one batch of
+    # line segments.
+    #
+    # Each append adds one row with a point per body. Rows are stored
+    # twice, at i and i + capacity, like TrailBuffer's points, so the live
+    # rows are one contiguous block however far the ring has wrapped. The
+    # segments of every trail between every pair of consecutive rows are
+    # listed once in a static index buffer; a draw points the vertex array
+    # at the first live row and draws the indices for the live rows.
+    def __init__(self, bodies, capacity=256):
+        self.bodies = bodies
+        self.capacity = capacity
+        self._storage = np.zeros((2 * capacity, bodies, 3), dtype=np.float32)
+        self._head = 0
+        self.count = 0
+        self._vbo = None
+        self._ibo = None
+        self._dirty = []
+
+    def __len__(self):
+        return self.count
+
+    def clear(self):
+        self._head = 0
+        self.count = 0
+        self._dirty.clear()
+
+    @property
+    def first(self):
+        return (self._head - self.count) % self.capacity
+
+    # Live rows oldest first, as an (count, bodies, 3) view
+    def points(self):
+        first = self.first
+        return self._storage[first:first + self.count]
+
+    # Add the (bodies, 3) positions of every body as the newest row
+    def append(self, positions):
+        self._storage[self._head] = positions
+        self._storage[self._head + self.capacity] = positions
+        self._dirty.append(self._head)
+        self._dirty.append(self._head + self.capacity)
+        self._head = (self._head + 1) % self.capacity
+        self.count = min(self.count + 1, self.capacity)
+
+    # Row r of body b is vertex r * bodies + b from the first live row, and
+    # each body gets a segment from every row to the next one
+    def _segment_indices(self):
+        row = np.arange(self.capacity - 1, dtype=np.uint32)[:, None] * self.bodies
+        body = np.arange(self.bodies, dtype=np.uint32)[None, :]
+        start = (row + body).reshape(-1)
+        return np.stack([start, start + self.bodies], axis=1).reshape(-1)
+
+    # Upload only the rows written since the last draw
+    def _sync(self):
+        row_bytes = self.bodies * 12
+        if self._vbo is None:
+            self._vbo, self._ibo = glGenBuffers(2)
+            glBindBuffer(GL_ARRAY_BUFFER, self._vbo)
+            glBufferData(GL_ARRAY_BUFFER, self._storage.nbytes, self._storage, GL_DYNAMIC_DRAW)
+            indices = self._segment_indices()
+            glBindBuffer(GL_ELEMENT_ARRAY_BUFFER, self._ibo)
+            glBufferData(GL_ELEMENT_ARRAY_BUFFER, indices.nbytes, indices, GL_STATIC_DRAW)
+            glBindBuffer(GL_ELEMENT_ARRAY_BUFFER, 0)
+            self._dirty.clear()
+            return
+        glBindBuffer(GL_ARRAY_BUFFER, self._vbo)
+        for index in self._dirty:
+            glBufferSubData(GL_ARRAY_BUFFER, index * row_bytes, row_bytes, self._storage[index])
+        self._dirty.clear()
+
+    def draw(self):
+        if self.count < 2:
+            return
+        self._sync()
+        glPushClientAttrib(GL_CLIENT_VERTEX_ARRAY_BIT)
+        glBindBuffer(GL_ELEMENT_ARRAY_BUFFER, self._ibo)
+        glEnableClientState(GL_VERTEX_ARRAY)
+        glVertexPointer(3, GL_FLOAT, 0, ctypes.c_void_p(self.first * self.bodies * 12))
+        glDrawElements(GL_LINES, 2 * (self.count - 1) * self.bodies, GL_UNSIGNED_INT, ctypes.c_void_p(0))
+        glPopClientAttrib()
+        glBindBuffer(GL_ARRAY_BUFFER, 0)
+        glBindBuffer(GL_ELEMENT_ARRAY_BUFFER, 0)
+
+    def delete(self):
+        if self._vbo is not None:
+            glDeleteBuffers(2, [self._vbo, self._ibo])
+            self._vbo = None
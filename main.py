@@ -1,28 +1,29 @@
 import tkinter as tk
 from tkinter import ttk, messagebox
-from PIL import Image, ImageTk
 import subprocess
 import os
+import sys
+import time
+
+# All visualizations run as scenes in one host process, started on the
+# first click and told which scene to show over its stdin after that
+host_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "scene_host.py")
+host = None
 
 # Function to open a script based on the selected option
 def open_script(option):
-    script_folder = "scripts"
-    scripts = {
-        "Simple Motion": os.path.join(script_folder, "1.py"),
-        "Simple Pendulum": os.path.join(script_folder, "2.py"),
-        "Gravity": os.path.join(script_folder, "3.py"),
-        "Projectile Motion": os.path.join(script_folder, "4.py")
-        # Add more options as needed
-    }
-    if option in scripts:
-        script_path = scripts[option]
-        try:
-            subprocess.Popen(["python", script_path])  # Open script in a new process
-            messagebox.showinfo("Script Launched", f"The script '{option}' has been launched successfully.")
-        except FileNotFoundError:
-            messagebox.showerror("Error", f"The script '{option}' could not be found.")
-        except Exception as e:
-            messagebox.showerror("Error", f"An error occurred while launching '{option}': {str(e)}")
+    global host
+    try:
+        if host is None or host.poll() is not None:
+            host = subprocess.Popen([sys.executable, host_path, "--stdin", option], stdin=subprocess.PIPE, text=True)
+        else:
+            host.stdin.write(option + "\n")
+            host.stdin.flush()
+        messagebox.showinfo("Script Launched", f"The script '{option}' has been launched successfully.")
+    except FileNotFoundError:
+        messagebox.showerror("Error", f"The script '{option}' could not be found.")
+    except Exception as e:
+        messagebox.showerror("Error", f"An error occurred while launching '{option}': {str(e)}")
 
 # Create the main application window
 root = tk.Tk()
@@ -37,7 +38,7 @@ label = ttk.Label(frame, text="Select an option for Visualization:", font=("Helv
 label.grid(row=0, column=0, columnspan=3, pady=10)
 
 # Create a scrollable list of options
-options = ["Simple Motion", "Simple Pendulum", "Gravity", "Projectile Motion"]  # Example options, modify as needed
+options = ["Simple Motion", "Simple Pendulum", "Gravity", "Projectile Motion", "Double Pendulum"]  # Example options, modify as needed
 scrollbar = ttk.Scrollbar(frame, orient="vertical")
 option_listbox = tk.Listbox(frame, yscrollcommand=scrollbar.set, width=40, height=3, font=("Helvetica", 12))
 
@@ -48,24 +49,36 @@ option_listbox.grid(row=1, column=0, padx=10, pady=5, columnspan=3, sticky="nsew
 scrollbar.grid(row=1, column=3, sticky="ns")
 scrollbar.config(command=option_listbox.yview)
 
-# Add icons to buttons using PIL
-icon_folder = "icons"
+# Add icons to buttons. File names are matched case-insensitively, since
+# the icons on disk are not all named the same way.
+icon_folder = os.path.join(os.path.dirname(os.path.abspath(__file__)), "Icons")
+icon_files = {name.lower(): os.path.join(icon_folder, name) for name in os.listdir(icon_folder)} if os.path.isdir(icon_folder) else {}
 icons = {
-    "Simple Motion": os.path.join(icon_folder, "icon1.png"),
-    "Simple Pendulum": os.path.join(icon_folder, "icon2.png"),
-    "Gravity": os.path.join(icon_folder, "icon3.png"),
-    "Projectile Motion": os.path.join(icon_folder, "icon4.png")
+    "Simple Motion": icon_files.get("icon1.png"),
+    "Simple Pendulum": icon_files.get("icon2.png"),
+    "Gravity": icon_files.get("icon3.png"),
+    "Projectile Motion": icon_files.get("icon4.png")
     # Add more icons as needed
 }
 
+# Icons are decoded on every launch. Tk 8.6 reads PNG natively, so PIL is
+# only imported when it cannot. There is no decoded-icon cache on disk:
+# Tk has no raw RGBA image format, and the icons need their alpha, so a
+# cache would still be decoded on every launch.
+def load_icon(path):
+    try:
+        return tk.PhotoImage(file=path)
+    except tk.TclError:
+        from PIL import Image, ImageTk
+        return ImageTk.PhotoImage(Image.open(path))
+
 buttons = []
 for idx, option in enumerate(options):
     icon_path = icons.get(option, None)
     button_text = option
     if icon_path:
         try:
-            pil_image = Image.open(icon_path)
-            tk_image = ImageTk.PhotoImage(pil_image)
+            tk_image = load_icon(icon_path)
             button = ttk.Button(frame, text=button_text, image=tk_image, compound="left", command=lambda opt=option: on_button_click(opt))
             button.image = tk_image  # Keep a reference to avoid garbage collection
         except Exception as e:
@@ -88,5 +101,11 @@ position_right = int(root.winfo_screenwidth() / 2 - window_width / 2)
 position_down = int(root.winfo_screenheight() / 2 - window_height / 2)
 root.geometry(f"+{position_right}+{position_down}")
 
-# Run the main loop
-root.mainloop()
+# The startup benchmark only needs the time the first frame is shown
+if os.environ.get("STARTUP_BENCHMARK"):
+    root.update()
+    print(f"first frame {time.time():.6f}", flush=True)
+    root.destroy()
+else:
+    # Run the main loop
+    root.mainloop()
@@ -0,0 +1,4 @@
+# Headless simulation models behind the visualization scripts.
+# Nothing in this package imports pygame or OpenGL. Import the models
+# you need, e.g. from physics import pendulum; this file imports nothing,
+# so loading one model does not load the others.
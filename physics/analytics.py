@@ -0,0 +1,224 @@
+import numpy as np
+
+# Streaming measurements on a scene's state, fed one physics step at a
+# time (Scripts/2.py). Every measurement keeps a fixed amount of state per
+# channel, so a sample costs the same however long the run has been going.
+# Channels are independent signals of the same kind, such as the angles of
+# several pendulums, and are updated together as one array.
+FORGETTING = 0.8  # weight kept by the older peaks in the damping fit at each new peak
+SPECTRUM_WINDOW = 2048
+SPECTRUM_HOP = 256  # samples between spectra
+
+
+class Period:
+    # Period from the times a signal crosses level going up, each
+    # interpolated linearly between the two samples around it.
+    # oscillations counts the crossings, so the first full cycle is 1.
+    def __init__(self, channels, level=0.0):
+        self.level = level
+        self.channels = channels
+        self.reset()
+
+    def reset(self):
+        self.previous = np.full(self.channels, np.nan)
+        self.last_crossing = np.full(self.channels, np.nan)
+        self.period = np.full(self.channels, np.nan)
+        self.oscillations = np.zeros(self.channels, dtype=int)
+
+    def update(self, t, dt, x):
+        up = (self.previous < self.level) & (x >= self.level)
+        if up.any():
+            crossing = t - dt + (self.level - self.previous[up]) / (x[up] - self.previous[up]) * dt
+            self.period[up] = crossing - self.last_crossing[up]
+            self.last_crossing[up] = crossing
+            self.oscillations[up] += 1
+        self.previous = np.array(x, dtype=float)
+
+    @property
+    def frequency(self):
+        return 1 / self.period
+
+
+class Damping:
+    # Damping from the decay of the swing. Each turning point of the signal
+    # is placed on the parabola through the three samples around it, and
+    # log amplitude is fitted against time by least squares with
+    # exponentially fading weights, so the fit follows a change in
+    # damping. The slope is the decay rate; times a period it is the
+    # logarithmic decrement, from which the damping ratio follows.
+    def __init__(self, channels, level=0.0, forgetting=FORGETTING):
+        self.level = level
+        self.forgetting = forgetting
+        self.channels = channels
+        self.reset()
+
+    def reset(self):
+        n = self.channels
+        self.samples = np.full((3, n), np.nan)  # the last three, oldest first
+        self.last_peak = np.full(n, np.nan)
+        self.half_period = np.full(n, np.nan)
+        self.weight = np.zeros(n)
+        self.mean_t = np.zeros(n)
+        self.mean_y = np.zeros(n)
+        self.var_t = np.zeros(n)
+        self.cov_ty = np.zeros(n)
+        self.peaks = np.zeros(n, dtype=int)
+
+    def update(self, t, dt, x):
+        self.samples[:2] = self.samples[1:]
+        self.samples[2] = x
+        y0, y1, y2 = self.samples
+        turning = (y1 - y0) * (y2 - y1) < 0
+        if not turning.any():
+            return
+        y0, y1, y2 = y0[turning], y1[turning], y2[turning]
+        curvature = y0 - 2 * y1 + y2
+        offset = np.where(curvature != 0, 0.5 * (y0 - y2) / np.where(curvature != 0, curvature, 1), 0.0)
+        peak_t = t - dt + offset * dt
+        amplitude = np.abs(y1 - 0.25 * (y0 - y2) * offset - self.level)
+
+        # Turning points alternate sides, so they come every half period
+        spacing = peak_t - self.last_peak[turning]
+        self.half_period[turning] = np.where(np.isnan(self.half_period[turning]), spacing,
+                                             0.5 * (self.half_period[turning] + spacing))
+        self.last_peak[turning] = peak_t
+        self.peaks[turning] += 1
+
+        log_amplitude = np.log(np.maximum(amplitude, 1e-300))
+        weight = self.forgetting * self.weight[turning] + 1
+        shift = peak_t - self.mean_t[turning]
+        mean_t = self.mean_t[turning] + shift / weight
+        mean_y = self.mean_y[turning] + (log_amplitude - self.mean_y[turning]) / weight
+        self.var_t[turning] = self.forgetting * self.var_t[turning] + shift * (peak_t - mean_t)
+        self.cov_ty[turning] = self.forgetting * self.cov_ty[turning] + shift * (log_amplitude - mean_y)
+        self.weight[turning] = weight
+        self.mean_t[turning] = mean_t
+        self.mean_y[turning] = mean_y
+
+    # Decay rate of the amplitude in 1/s; nan until three turning points
+    @property
+    def decay_rate(self):
+        fitted = (self.peaks >= 3) & (self.var_t > 0)
+        return np.where(fitted, -self.cov_ty / np.where(fitted, self.var_t, 1), np.nan)
+
+    @property
+    def decrement(self):
+        return self.decay_rate * 2 * self.half_period
+
+    @property
+    def ratio(self):
+        decrement = self.decrement
+        return decrement / np.sqrt(4 * np.pi ** 2 + decrement * decrement)
+
+
+class EnergyDrift:
+    # Kinetic, potential and total energy, and how far the total has moved
+    # from where it was at the first sample since the last reset, as a
+    # share of the starting energy
+    def __init__(self, channels):
+        self.channels = channels
+        self.reset()
+
+    def reset(self):
+        n = self.channels
+        self.kinetic = np.zeros(n)
+        self.potential = np.zeros(n)
+        self.initial = None
+        self.drift = np.zeros(n)
+        self.max_drift = np.zeros(n)
+
+    @property
+    def total(self):
+        return self.kinetic + self.potential
+
+    def update(self, kinetic, potential):
+        self.kinetic = np.asarray(kinetic, dtype=float)
+        self.potential = np.asarray(potential, dtype=float)
+        if self.initial is None:
+            self.initial = self.total
+        scale = np.where(self.initial != 0, np.abs(self.initial), 1.0)
+        self.drift = (self.total - self.initial) / scale
+        np.maximum(self.max_drift, np.abs(self.drift), out=self.max_drift)
+
+
+class SlidingSpectrum:
+    # Magnitude spectrum of the last window samples of each channel. A
+    # sample only goes into a ring; every hop samples the whole window is
+    # transformed with one FFT, which costs far less per sample than
+    # sliding every bin on by one sample, and the spectrum seen between
+    # hops is at most hop samples old.
+    def __init__(self, channels, dt, window=SPECTRUM_WINDOW, hop=SPECTRUM_HOP):
+        self.channels = channels
+        self.dt = dt
+        self.window = window
+        self.hop = min(hop, window)
+        self.frequencies = np.fft.rfftfreq(window, dt)
+        self.reset()
+
+    def reset(self):
+        self.ring = np.zeros((self.channels, self.window))
+        self.bins = np.zeros((self.channels, len(self.frequencies)), dtype=complex)
+        self.head = 0  # oldest sample, overwritten next
+        self.count = 0
+
+    def update(self, x):
+        self.ring[:, self.head] = x
+        self.head = (self.head + 1) % self.window
+        self.count += 1
+        if self.count % self.hop == 0 or self.count == self.window:
+            # Oldest sample first, so that the taper below lines up with the window
+            self.bins = np.fft.rfft(np.roll(self.ring, -self.head, axis=1), axis=1)
+
+    # Magnitudes of the window's samples tapered by a Hann window, which in
+    # the frequency domain is a blend of each bin with its neighbours. The
+    # taper keeps a strong peak from leaking into the bins around it.
+    @property
+    def magnitudes(self):
+        bins = self.bins
+        tapered = 0.5 * bins
+        tapered[:, 1:-1] -= 0.25 * (bins[:, :-2] + bins[:, 2:])
+        return np.abs(tapered)
+
+    # Frequency of the strongest bin above zero, refined on the parabola
+    # through the log magnitudes of it and its neighbours; nan until the
+    # window has filled
+    def peak_frequency(self):
+        magnitudes = np.log(np.maximum(self.magnitudes, 1e-300))
+        k = np.clip(np.argmax(magnitudes[:, 1:], axis=1) + 1, 1, magnitudes.shape[1] - 2)
+        rows = np.arange(self.channels)
+        a, b, c = magnitudes[rows, k - 1], magnitudes[rows, k], magnitudes[rows, k + 1]
+        curvature = a - 2 * b + c
+        offset = np.where(curvature != 0, 0.5 * (a - c) / np.where(curvature != 0, curvature, 1), 0.0)
+        frequency = (k + offset) / (self.window * self.dt)
+        return frequency if self.count >= self.window else np.full(self.channels, np.nan)
+
+
+class Analytics:
+    # All of the above on one stream of states. signal(state) gives the
+    # value per channel that oscillates about zero, and energy(state) the
+    # kinetic and potential energy per channel. sample(state) takes one
+    # physics step's state and fits graphics.plot.sampled.
+    def __init__(self, channels, dt, signal, energy=None, window=SPECTRUM_WINDOW):
+        self.dt = dt
+        self.signal = signal
+        self.energy_of = energy
+        self.period = Period(channels)
+        self.damping = Damping(channels)
+        self.energy = EnergyDrift(channels)
+        self.spectrum = SlidingSpectrum(channels, dt, window)
+        self.time = 0.0
+
+    def reset(self):
+        self.period.reset()
+        self.damping.reset()
+        self.energy.reset()
+        self.spectrum.reset()
+
+    def sample(self, state):
+        self.time += self.dt
+        x = np.asarray(self.signal(state), dtype=float)
+        self.period.update(self.time, self.dt, x)
+        self.damping.update(self.time, self.dt, x)
+        self.spectrum.update(x)
+        if self.energy_of is not None:
+            self.energy.update(*self.energy_of(state))
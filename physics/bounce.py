@@ -0,0 +1,55 @@
+import numpy as np
+
+from . import integrators, kernels
+
+# Bodies falling under uniform gravity and bouncing off a floor (Scripts/3.py).
+# One row per body.
+X, Y, VX, VY = range(4)
+
+
+def initial_state(x, y, vx=0.0, vy=0.0):
+    x = np.atleast_1d(np.asarray(x, dtype=float))
+    state = np.empty((len(x), 4))
+    state[:, X] = x
+    state[:, Y] = y
+    state[:, VX] = vx
+    state[:, VY] = vy
+    return state
+
+
+# Advance in place. floor is the lowest y a body may reach; a body that
+# drops below it is put back on it and its vertical velocity reversed and
+# scaled by restitution. gravity, floor and restitution may be scalars or
+# one value per body, with either backend. Steps are semi-implicit Euler
+# unless another integrator from physics/integrators.py is named. Large
+# batches run compiled when Numba is installed (physics/kernels.py).
+def step(state, dt, n_steps=1, gravity=-9.8, floor=-1.0, restitution=0.8, integrator="semi_implicit_euler"):
+    native = integrator == "semi_implicit_euler"
+    kernel = kernels.compiled("bounce", len(state)) if native else None
+    if kernel is not None:
+        kernel(state, dt, n_steps, *kernels.per_body(len(state), gravity, floor, restitution))
+        return state
+    x = state[:, X]
+    y = state[:, Y]
+    vx = state[:, VX]
+    vy = state[:, VY]
+    floor = np.broadcast_to(np.asarray(floor, dtype=float), y.shape)
+    restitution = np.broadcast_to(np.asarray(restitution, dtype=float), y.shape)
+    if not native:
+        advance = integrators.get(integrator).step
+        position = state[:, X:Y + 1]
+        velocity = state[:, VX:VY + 1]
+        acceleration = np.zeros_like(velocity)
+        acceleration[:, 1] = gravity
+    for _ in range(n_steps):
+        if native:
+            vy += gravity * dt
+            x += vx * dt
+            y += vy * dt
+        else:
+            advance(position, velocity, dt, lambda q, v: acceleration)
+        hit = y < floor
+        if hit.any():
+            y[hit] = floor[hit]
+            vy[hit] *= -restitution[hit]
+    return state
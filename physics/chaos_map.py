@@ -0,0 +1,224 @@
+import hashlib
+import json
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import numpy as np
+
+from . import double_pendulum
+
+# Time-to-first-flip map of the double pendulum over the plane of release
+# angles (theta1 across, theta2 up), computed in square tiles on worker
+# processes and cached on disk (Scripts/5.py).
+#
+# At zoom level z the plane -pi..pi is split into TILES_ACROSS * 2**z tiles
+# each way, and the view always shows VIEW_TILES x VIEW_TILES of them.
+# Every tile is computed at each of RESOLUTIONS in turn, so the whole view
+# fills in coarsely first and then sharpens. Angles are periodic, so tile
+# indices wrap and a view panned round the plane reuses the same tiles.
+TILES_ACROSS = 4
+VIEW_TILES = 4
+RESOLUTIONS = (16, 64, 128)
+MAX_LEVEL = 12
+MAX_TILES = 256  # tiles kept in memory; the cache on disk keeps them all
+DEFAULT_PARAMS = {"gravity": double_pendulum.GRAVITY, "length1": 1.0, "length2": 1.0,
+                  "mass1": 1.0, "mass2": 1.0, "dt": 0.01, "max_time": 20.0}
+
+
+def tiles_across(level):
+    return TILES_ACROSS * 2 ** level
+
+
+# Lower-left corner and size of a tile in radians
+def tile_extent(level, i, j):
+    size = 2 * np.pi / tiles_across(level)
+    return -np.pi + i * size, -np.pi + j * size, size
+
+
+# Flip times at the pixel centres of a tile, row 0 at the bottom
+def compute_tile(params, level, i, j, resolution):
+    x, y, size = tile_extent(level, i, j)
+    centres = (np.arange(resolution) + 0.5) / resolution * size
+    theta1, theta2 = np.meshgrid(x + centres, y + centres)
+    physics = {name: value for name, value in params.items() if name not in ("dt", "max_time")}
+    return double_pendulum.flip_times(theta1, theta2, params["dt"], params["max_time"], **physics).astype(np.float32)
+
+
+class TileCache:
+    # Finished tiles as .npy files under root/<parameters>/<resolution>/, one
+    # directory per set of parameters, named by a hash of them. Files are
+    # written under a temporary name and renamed, so a tile on disk is
+    # always complete.
+    def __init__(self, root, params):
+        key = hashlib.sha1(json.dumps(params, sort_keys=True).encode()).hexdigest()[:16]
+        self.directory = os.path.join(root, key)
+        self.params = params
+
+    def path(self, level, i, j, resolution):
+        return os.path.join(self.directory, str(resolution), f"{level}_{i}_{j}.npy")
+
+    def load(self, level, i, j, resolution):
+        try:
+            return np.load(self.path(level, i, j, resolution))
+        except (OSError, ValueError):
+            return None
+
+    def save(self, level, i, j, resolution, values):
+        path = self.path(level, i, j, resolution)
+        if not os.path.isdir(os.path.dirname(path)):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(os.path.join(self.directory, "params.json"), "w") as f:
+                json.dump(self.params, f, sort_keys=True)
+        temporary = f"{path}.{os.getpid()}.tmp"
+        with open(temporary, "wb") as f:
+            np.save(f, values)
+        os.replace(temporary, path)
+
+
+class ChaosMap:
+    # The tiles of the current view and the work still to do for them.
+    # update() is called once a frame: it collects tiles the workers have
+    # finished, loads cached ones and hands out new work, keeping only
+    # about one tile per worker queued so that a change of view takes
+    # effect at once. Tiles no longer in view are cancelled if they have
+    # not started; ones already running finish and go to the cache. A tile
+    # whose worker raised is left empty and not tried again.
+    def __init__(self, cache_dir, params=None, workers=None):
+        self.params = dict(DEFAULT_PARAMS, **(params or {}))
+        self.cache = TileCache(cache_dir, self.params)
+        self.workers = workers or os.cpu_count()
+        self.level = 0
+        self.i0 = self.j0 = 0  # bottom-left tile of the view
+        self.tiles = {}  # (level, i, j) -> (resolution, values), best so far
+        self.pending = {}  # (level, i, j, resolution) -> future
+        self.failed = {}  # (level, i, j, resolution) -> the error its worker raised
+        self.pool = None
+        self.changed = True
+        self.computed = 0  # pendulums integrated by the workers
+        self.loaded = 0  # tiles read from the cache
+
+    # Tiles in view as (level, i, j) with wrapped indices, centre first
+    def visible(self):
+        n = tiles_across(self.level)
+        middle = (VIEW_TILES - 1) / 2
+        offsets = sorted(((a, b) for a in range(VIEW_TILES) for b in range(VIEW_TILES)),
+                         key=lambda ab: (ab[0] - middle) ** 2 + (ab[1] - middle) ** 2)
+        return [(self.level, (self.i0 + a) % n, (self.j0 + b) % n) for a, b in offsets]
+
+    # The view's angles as (theta1 min, theta2 min, size); theta1 may run
+    # past pi when the view wraps
+    def extent(self):
+        x, y, size = tile_extent(self.level, self.i0 % tiles_across(self.level), self.j0 % tiles_across(self.level))
+        return x, y, size * VIEW_TILES
+
+    def pan(self, di, dj):
+        self.i0 += di
+        self.j0 += dj
+        self._moved()
+
+    # Zoom in or out by a factor of two about the point (u, v), 0..1 across the view
+    def zoom(self, steps, u=0.5, v=0.5):
+        level = min(max(self.level + steps, 0), MAX_LEVEL)
+        if level == self.level:
+            return
+        factor = 2.0 ** (level - self.level)
+        self.i0 = int(round((self.i0 + u * VIEW_TILES) * factor - VIEW_TILES / 2))
+        self.j0 = int(round((self.j0 + v * VIEW_TILES) * factor - VIEW_TILES / 2))
+        if level == 0:
+            self.i0 = self.j0 = 0
+        self.level = level
+        self._moved()
+
+    # Release angles at (u, v) across the view
+    def angles(self, u, v):
+        x, y, size = self.extent()
+        return (x + u * size + np.pi) % (2 * np.pi) - np.pi, (y + v * size + np.pi) % (2 * np.pi) - np.pi
+
+    def _moved(self):
+        self.changed = True
+        visible = set(self.visible())
+        for key, future in list(self.pending.items()):
+            if key[:3] not in visible and future.cancel():
+                del self.pending[key]
+
+    def _start(self):
+        if self.pool is None:
+            # Workers are spawned rather than forked, so they do not inherit
+            # the window and GL state of the scene
+            self.pool = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context("spawn"))
+
+    # Tiles of the view done at the finest resolution, out of all of them
+    def progress(self):
+        visible = self.visible()
+        return sum(self.tiles.get(tile, (0,))[0] == RESOLUTIONS[-1] for tile in visible), len(visible)
+
+    def update(self):
+        for key, future in list(self.pending.items()):
+            if future.done():
+                del self.pending[key]
+                if future.cancelled():
+                    continue
+                try:
+                    values = future.result()
+                except Exception as e:
+                    self.failed[key] = e
+                    print(f"Chaos map tile {key} failed: {e!r}")
+                    if isinstance(e, BrokenProcessPool):
+                        # A worker died and took the pool with it; the other
+                        # tiles it had are handed to a new one below
+                        self.close()
+                        break
+                    continue
+                self.cache.save(*key, values)
+                self.computed += values.size
+                self._keep(key, values)
+
+        visible = self.visible()
+        for resolution in RESOLUTIONS:
+            for tile in visible:
+                if len(self.pending) > self.workers:
+                    return
+                key = (*tile, resolution)
+                if self.tiles.get(tile, (0,))[0] >= resolution or key in self.pending or key in self.failed:
+                    continue
+                values = self.cache.load(*key)
+                if values is not None:
+                    self.loaded += 1
+                    self._keep(key, values)
+                    continue
+                self._start()
+                self.pending[key] = self.pool.submit(compute_tile, self.params, *key)
+
+    def _keep(self, key, values):
+        tile, resolution = key[:3], key[3]
+        if self.tiles.get(tile, (0,))[0] < resolution:
+            self.tiles[tile] = (resolution, values)
+            self.changed = self.changed or tile in self.visible()
+        if len(self.tiles) > MAX_TILES:
+            visible = set(self.visible())
+            self.tiles = {key: found for key, found in self.tiles.items() if key in visible}
+
+    # The view as one image of flip times, nan where nothing is known yet
+    # or the pendulum never flips. Coarse tiles are scaled up to fill.
+    def image(self):
+        size = RESOLUTIONS[-1]
+        image = np.full((VIEW_TILES * size, VIEW_TILES * size), np.nan, dtype=np.float32)
+        n = tiles_across(self.level)
+        for a in range(VIEW_TILES):
+            for b in range(VIEW_TILES):
+                found = self.tiles.get((self.level, (self.i0 + a) % n, (self.j0 + b) % n))
+                if found:
+                    resolution, values = found
+                    scale = size // resolution
+                    image[b * size:(b + 1) * size, a * size:(a + 1) * size] = \
+                        np.repeat(np.repeat(values, scale, axis=0), scale, axis=1)
+        self.changed = False
+        return image
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.shutdown(wait=False, cancel_futures=True)
+            self.pool = None
+        self.pending.clear()
@@ -0,0 +1,67 @@
+import time
+
+
+class SimulationClock:
+    # Fixed-timestep clock for running physics independently of the frame rate.
+    #
+    # Wall time since the last call, multiplied by time_scale, goes into an
+    # accumulator that is spent in whole steps of dt simulated seconds. At
+    # most max_steps are taken per frame; time beyond that is dropped so a
+    # slow frame cannot snowball into ever longer frames. alpha is how far
+    # the simulation is into the next step, for interpolating what is drawn.
+    def __init__(self, dt, time_scale=1.0, max_steps=8, timer=time.perf_counter):
+        self.dt = dt
+        self.time_scale = time_scale
+        self.max_steps = max_steps
+        self.timer = timer
+        self.paused = False
+        self._was_paused = False
+        self.time = 0.0  # simulated seconds
+        self.dropped = 0.0  # simulated seconds skipped to keep up
+        self.reset()
+
+    def reset(self):
+        self._last = self.timer()
+        self.accumulator = 0.0
+
+    @property
+    def alpha(self):
+        return self.accumulator / self.dt
+
+    # Number of steps due since the last call. The wait since a paused call
+    # does not count, however long a host idling on a paused scene slept.
+    def advance(self):
+        now = self.timer()
+        elapsed = 0.0 if self._was_paused else now - self._last
+        self._last = now
+        self._was_paused = self.paused
+        if self.paused:
+            return 0
+        self.accumulator += elapsed * self.time_scale
+        steps = int(self.accumulator / self.dt)
+        if steps > self.max_steps:
+            self.dropped += (steps - self.max_steps) * self.dt
+            self.accumulator -= (steps - self.max_steps) * self.dt
+            steps = self.max_steps
+        self.accumulator -= steps * self.dt
+        self.time += steps * self.dt
+        return steps
+
+    # Take the steps that are due with step(state, dt, n_steps, **params),
+    # copying the state into previous just before the last one so the frame
+    # can be drawn between the two. dt defaults to the clock's own dt and
+    # can be given for models that count time in other units. Returns the
+    # result of the last step call, or None when no step was due.
+    def step(self, step, state, previous, dt=None, **params):
+        steps = self.advance()
+        if steps == 0:
+            return None
+        dt = self.dt if dt is None else dt
+        if steps > 1:
+            step(state, dt, steps - 1, **params)
+        previous[...] = state
+        return step(state, dt, 1, **params)
+
+    # State between the last two steps, at the current alpha
+    def interpolate(self, previous, current):
+        return previous + (current - previous) * self.alpha
@@ -0,0 +1,181 @@
+import time
+
+import numpy as np
+
+from .bounce import X, Y, VX, VY, initial_state
+
+# Many balls bouncing off the walls, the floor and each other (Scripts/3.py
+# crowd mode). The state is the same as physics.bounce, one row per ball
+# centre, with the radius kept alongside as a scalar or one value per ball.
+# Mass goes with the area of the ball.
+
+POSITION = slice(X, Y + 1)
+VELOCITY = slice(VX, VY + 1)
+ITERATIONS = 8  # separation passes per step
+NEAR_MARGIN = 0.5  # pairs this much beyond touching, in radii sums, may be pushed into contact in a step
+CONTACT_SLOP = 0.01  # pairs within this share of touching count as in contact
+RESTING_STEPS = 4  # contacts closing slower than this many steps of gravity do not bounce
+
+
+# A box of n equal balls of the given radius, dropped in rows from the top
+def fill(n, radius, bounds, spacing=2.5, jitter=0.2, seed=0):
+    rng = np.random.default_rng(seed)
+    left, right, floor, top = bounds
+    per_row = max(int((right - left) / (spacing * radius)), 1)
+    i = np.arange(n)
+    x = left + spacing * radius * (i % per_row + 0.5)
+    y = top - spacing * radius * (i // per_row + 0.5)
+    return initial_state(x, y, rng.normal(0.0, jitter, n), rng.normal(0.0, jitter, n))
+
+
+# 0, 1, ..., c - 1 for every c in counts
+def _ranks(counts):
+    ends = np.cumsum(counts)
+    return np.arange(ends[-1] if len(ends) else 0) - np.repeat(ends - counts, counts)
+
+
+# Candidate pairs from a uniform grid of cells at least one ball across,
+# widened by margin so that pairs up to (1 + margin) radii sums apart
+# are all found. Balls are sorted by cell, so each cell is a contiguous
+# run of the sorted order; every ball is paired with the balls after it
+# in its own cell and with all balls in four of its eight neighbours, so
+# each nearby pair comes up exactly once. Balls outside bounds are
+# counted in the edge cells. Returns two index arrays into the state.
+def broad_phase(position, radius, bounds, margin=0.0):
+    left, right, floor, top = bounds
+    cell_size = 2 * float(np.max(radius)) * (1 + margin)
+    nx = max(int(np.ceil((right - left) / cell_size)), 1)
+    ny = max(int(np.ceil((top - floor) / cell_size)), 1)
+    cx = np.clip(((position[:, 0] - left) / cell_size).astype(np.int64), 0, nx - 1)
+    cy = np.clip(((position[:, 1] - floor) / cell_size).astype(np.int64), 0, ny - 1)
+    cell = cy * nx + cx
+    order = np.argsort(cell, kind="stable")
+    cell_start = np.r_[0, np.cumsum(np.bincount(cell, minlength=nx * ny))]
+    cx, cy = cx[order], cy[order]
+    sorted_index = np.arange(len(order))
+
+    first, second = [], []
+    for ox, oy in ((0, 0), (1, 0), (-1, 1), (0, 1), (1, 1)):
+        ncx, ncy = cx + ox, cy + oy
+        valid = (ncx >= 0) & (ncx < nx) & (ncy < ny)
+        neighbour = ncy[valid] * nx + ncx[valid]
+        start = cell_start[neighbour]
+        end = cell_start[neighbour + 1]
+        if ox == 0 and oy == 0:
+            start = sorted_index[valid] + 1
+        count = np.maximum(end - start, 0)
+        first.append(np.repeat(sorted_index[valid], count))
+        second.append(np.repeat(start, count) + _ranks(count))
+    return order[np.concatenate(first)], order[np.concatenate(second)]
+
+
+# Move touching balls apart. All contacts are projected together, each
+# ball moving by the average of the corrections its overlapping contacts
+# ask for, the lighter ball of a pair further; several passes let a
+# correction travel through a pile. The walls and the floor are applied
+# after every pass. Returns the pairs that touch at the end.
+def separate(position, radius, first, second, bounds, iterations=ITERATIONS):
+    n = len(position)
+    radius = np.broadcast_to(np.asarray(radius, dtype=float), (n,))
+    left, right, floor, _ = bounds
+    x, y = position[:, 0].copy(), position[:, 1].copy()
+    reach = radius[first] + radius[second]
+    inv_mass = 1 / (radius * radius)
+    share = inv_mass[first] + inv_mass[second]
+    weight_first = inv_mass[first] / share
+    weight_second = inv_mass[second] / share
+    for _ in range(iterations):
+        dx = x[second] - x[first]
+        dy = y[second] - y[first]
+        dist = np.sqrt(dx * dx + dy * dy)
+        overlap = np.maximum(reach - dist, 0.0)
+        # Balls on top of each other are split sideways
+        scale = np.where(dist > 0, overlap / np.maximum(dist, 1e-300), 0.0)
+        dx = np.where(dist > 0, dx * scale, overlap)
+        dy *= scale
+        active = (overlap > 0).astype(float)
+        count = np.maximum(np.bincount(first, active, minlength=n) + np.bincount(second, active, minlength=n), 1)
+        x += (np.bincount(second, dx * weight_second, minlength=n) - np.bincount(first, dx * weight_first, minlength=n)) / count
+        y += (np.bincount(second, dy * weight_second, minlength=n) - np.bincount(first, dy * weight_first, minlength=n)) / count
+        np.clip(x, left + radius, right - radius, out=x)
+        np.maximum(y, floor + radius, out=y)
+    position[:, 0] = x
+    position[:, 1] = y
+    dx = x[second] - x[first]
+    dy = y[second] - y[first]
+    touching = dx * dx + dy * dy < (reach * (1 + CONTACT_SLOP)) ** 2
+    return first[touching], second[touching]
+
+
+# Advance in place with position-based dynamics: move every ball, separate
+# the overlaps, then take velocities from how far the balls actually
+# moved, no faster than they came in. Contacts that were closing faster
+# than resting_speed then get restitution times that speed back; slower
+# ones come to rest, so a pile settles instead of buzzing. bounds is
+# (left, right, floor, top); the top is open. When timings is a dict, the
+# steps taken and the seconds spent in each phase are added to it under
+# "steps", "broad" and "narrow", and the candidate and touching pair
+# counts of the last step are stored under "pairs" and "contacts".
+def step(state, dt, n_steps=1, gravity=-9.8, radius=0.01, bounds=(-1.0, 1.0, -1.0, 1.0),
+         restitution=0.8, timings=None):
+    position = state[:, POSITION]
+    velocity = state[:, VELOCITY]
+    n = len(state)
+    radius = np.broadcast_to(np.asarray(radius, dtype=float), (n,))
+    resting_speed = RESTING_STEPS * abs(gravity) * dt
+    for _ in range(n_steps):
+        velocity[:, 1] += gravity * dt
+        start = position.copy()
+        approach = velocity.copy()
+        position += velocity * dt
+
+        started = time.perf_counter()
+        first, second = broad_phase(position, radius, bounds, NEAR_MARGIN)
+        found = time.perf_counter()
+        # Pairs close enough to touch while the others are pushed about
+        d = position[second] - position[first]
+        near = np.einsum("ij,ij->i", d, d) < ((radius[first] + radius[second]) * (1 + NEAR_MARGIN)) ** 2
+        pairs = len(first)
+        first, second = separate(position, radius, first[near], second[near], bounds)
+        velocity[...] = (position - start) / dt
+        # Overlap left over from a crowded step would otherwise come back
+        # as speed; separating never makes a ball faster than it came in
+        speed = np.sqrt(np.einsum("ij,ij->i", velocity, velocity))
+        limit = np.sqrt(np.einsum("ij,ij->i", approach, approach)) + resting_speed
+        velocity *= np.minimum(limit / np.maximum(speed, 1e-300), 1.0)[:, None]
+        _bounce(velocity, approach, position, radius, first, second, bounds, restitution, resting_speed)
+        if timings is not None:
+            timings["steps"] = timings.get("steps", 0) + 1
+            timings["broad"] = timings.get("broad", 0.0) + found - started
+            timings["narrow"] = timings.get("narrow", 0.0) + time.perf_counter() - found
+            timings["pairs"] = pairs
+            timings["contacts"] = len(first)
+    return state
+
+
+# Restitution for the touching pairs and for balls against the walls and
+# floor, from the velocities they approached with
+def _bounce(velocity, approach, position, radius, first, second, bounds, restitution, resting_speed):
+    n = len(velocity)
+    d = position[second] - position[first]
+    normal = d / np.maximum(np.sqrt(np.einsum("ij,ij->i", d, d)), 1e-300)[:, None]
+    closing = np.einsum("ij,ij->i", approach[second] - approach[first], normal)
+    now = np.einsum("ij,ij->i", velocity[second] - velocity[first], normal)
+    wanted = np.where(closing < -resting_speed, -restitution * closing, 0.0)
+    change = np.maximum(wanted - now, 0.0) / 2
+    count = np.maximum(np.bincount(first, change > 0, minlength=n) + np.bincount(second, change > 0, minlength=n), 1)
+    for axis in range(2):
+        push = change * normal[:, axis]
+        velocity[:, axis] += (np.bincount(second, push, minlength=n) - np.bincount(first, push, minlength=n)) / count
+
+    left, right, floor, _ = bounds
+    for axis, low, high in ((0, left, right), (1, floor, None)):
+        for wall, sign in ((low, 1), (high, -1)):
+            if wall is None:
+                continue
+            at_wall = sign * (position[:, axis] - wall) <= radius * (1 + CONTACT_SLOP)
+            speed = sign * approach[:, axis]
+            hit = at_wall & (speed < -resting_speed)
+            velocity[hit, axis] = -restitution * approach[hit, axis]
+            rest = at_wall & ~hit & (sign * velocity[:, axis] < 0)
+            velocity[rest, axis] = 0.0
@@ -0,0 +1,66 @@
+import math
+
+import numba
+from numba import prange
+
+# Numba versions of the step kernels in physics/kernels.py, imported only
+# when that module picks the compiled backend. Each loops over bodies on
+# the outside and steps on the inside, so a body stays in registers for
+# all its steps. Bodies are spread over threads with prange, and the
+# machine code is cached on disk (in __pycache__ next to this file, or
+# NUMBA_CACHE_DIR), so only the first run on a machine compiles.
+# Parameters come as arrays of one value per body or a single value.
+
+
+# Body i's value of a parameter
+@numba.njit(inline="always")
+def _of(values, i):
+    return values[i] if values.shape[0] > 1 else values[0]
+
+
+@numba.njit(cache=True, parallel=True)
+def pendulum(state, dt, n_steps, k, decay):
+    for i in prange(state.shape[0]):
+        theta = state[i, 0]
+        omega = state[i, 1]
+        for _ in range(n_steps):
+            omega -= math.sin(theta) * _of(k, i)
+            omega *= _of(decay, i)
+            theta += omega * dt
+        state[i, 0] = theta
+        state[i, 1] = omega
+
+
+@numba.njit(cache=True, parallel=True)
+def bounce(state, dt, n_steps, gravity, floor, restitution):
+    for i in prange(state.shape[0]):
+        x, y, vx, vy = state[i, 0], state[i, 1], state[i, 2], state[i, 3]
+        # Reading the parameters inside the loop rather than before it keeps
+        # the floor test a branch, which is quicker as bodies rarely land
+        for _ in range(n_steps):
+            vy += _of(gravity, i) * dt
+            x += vx * dt
+            y += vy * dt
+            if y < _of(floor, i):
+                y = _of(floor, i)
+                vy *= -_of(restitution, i)
+        state[i, 0], state[i, 1], state[i, 3] = x, y, vy
+
+
+@numba.njit(cache=True, parallel=True)
+def projectile(state, dt, n_steps, gravity, ground, landed):
+    for i in prange(state.shape[0]):
+        if state[i, 1] <= ground and state[i, 4] <= 0.0:
+            landed[i] = True
+            continue
+        landed[i] = False
+        for _ in range(n_steps):
+            for c in range(3):
+                state[i, 3 + c] += gravity[c] * dt
+            for c in range(3):
+                state[i, c] += state[i, 3 + c] * dt
+            if state[i, 1] <= ground:
+                state[i, 1] = ground
+                landed[i] = True
+                break
+
@@ -0,0 +1,112 @@
+import numpy as np
+
+from . import integrators
+
+# Double pendulums: a second rod and bob hung from the first bob (Scripts/5.py).
+# One row per double pendulum; both angles are measured from the vertical
+# and the second is absolute, not relative to the first rod. Units are SI.
+THETA1, THETA2, OMEGA1, OMEGA2 = range(4)
+GRAVITY = 9.81
+
+
+def initial_state(theta1, theta2, omega1=0.0, omega2=0.0):
+    theta1, theta2 = np.broadcast_arrays(np.atleast_1d(np.asarray(theta1, dtype=float)), theta2)
+    state = np.empty((theta1.size, 4))
+    state[:, THETA1] = theta1.ravel()
+    state[:, THETA2] = np.ravel(theta2)
+    state[:, OMEGA1] = omega1
+    state[:, OMEGA2] = omega2
+    return state
+
+
+# Angular accelerations from the Lagrangian equations of motion
+def accelerations(theta1, theta2, omega1, omega2, gravity=GRAVITY, length1=1.0, length2=1.0,
+                  mass1=1.0, mass2=1.0):
+    delta = theta1 - theta2
+    sin_delta = np.sin(delta)
+    cos_delta = np.cos(delta)
+    total = mass1 + mass2
+    denominator = 2 * mass1 + mass2 - mass2 * np.cos(2 * delta)
+    alpha1 = (-gravity * (total + mass1) * np.sin(theta1) - mass2 * gravity * np.sin(theta1 - 2 * theta2)
+              - 2 * sin_delta * mass2 * (omega2 * omega2 * length2 + omega1 * omega1 * length1 * cos_delta))
+    alpha2 = 2 * sin_delta * (omega1 * omega1 * length1 * total + gravity * total * np.cos(theta1)
+                              + omega2 * omega2 * length2 * mass2 * cos_delta)
+    return alpha1 / (length1 * denominator), alpha2 / (length2 * denominator)
+
+
+# Advance in place with classic fourth-order Runge-Kutta, or another
+# integrator from physics/integrators.py
+def step(state, dt, n_steps=1, integrator="rk4", **params):
+    if integrator != "rk4":
+        advance = integrators.get(integrator).step
+        angles = state[:, THETA1:THETA2 + 1]
+        velocities = state[:, OMEGA1:OMEGA2 + 1]
+        for _ in range(n_steps):
+            advance(angles, velocities, dt, lambda q, v: np.stack(accelerations(*q.T, *v.T, **params), axis=1))
+        return state
+    y = state.T
+    for _ in range(n_steps):
+        k1 = _derivative(y, params)
+        k2 = _derivative(y + 0.5 * dt * k1, params)
+        k3 = _derivative(y + 0.5 * dt * k2, params)
+        k4 = _derivative(y + dt * k3, params)
+        y += dt / 6 * (k1 + 2 * k2 + 2 * k3 + k4)
+    return state
+
+
+def _derivative(y, params):
+    alpha1, alpha2 = accelerations(*y, **params)
+    return np.stack([y[OMEGA1], y[OMEGA2], alpha1, alpha2])
+
+
+# Potential energy; the pivot is at height zero
+def potential(theta1, theta2, gravity=GRAVITY, length1=1.0, length2=1.0, mass1=1.0, mass2=1.0):
+    return -(mass1 + mass2) * gravity * length1 * np.cos(theta1) - mass2 * gravity * length2 * np.cos(theta2)
+
+
+# Total energy of each pendulum in state, which stays constant
+def energy(state, gravity=GRAVITY, length1=1.0, length2=1.0, mass1=1.0, mass2=1.0):
+    theta1, theta2, omega1, omega2 = state.T
+    kinetic = (0.5 * (mass1 + mass2) * (length1 * omega1) ** 2 + 0.5 * mass2 * (length2 * omega2) ** 2
+               + mass2 * length1 * length2 * omega1 * omega2 * np.cos(theta1 - theta2))
+    return kinetic + potential(theta1, theta2, gravity, length1, length2, mass1, mass2)
+
+
+# True where a pendulum released at rest has the energy to take either rod
+# over the top. The cheapest way over is with the other rod hanging down.
+def can_flip(theta1, theta2, gravity=GRAVITY, length1=1.0, length2=1.0, mass1=1.0, mass2=1.0):
+    upper = (mass1 + mass2) * gravity * length1 - mass2 * gravity * length2
+    lower = -(mass1 + mass2) * gravity * length1 + mass2 * gravity * length2
+    return potential(theta1, theta2, gravity, length1, length2, mass1, mass2) > min(upper, lower)
+
+
+# Time until either rod of a pendulum released at rest from (theta1,
+# theta2), both within -pi..pi, first passes over the top; nan when it has
+# not by max_time. Pendulums without the energy to flip are never
+# integrated, and the ones that flipped are dropped from the batch as it
+# goes, so the batch only ever holds the pendulums still undecided.
+def flip_times(theta1, theta2, dt=0.01, max_time=20.0, **params):
+    theta1, theta2 = np.broadcast_arrays(np.asarray(theta1, dtype=float), theta2)
+    times = np.full(theta1.shape, np.nan)
+    active = np.flatnonzero(can_flip(theta1, theta2, **params))
+    state = initial_state(theta1.ravel()[active], theta2.ravel()[active])
+    flat = times.reshape(-1)
+    for i in range(1, int(round(max_time / dt)) + 1):
+        if not len(active):
+            break
+        step(state, dt, **params)
+        flipped = (np.abs(state[:, THETA1]) > np.pi) | (np.abs(state[:, THETA2]) > np.pi)
+        if flipped.any():
+            flat[active[flipped]] = i * dt
+            active = active[~flipped]
+            state = state[~flipped]
+    return times
+
+
+# Positions of both bobs for pendulums hanging from origin
+def bob_positions(state, origin=(0.0, 0.0), length1=1.0, length2=1.0):
+    x1 = origin[0] + length1 * np.sin(state[:, THETA1])
+    y1 = origin[1] - length1 * np.cos(state[:, THETA1])
+    x2 = x1 + length2 * np.sin(state[:, THETA2])
+    y2 = y1 - length2 * np.cos(state[:, THETA2])
+    return x1, y1, x2, y2
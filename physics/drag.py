@@ -0,0 +1,180 @@
+import numpy as np
+
+from .projectile import GRAVITY
+
+# Projectiles with air resistance and wind (samp.py). A body's state is one
+# row in the layout of physics.projectile: position then velocity. Drag
+# pulls against the velocity relative to the air, in proportion to it
+# ("linear") or to its square ("quadratic"), with coefficient k per unit
+# mass. Flights are solved with an adaptive Dormand-Prince 5(4) method.
+MODELS = ("none", "linear", "quadratic")
+
+# Dormand-Prince 5(4) tableau; the last stage is the derivative at the end
+# of the step, which is reused as the first stage of the next one
+DP_A = [
+    [],
+    [1 / 5],
+    [3 / 40, 9 / 40],
+    [44 / 45, -56 / 15, 32 / 9],
+    [19372 / 6561, -25360 / 2187, 64448 / 6561, -212 / 729],
+    [9017 / 3168, -355 / 33, 46732 / 5247, 49 / 176, -5103 / 18656],
+    [35 / 384, 0.0, 500 / 1113, 125 / 192, -2187 / 6784, 11 / 84],
+]
+DP_B = np.array([35 / 384, 0.0, 500 / 1113, 125 / 192, -2187 / 6784, 11 / 84, 0.0])
+DP_ERROR = DP_B - np.array([5179 / 57600, 0.0, 7571 / 16695, 393 / 640, -92097 / 339200, 187 / 2100, 1 / 40])
+
+SAFETY = 0.9
+MIN_FACTOR = 0.2
+MAX_FACTOR = 5.0
+EVENT_ITERATIONS = 8  # refinements of a ground crossing by exact substeps
+
+
+def acceleration(velocity, gravity=GRAVITY, model="quadratic", k=0.0, wind=(0.0, 0.0, 0.0)):
+    relative = velocity - np.asarray(wind, dtype=float)
+    if model == "linear":
+        return gravity - k * relative
+    if model == "quadratic":
+        speed = np.sqrt(np.sum(relative * relative, axis=-1, keepdims=True))
+        return gravity - k * speed * relative
+    return np.broadcast_to(gravity, np.shape(velocity)).astype(float)
+
+
+class Trajectory:
+    # The accepted steps of a solved flight: times, states and their time
+    # derivatives. States in between come from cubic Hermite interpolation
+    # of each step, and step() lets a SimulationClock play the flight back
+    # in fixed steps. impact is (time, state) of the first ground crossing,
+    # or None when the flight ended at t_max first.
+    def __init__(self, times, states, derivatives, impact, steps, rejected, evaluations):
+        self.times = np.asarray(times)
+        self.states = np.asarray(states)
+        self.derivatives = np.asarray(derivatives)
+        self.impact = impact
+        self.steps = steps
+        self.rejected = rejected
+        self.evaluations = evaluations
+        self.time = 0.0  # playback position for step()
+
+    @property
+    def end(self):
+        return self.times[-1]
+
+    def at(self, time):
+        time = min(max(time, self.times[0]), self.end)
+        if len(self.times) < 2:
+            return self.states[0].copy()
+        i = min(max(np.searchsorted(self.times, time) - 1, 0), len(self.times) - 2)
+        h = self.times[i + 1] - self.times[i]
+        if h <= 0:
+            return self.states[i].copy()
+        s = (time - self.times[i]) / h
+        h00 = (1 + 2 * s) * (1 - s) ** 2
+        h10 = s * (1 - s) ** 2
+        h01 = s * s * (3 - 2 * s)
+        h11 = s * s * (s - 1)
+        return (h00 * self.states[i] + h10 * h * self.derivatives[i]
+                + h01 * self.states[i + 1] + h11 * h * self.derivatives[i + 1])
+
+    # Advance the playback position and write the state there into row 0
+    # of state. Returns the landed mask like projectile.step.
+    def step(self, state, dt, n_steps=1, **params):
+        self.time = min(self.time + dt * n_steps, self.end)
+        state[0] = self.at(self.time)
+        return np.array([self.impact is not None and self.time >= self.end])
+
+
+def _derivative(y, gravity, model, k, wind):
+    return np.concatenate([y[3:], acceleration(y[3:], gravity, model, k, wind)])
+
+
+# One Dormand-Prince step of size h from y with derivative f0. Returns the
+# fifth-order state, its derivative and the embedded error estimate.
+def _dp_step(y, f0, h, gravity, model, k, wind):
+    stages = [f0]
+    for i in range(1, 7):
+        yi = y + h * sum(a * stage for a, stage in zip(DP_A[i], stages))
+        stages.append(_derivative(yi, gravity, model, k, wind))
+    y_new = y + h * sum(b * stage for b, stage in zip(DP_B, stages))
+    error = h * sum(e * stage for e, stage in zip(DP_ERROR, stages))
+    return y_new, stages[-1], error
+
+
+# Solve the flight of one body from state row y0 until it comes down to
+# ground or t_max passes. Each step's local error is kept within
+# atol + rtol * |state| per component, so the step grows wherever the
+# flight is smooth. A step that ends below the ground is not taken as is:
+# the crossing is bracketed on the step's interpolant, then refined with
+# exact substeps from the start of the step, so the impact time and point
+# are as accurate as the integration itself.
+def solve(y0, gravity=GRAVITY, model="quadratic", k=0.0, wind=(0.0, 0.0, 0.0), ground=0.0,
+          rtol=1e-6, atol=1e-9, t_max=60.0, first_step=0.01):
+    gravity = np.asarray(gravity, dtype=float)
+    y = np.array(y0, dtype=float)
+    f = _derivative(y, gravity, model, k, wind)
+    t = 0.0
+    h = first_step
+    times, states, derivatives = [t], [y.copy()], [f.copy()]
+    steps = rejected = 0
+    evaluations = 1
+    # A body on or below the ground must be moving up to fly at all
+    rising = y[1] > ground or y[4] > 0
+    impact = None if rising else (t, y.copy())
+
+    while t < t_max and impact is None:
+        h = min(h, t_max - t)
+        y_new, f_new, error = _dp_step(y, f, h, gravity, model, k, wind)
+        evaluations += 6
+        scale = atol + rtol * np.maximum(np.abs(y), np.abs(y_new))
+        norm = np.sqrt(np.mean((error / scale) ** 2))
+        if norm > 1.0:
+            rejected += 1
+            h *= max(SAFETY * norm ** -0.2, MIN_FACTOR)
+            continue
+
+        steps += 1
+        if rising and y_new[1] <= ground and y_new[4] < 0:
+            hit, y_new, f_new, used = _locate_ground(t, y, f, h, y_new, f_new, ground, gravity, model, k, wind, atol)
+            evaluations += used
+            impact = (hit, y_new.copy())
+            t = hit
+        else:
+            t += h
+        rising = rising or y_new[1] > ground
+        y, f = y_new, f_new
+        times.append(t)
+        states.append(y.copy())
+        derivatives.append(f.copy())
+        h *= min(MAX_FACTOR, SAFETY * max(norm, 1e-10) ** -0.2)
+
+    return Trajectory(times, states, derivatives, impact, steps, rejected, evaluations)
+
+
+# Time and state at which a step from (t, y) of size h first reaches the
+# ground. The Hermite cubic of the height over the step gives a first
+# guess; each refinement takes one exact step from the start to the guess
+# and corrects it with the secant through the last two tries.
+def _locate_ground(t, y, f, h, y_end, f_end, ground, gravity, model, k, wind, atol):
+    # Roots of the cubic height in 0 < s <= 1
+    p0, p1 = y[1] - ground, y_end[1] - ground
+    m0, m1 = h * f[1], h * f_end[1]
+    cubic = [2 * p0 + m0 - 2 * p1 + m1, -3 * p0 - 2 * m0 + 3 * p1 - m1, m0, p0]
+    roots = [r.real for r in np.roots(cubic) if abs(r.imag) < 1e-12 and 0 < r.real <= 1]
+    s = min(roots) if roots else 1.0
+
+    used = 0
+    tries = [(1.0, p1, y_end, f_end)]
+    for _ in range(EVENT_ITERATIONS):
+        y_s, f_s, _ = _dp_step(y, f, s * h, gravity, model, k, wind)
+        used += 6
+        height = y_s[1] - ground
+        tries.append((s, height, y_s, f_s))
+        if abs(height) <= atol:
+            break
+        (s_a, p_a, _, _), (s_b, p_b, _, _) = tries[-2], tries[-1]
+        if p_a == p_b:
+            break
+        s = min(max(s_b - p_b * (s_b - s_a) / (p_b - p_a), 0.0), 1.0)
+    s, _, y_s, f_s = tries[-1]
+    y_s = y_s.copy()
+    y_s[1] = ground
+    return t + s * h, y_s, f_s, used
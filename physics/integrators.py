@@ -0,0 +1,104 @@
+import os
+from collections import namedtuple
+
+# Fixed-step integrators that the models' step functions can be run with
+# instead of their own scheme (integrator=name). Each advances positions q
+# and velocities v in place by one step of dt, given acceleration(q, v);
+# q and v are arrays of any matching shape, usually views into a model's
+# state. The models keep their own scheme as the default and fast path,
+# and check floors, walls and the ground after every step whichever
+# integrator is used.
+#
+# order is the global order of accuracy and evaluations the acceleration
+# evaluations per step, which is what a step costs for expensive forces.
+# The symplectic schemes keep the energy of conservative systems bounded
+# over long runs instead of drifting. Where the acceleration depends on
+# velocity (the double pendulum) they lose that: leapfrog drops to first
+# order and Yoshida's backward substep makes it worse still. Floors and
+# the ground are applied after a step, so bounces are first order
+# whichever integrator is used. benchmarks/integrators.py compares them on
+# every model.
+Integrator = namedtuple("Integrator", "label order evaluations symplectic step")
+
+INTEGRATORS = {}
+
+
+def register(name, label, order, evaluations, symplectic):
+    def add(step):
+        INTEGRATORS[name] = Integrator(label, order, evaluations, symplectic, step)
+        return step
+    return add
+
+
+def get(name):
+    try:
+        return INTEGRATORS[name]
+    except KeyError:
+        raise ValueError(f"unknown integrator {name!r}; expected one of {', '.join(INTEGRATORS)}") from None
+
+
+# The integrator after name, for scenes that cycle through them with a key
+def next_after(name):
+    names = list(INTEGRATORS)
+    return names[(names.index(name) + 1) % len(names)]
+
+
+# The integrator a scene starts with: PHYSICS_INTEGRATOR when it is set,
+# otherwise the scene model's own scheme
+def configured(default):
+    name = os.environ.get("PHYSICS_INTEGRATOR") or default
+    get(name)
+    return name
+
+
+@register("euler", "Explicit Euler", order=1, evaluations=1, symplectic=False)
+def euler(q, v, dt, acceleration):
+    a = acceleration(q, v)
+    q += v * dt
+    v += a * dt
+
+
+# Velocity first, then position with the new velocity
+@register("semi_implicit_euler", "Semi-implicit Euler", order=1, evaluations=1, symplectic=True)
+def semi_implicit_euler(q, v, dt, acceleration):
+    v += acceleration(q, v) * dt
+    q += v * dt
+
+
+# Drift-kick-drift, which needs one evaluation per step without carrying
+# the last acceleration between calls; the same trajectory as velocity
+# Verlet sampled half a step later
+@register("leapfrog", "Leapfrog (velocity Verlet)", order=2, evaluations=1, symplectic=True)
+def leapfrog(q, v, dt, acceleration):
+    q += v * (0.5 * dt)
+    v += acceleration(q, v) * dt
+    q += v * (0.5 * dt)
+
+
+@register("rk4", "Runge-Kutta 4", order=4, evaluations=4, symplectic=False)
+def rk4(q, v, dt, acceleration):
+    a1 = acceleration(q, v)
+    v2 = v + 0.5 * dt * a1
+    a2 = acceleration(q + 0.5 * dt * v, v2)
+    v3 = v + 0.5 * dt * a2
+    a3 = acceleration(q + 0.5 * dt * v2, v3)
+    v4 = v + dt * a3
+    a4 = acceleration(q + dt * v3, v4)
+    q += dt / 6 * (v + 2 * v2 + 2 * v3 + v4)
+    v += dt / 6 * (a1 + 2 * a2 + 2 * a3 + a4)
+
+
+# Yoshida's fourth-order composition of three leapfrog steps, the middle
+# one backwards; neighbouring drifts are merged, leaving three evaluations
+_W1 = 1 / (2 - 2 ** (1 / 3))
+_W0 = 1 - 2 * _W1
+YOSHIDA_DRIFTS = (_W1 / 2, (_W0 + _W1) / 2, (_W0 + _W1) / 2, _W1 / 2)
+YOSHIDA_KICKS = (_W1, _W0, _W1)
+
+
+@register("yoshida4", "Yoshida 4 (symplectic)", order=4, evaluations=3, symplectic=True)
+def yoshida4(q, v, dt, acceleration):
+    for drift, kick in zip(YOSHIDA_DRIFTS, YOSHIDA_KICKS):
+        q += v * (drift * dt)
+        v += acceleration(q, v) * (kick * dt)
+    q += v * (YOSHIDA_DRIFTS[-1] * dt)
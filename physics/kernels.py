@@ -0,0 +1,104 @@
+import importlib.metadata
+import importlib.util
+import os
+import time
+
+import numpy as np
+
+# Compiled step kernels for the simple models (pendulum, bounce and
+# projectile), used when Numba is installed. The models' step functions
+# ask compiled(name, bodies) for a kernel and fall back to their own
+# vectorized NumPy code when there is none, so they take the same
+# arguments and give the same results either way.
+#
+# Numba is only imported the first time a kernel is wanted. Batches
+# smaller than JIT_MIN_BODIES stay on NumPy: the scenes that step a body
+# or two never pay for loading Numba, while ensembles and sweeps get the
+# compiled loops. PHYSICS_BACKEND=numpy turns the compiled kernels off.
+JIT_MIN_BODIES = 64
+
+_compiled = None
+_threads = None
+
+
+def _choose_backend():
+    if os.environ.get("PHYSICS_BACKEND", "").lower() == "numpy":
+        return "numpy"
+    return "numba" if importlib.util.find_spec("numba") is not None else "numpy"
+
+
+BACKEND = _choose_backend()
+
+
+def _load():
+    global _compiled
+    if _compiled is None:
+        import numba
+        from . import compiled
+        if _threads:
+            numba.set_num_threads(min(_threads, numba.config.NUMBA_NUM_THREADS))
+        _compiled = compiled
+    return _compiled
+
+
+# The compiled kernel called name for a batch of bodies, or None when the
+# batch should be stepped with NumPy
+def compiled(name, bodies):
+    if BACKEND != "numba" or bodies < JIT_MIN_BODIES:
+        return None
+    return getattr(_load(), name)
+
+
+# Parameters that may be scalars or per-body arrays as the kernels take
+# them: float arrays of one value per body, or of a single value for all
+def per_body(bodies, *values):
+    arrays = [np.atleast_1d(np.asarray(value, dtype=float)) for value in values]
+    for array in arrays:
+        if array.ndim != 1 or len(array) not in (1, bodies):
+            raise ValueError(f"expected one value or {bodies} values, got shape {array.shape}")
+    return arrays
+
+
+# Threads each compiled kernel may use in this process, for worker
+# processes that share the cores between them
+def set_threads(count):
+    global _threads
+    _threads = max(int(count), 1)
+    if _compiled is not None:
+        import numba
+        numba.set_num_threads(min(_threads, numba.config.NUMBA_NUM_THREADS))
+
+
+# One line saying which backend is active, without importing Numba
+def describe():
+    if BACKEND == "numpy":
+        reason = "Numba not installed" if importlib.util.find_spec("numba") is None else "PHYSICS_BACKEND=numpy"
+        return f"NumPy ({reason})"
+    threads = _threads or int(os.environ.get("NUMBA_NUM_THREADS", 0)) or os.cpu_count()
+    return (f"Numba {importlib.metadata.version('numba')} for {JIT_MIN_BODIES}+ bodies, "
+            f"{threads} threads, NumPy below that")
+
+
+# Load or compile every kernel and return the seconds it took per kernel.
+# The first run on a machine compiles; later ones load the disk cache.
+def warm_up():
+    if BACKEND != "numba":
+        return {}
+    seconds = {}
+    start = time.perf_counter()
+    module = _load()
+    seconds["import"] = time.perf_counter() - start
+    state = np.zeros((JIT_MIN_BODIES, 6))
+    ones = np.ones(JIT_MIN_BODIES)
+    calls = {
+        "pendulum": lambda: module.pendulum(state[:, :2].copy(), 0.1, 1, ones, ones),
+        "bounce": lambda: module.bounce(state[:, :4].copy(), 0.1, 1, ones, ones, ones),
+        "projectile": lambda: module.projectile(state.copy(), 0.1, 1, np.zeros(3), 0.0,
+                                                np.zeros(JIT_MIN_BODIES, dtype=bool)),
+    }
+    for name, call in calls.items():
+        start = time.perf_counter()
+        call()
+        seconds[name] = time.perf_counter() - start
+    return seconds
+
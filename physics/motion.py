@@ -0,0 +1,39 @@
+import numpy as np
+
+from . import integrators
+
+# Bodies moving along x with constant acceleration, wrapping around when
+# they leave the visible range (Scripts/1.py). One row per body.
+X, VELOCITY, ACCELERATION = range(3)
+
+
+def initial_state(x, velocity, acceleration=0.0):
+    x = np.atleast_1d(np.asarray(x, dtype=float))
+    state = np.empty((len(x), 3))
+    state[:, X] = x
+    state[:, VELOCITY] = velocity
+    state[:, ACCELERATION] = acceleration
+    return state
+
+
+# Advance in place by n_steps of dt, with semi-implicit Euler or another
+# integrator from physics/integrators.py. Bodies that pass x_max jump back
+# to x_min; where reset_on_wrap is set they also start again from rest.
+def step(state, dt, n_steps=1, x_min=-1.0, x_max=1.0, reset_on_wrap=False, integrator="semi_implicit_euler"):
+    x = state[:, X]
+    v = state[:, VELOCITY]
+    a = state[:, ACCELERATION]
+    reset_on_wrap = np.broadcast_to(reset_on_wrap, x.shape)
+    native = integrator == "semi_implicit_euler"
+    advance = None if native else integrators.get(integrator).step
+    for _ in range(n_steps):
+        if native:
+            v += a * dt
+            x += v * dt
+        else:
+            advance(x, v, dt, lambda q, v: a)
+        wrapped = x > x_max
+        if wrapped.any():
+            x[wrapped] = x_min
+            v[wrapped & reset_on_wrap] = 0.0
+    return state
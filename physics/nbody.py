@@ -0,0 +1,297 @@
+import numpy as np
+
+from . import integrators
+
+# Self-gravitating bodies in 2D (Scripts/3.py N-body mode). One row per
+# body; the accelerations are kept in the state so each leapfrog step
+# needs only one force evaluation.
+X, Y, VX, VY, AX, AY, MASS = range(7)
+POSITION = slice(X, Y + 1)
+VELOCITY = slice(VX, VY + 1)
+ACCELERATION = slice(AX, AY + 1)
+
+MAX_DEPTH = 16  # tree levels below the root; bodies closer than 2**-16 of the box share a cell
+LEAF_SIZE = 8  # nodes with at most this many bodies are summed body by body
+GROUP_SIZE = 16  # bodies that walk the tree together
+DIRECT_PAIRS = 1 << 20  # body pairs per block in the direct sum, to bound memory
+
+
+def initial_state(x, y, vx=0.0, vy=0.0, mass=1.0):
+    x = np.atleast_1d(np.asarray(x, dtype=float))
+    state = np.empty((len(x), 7))
+    state[:, X] = x
+    state[:, Y] = y
+    state[:, VX] = vx
+    state[:, VY] = vy
+    state[:, ACCELERATION] = np.nan  # computed by the first step
+    state[:, MASS] = mass
+    return state
+
+
+# Interleave the bits of two 16-bit integer arrays into 32-bit Morton keys
+def _spread_bits(v):
+    v = v.astype(np.uint64)
+    v = (v | (v << np.uint64(8))) & np.uint64(0x00FF00FF)
+    v = (v | (v << np.uint64(4))) & np.uint64(0x0F0F0F0F)
+    v = (v | (v << np.uint64(2))) & np.uint64(0x33333333)
+    v = (v | (v << np.uint64(1))) & np.uint64(0x55555555)
+    return v
+
+
+# Inverse of _spread_bits: the even bits of each key packed into an integer
+def _compact_bits(v):
+    v = v & np.uint64(0x55555555)
+    v = (v | (v >> np.uint64(1))) & np.uint64(0x33333333)
+    v = (v | (v >> np.uint64(2))) & np.uint64(0x0F0F0F0F)
+    v = (v | (v >> np.uint64(4))) & np.uint64(0x00FF00FF)
+    v = (v | (v >> np.uint64(8))) & np.uint64(0x0000FFFF)
+    return v.astype(np.int64)
+
+
+class QuadTree:
+    # A quadtree held as one set of flat arrays per level. Bodies are
+    # sorted by Morton key, so every node is a contiguous run of the sorted
+    # bodies and its children are a contiguous run of the next level's
+    # nodes. Masses and centres of mass are sums over those runs.
+    def __init__(self, position, mass):
+        lo = position.min(axis=0)
+        self.size = max(float((position.max(axis=0) - lo).max()), 1e-12) * (1 + 1e-9)
+        cells = 1 << MAX_DEPTH
+        q = np.minimum(((position - lo) / self.size * cells).astype(np.int64), cells - 1)
+        keys = _spread_bits(q[:, 0]) | (_spread_bits(q[:, 1]) << np.uint64(1))
+        self.order = np.argsort(keys, kind="stable")
+        self.keys = keys  # per body, in the caller's order
+        sorted_keys = keys[self.order]
+        sorted_mass = mass[self.order]
+        weighted = position[self.order] * sorted_mass[:, None]
+        n = len(mass)
+
+        self.levels = []
+        for level in range(MAX_DEPTH + 1):
+            prefix = sorted_keys >> np.uint64(2 * (MAX_DEPTH - level))
+            start = np.flatnonzero(np.r_[True, prefix[1:] != prefix[:-1]])
+            count = np.diff(np.r_[start, n])
+            node_mass = np.add.reduceat(sorted_mass, start)
+            com = np.add.reduceat(weighted, start) / node_mass[:, None]
+            size = self.size / (1 << level)
+            cell = np.stack([_compact_bits(prefix[start]), _compact_bits(prefix[start] >> np.uint64(1))], axis=1)
+            offset = np.linalg.norm(com - (lo + (cell + 0.5) * size), axis=1)
+            self.levels.append({"prefix": prefix[start], "start": start, "count": count,
+                                "mass": node_mass, "com": com, "size": size, "offset": offset})
+        for level, below in zip(self.levels, self.levels[1:]):
+            level["first_child"] = np.searchsorted(below["start"], level["start"])
+            level["children"] = np.searchsorted(below["start"], level["start"] + level["count"]) - level["first_child"]
+
+    # Groups of at most GROUP_SIZE nearby bodies: the first node on each
+    # body's path down the tree that is that small. Returned as the
+    # (level, node) of each group, in sorted body order.
+    def _groups(self):
+        n = len(self.order)
+        group_level = np.full(n, MAX_DEPTH)
+        for depth in range(MAX_DEPTH, -1, -1):
+            level = self.levels[depth]
+            small = np.repeat(level["count"] <= GROUP_SIZE, level["count"])
+            group_level[small] = depth
+        groups = []
+        for depth, level in enumerate(self.levels):
+            first = level["start"][group_level[level["start"]] == depth]
+            nodes = np.searchsorted(level["start"], first)
+            groups.extend((level["start"][node], depth, node) for node in nodes)
+        return [(depth, node) for _, depth, node in sorted(groups)]
+
+    # Accelerations on all bodies. The tree is walked once per group of
+    # nearby bodies rather than once per body. A node acts on a group as a
+    # single mass when every body of the group is farther from the node's
+    # centre of mass than size / theta plus the distance from that centre
+    # of mass to the middle of the cell; the extra distance guards against
+    # nodes whose mass sits near the side facing the group. Those forces
+    # are expanded to first order about the group's centre (acceleration
+    # plus tidal tensor), so each body needs only a few operations for its
+    # whole far field. The expansion is only as good as the group is small
+    # against its distance, so the group's radius must also be under theta
+    # times that gap, however small the node. Nodes that fail the test are
+    # opened, or summed body by body once they are small enough.
+    def accelerations(self, position, mass, G=1.0, theta=0.7, softening=0.01):
+        n = len(position)
+        eps2 = softening * softening
+        sorted_position = position[self.order]
+        sorted_mass = mass[self.order]
+
+        # Group extents, in sorted body order
+        groups = self._groups()
+        group_start = np.array([self.levels[d]["start"][i] for d, i in groups])
+        group_count = np.array([self.levels[d]["count"][i] for d, i in groups])
+        group_depth = np.array([d for d, _ in groups])
+        group_prefix = np.array([self.levels[d]["prefix"][i] for d, i in groups], dtype=np.uint64)
+        lo = np.minimum.reduceat(sorted_position, group_start)
+        hi = np.maximum.reduceat(sorted_position, group_start)
+        centre = (lo + hi) / 2
+        radius = np.linalg.norm(hi - lo, axis=1) / 2
+
+        n_groups = len(groups)
+        field = np.zeros((n_groups, 2))  # acceleration at the group centre
+        tidal = np.zeros((n_groups, 3))  # its gradient: xx, xy, yy
+        near_groups, near_levels, near_nodes = [], [], []
+
+        walk = np.arange(n_groups)
+        nodes = np.zeros(n_groups, dtype=np.int64)
+        for depth, level in enumerate(self.levels):
+            if not len(walk):
+                break
+            d = level["com"][nodes] - centre[walk]
+            r2 = np.einsum("ij,ij->i", d, d)
+            gap = np.sqrt(r2) - radius[walk]
+            reach = level["size"] / theta + level["offset"][nodes]
+            # A group inside the node is never far from it
+            shift = 2 * np.maximum(group_depth[walk] - depth, 0).astype(np.uint64)
+            inside = (group_prefix[walk] >> shift) == level["prefix"][nodes]
+            far = ~inside & (gap > reach) & (theta * gap > radius[walk])
+            self._add_far(field, tidal, walk[far], d[far], r2[far] + eps2, level["mass"][nodes[far]], G, n_groups)
+
+            walk, nodes = walk[~far], nodes[~far]
+            leaf = (level["count"][nodes] <= LEAF_SIZE) | (depth == MAX_DEPTH)
+            near_groups.append(walk[leaf])
+            near_levels.append(np.full(leaf.sum(), depth))
+            near_nodes.append(nodes[leaf])
+            walk, nodes = walk[~leaf], nodes[~leaf]
+            if depth < MAX_DEPTH:
+                count = level["children"][nodes]
+                walk = np.repeat(walk, count)
+                nodes = np.repeat(level["first_child"][nodes], count) + _ranks(count)
+
+        # Far field at every body from its group's expansion
+        body_group = np.repeat(np.arange(n_groups), group_count)
+        offset = sorted_position - centre[body_group]
+        t = tidal[body_group]
+        sorted_acceleration = field[body_group] + np.stack([
+            t[:, 0] * offset[:, 0] + t[:, 1] * offset[:, 1],
+            t[:, 1] * offset[:, 0] + t[:, 2] * offset[:, 1]], axis=1)
+
+        # Near field body by body, every body of the group with every body
+        # of the leaf
+        near_groups = np.concatenate(near_groups)
+        near_levels = np.concatenate(near_levels)
+        near_nodes = np.concatenate(near_nodes)
+        leaf_start = np.empty(len(near_nodes), dtype=np.int64)
+        leaf_count = np.empty(len(near_nodes), dtype=np.int64)
+        for depth, level in enumerate(self.levels):
+            at = near_levels == depth
+            leaf_start[at] = level["start"][near_nodes[at]]
+            leaf_count[at] = level["count"][near_nodes[at]]
+        targets = np.repeat(group_start[near_groups], group_count[near_groups]) + _ranks(group_count[near_groups])
+        leaf_start = np.repeat(leaf_start, group_count[near_groups])
+        leaf_count = np.repeat(leaf_count, group_count[near_groups])
+        sources = np.repeat(leaf_start, leaf_count) + _ranks(leaf_count)
+        targets = np.repeat(targets, leaf_count)
+        if not eps2:
+            # A softened body pulls on itself with zero force; an unsoftened
+            # one divides by zero
+            other = targets != sources
+            targets, sources = targets[other], sources[other]
+        x, y = sorted_position[:, 0].copy(), sorted_position[:, 1].copy()
+        dx = x[sources] - x[targets]
+        dy = y[sources] - y[targets]
+        r2 = dx * dx + dy * dy + eps2
+        scale = G * sorted_mass[sources] / (r2 * np.sqrt(r2))
+        sorted_acceleration[:, 0] += np.bincount(targets, dx * scale, minlength=n)
+        sorted_acceleration[:, 1] += np.bincount(targets, dy * scale, minlength=n)
+
+        acceleration = np.empty((n, 2))
+        acceleration[self.order] = sorted_acceleration
+        return acceleration
+
+    # Acceleration and tidal tensor at group centres from masses at offsets d
+    @staticmethod
+    def _add_far(field, tidal, groups, d, r2, m, G, n_groups):
+        if not len(groups):
+            return
+        inv_r3 = G * m / (r2 * np.sqrt(r2))
+        inv_r5 = 3 * inv_r3 / r2
+        columns = (d[:, 0] * inv_r3, d[:, 1] * inv_r3,
+                   d[:, 0] * d[:, 0] * inv_r5 - inv_r3, d[:, 0] * d[:, 1] * inv_r5, d[:, 1] * d[:, 1] * inv_r5 - inv_r3)
+        for target, values in zip((field[:, 0], field[:, 1], tidal[:, 0], tidal[:, 1], tidal[:, 2]), columns):
+            target += np.bincount(groups, values, minlength=n_groups)
+
+
+# 0, 1, ..., c - 1 for every c in counts, concatenated
+def _ranks(counts):
+    total = int(counts.sum())
+    return np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts)
+
+
+def tree_accelerations(position, mass, G=1.0, theta=0.7, softening=0.01):
+    return QuadTree(position, mass).accelerations(position, mass, G, theta, softening)
+
+
+# Exact O(N^2) sum, on all bodies or only on the bodies listed in targets
+def direct_accelerations(position, mass, G=1.0, softening=0.01, targets=None):
+    targets = np.arange(len(position)) if targets is None else np.asarray(targets)
+    acceleration = np.empty((len(targets), 2))
+    eps2 = softening * softening
+    block_size = max(1, DIRECT_PAIRS // len(position))
+    for begin in range(0, len(targets), block_size):
+        block = targets[begin:begin + block_size]
+        d = position[None, :, :] - position[block, None, :]
+        r2 = np.einsum("ijk,ijk->ij", d, d) + eps2
+        scale = G * mass[None, :] / (r2 * np.sqrt(r2))
+        scale[np.arange(len(block)), block] = 0.0  # no force on a body from itself
+        acceleration[begin:begin + len(block)] = np.einsum("ij,ijk->ik", scale, d)
+    return acceleration
+
+
+# Advance in place with kick-drift-kick leapfrog, which keeps orbits from
+# drifting in energy, or another integrator from physics/integrators.py.
+# method is "tree" for Barnes-Hut or "direct".
+def step(state, dt, n_steps=1, G=1.0, theta=0.7, softening=0.01, method="tree", integrator="leapfrog"):
+    position = state[:, POSITION]
+    velocity = state[:, VELOCITY]
+    acceleration = state[:, ACCELERATION]
+    mass = state[:, MASS]
+
+    def forces(position=position):
+        if method == "direct":
+            return direct_accelerations(position, mass, G, softening)
+        return tree_accelerations(position, mass, G, theta, softening)
+
+    if integrator != "leapfrog":
+        advance = integrators.get(integrator).step
+        for _ in range(n_steps):
+            advance(position, velocity, dt, lambda q, v: forces(q))
+        acceleration[...] = np.nan  # stale; the next leapfrog step works it out again
+        return state
+    if not np.isfinite(acceleration).all():
+        acceleration[...] = forces()
+    for _ in range(n_steps):
+        velocity += 0.5 * dt * acceleration
+        position += dt * velocity
+        acceleration[...] = forces()
+        velocity += 0.5 * dt * acceleration
+    return state
+
+
+# Kinetic plus softened potential energy of the whole system, which the
+# integrators should keep constant. Sums every pair at once, so it is for
+# checks on a few thousand bodies at most.
+def energy(state, G=1.0, softening=0.01):
+    position = state[:, POSITION]
+    mass = state[:, MASS]
+    kinetic = 0.5 * np.sum(mass * np.einsum("ij,ij->i", state[:, VELOCITY], state[:, VELOCITY]))
+    d = position[None, :, :] - position[:, None, :]
+    r = np.sqrt(np.einsum("ijk,ijk->ij", d, d) + softening * softening)
+    pairs = np.triu(mass[:, None] * mass[None, :] / r, k=1)
+    return kinetic - G * pairs.sum()
+
+
+# A disc of bodies orbiting a heavy central mass (row 0), each on a
+# roughly circular orbit given the mass inside its radius
+def galaxy(n, radius=0.8, central_mass=0.5, disc_mass=0.5, G=1.0, seed=0):
+    rng = np.random.default_rng(seed)
+    r = radius * np.sqrt(rng.uniform(0.02, 1.0, n - 1))
+    angle = rng.uniform(0.0, 2 * np.pi, n - 1)
+    enclosed = central_mass + disc_mass * (r / radius) ** 2
+    speed = np.sqrt(G * enclosed / r)
+    x, y = r * np.cos(angle), r * np.sin(angle)
+    vx, vy = -speed * np.sin(angle), speed * np.cos(angle)
+    state = initial_state(np.r_[0.0, x], np.r_[0.0, y], np.r_[0.0, vx], np.r_[0.0, vy],
+                          np.r_[central_mass, np.full(n - 1, disc_mass / (n - 1))])
+    return state
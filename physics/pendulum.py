@@ -0,0 +1,55 @@
+import numpy as np
+
+from . import integrators, kernels
+
+# Simple pendulums with multiplicative air-resistance damping (Scripts/2.py).
+# One row per pendulum; angles are measured from the vertical.
+THETA, OMEGA = range(2)
+
+
+def initial_state(theta, omega=0.0):
+    theta = np.atleast_1d(np.asarray(theta, dtype=float))
+    state = np.empty((len(theta), 2))
+    state[:, THETA] = theta
+    state[:, OMEGA] = omega
+    return state
+
+
+# Advance in place with semi-implicit Euler, or another integrator from
+# physics/integrators.py. length and damping may be scalars or one value
+# per pendulum; damping is the factor the angular velocity keeps per unit
+# of time. Large batches run compiled when Numba is installed
+# (physics/kernels.py).
+def step(state, dt, n_steps=1, gravity=0.0005, length=1.0, damping=1.0, integrator="semi_implicit_euler"):
+    theta = state[:, THETA]
+    omega = state[:, OMEGA]
+    decay = np.asarray(damping, dtype=float) ** dt
+    if integrator != "semi_implicit_euler":
+        g = gravity / np.asarray(length, dtype=float)
+        advance = integrators.get(integrator).step
+        for _ in range(n_steps):
+            advance(theta, omega, dt, lambda q, v: -g * np.sin(q))
+            omega *= decay
+        return state
+    k = gravity / np.asarray(length, dtype=float) * dt
+    kernel = kernels.compiled("pendulum", len(state))
+    if kernel is not None:
+        kernel(state, dt, n_steps, *kernels.per_body(len(state), k, decay))
+        return state
+    scratch = np.empty_like(theta)  # reused so large ensembles do not allocate per step
+    for _ in range(n_steps):
+        np.sin(theta, out=scratch)
+        scratch *= k
+        omega -= scratch
+        omega *= decay
+        np.multiply(omega, dt, out=scratch)
+        theta += scratch
+    return state
+
+
+# Bob positions for pendulums hanging from origin (scalars or per-pendulum arrays)
+def bob_positions(state, origin, length):
+    origin = np.asarray(origin, dtype=float)
+    x = origin[..., 0] + length * np.sin(state[:, THETA])
+    y = origin[..., 1] - length * np.cos(state[:, THETA])
+    return x, y
@@ -0,0 +1,129 @@
+import math
+from collections import namedtuple
+
+import numpy as np
+
+from . import integrators, kernels
+
+# Drag-free projectiles in 3D (Scripts/4.py and samp.py). One row per body.
+POSITION = slice(0, 3)
+VELOCITY = slice(3, 6)
+GRAVITY = np.array([0.0, -9.81, 0.0])
+
+# Exact drag-free flight: time to reach the ground, horizontal distance
+# covered by then, and the height and time of the highest point
+Flight = namedtuple("Flight", "time range apex apex_time")
+
+
+def initial_state(position, velocity):
+    position = np.atleast_2d(np.asarray(position, dtype=float))
+    state = np.empty((len(position), 6))
+    state[:, POSITION] = position
+    state[:, VELOCITY] = velocity
+    return state
+
+
+# Launch velocity for a speed and an elevation angle in degrees, in the x-y plane
+def launch_velocity(speed, angle):
+    return np.array([speed * math.cos(math.radians(angle)),
+                     speed * math.sin(math.radians(angle)),
+                     0.0])
+
+
+# n bodies launched together from position, scattered around velocity:
+# speed varies by a relative normal spread and the direction by normal
+# spreads of the elevation and heading angles, in degrees
+def salvo(position, velocity, n, speed_spread=0.1, angle_spread=5.0, heading_spread=10.0, rng=None):
+    rng = np.random.default_rng() if rng is None else rng
+    vx, vy, vz = np.asarray(velocity, dtype=float)
+    speed = math.sqrt(vx * vx + vy * vy + vz * vz)
+    elevation = math.atan2(vy, math.hypot(vx, vz))
+    heading = math.atan2(vz, vx)
+    speed = speed * (1 + speed_spread * rng.standard_normal(n))
+    elevation = elevation + np.radians(angle_spread) * rng.standard_normal(n)
+    heading = heading + np.radians(heading_spread) * rng.standard_normal(n)
+    flat = speed * np.cos(elevation)
+    velocities = np.stack([flat * np.cos(heading), speed * np.sin(elevation), flat * np.sin(heading)], axis=1)
+    return initial_state(np.broadcast_to(np.asarray(position, dtype=float), (n, 3)), velocities)
+
+
+# Bodies resting on or below the ground and not moving up
+def landed(state, ground=0.0):
+    return (state[:, 1] <= ground) & (state[:, 4] <= 0.0)
+
+
+# Advance in place with semi-implicit Euler, or another integrator from
+# physics/integrators.py. A body that reaches the ground is put on it and
+# left there. Returns the mask of bodies on the ground. Large batches run
+# compiled when Numba is installed (physics/kernels.py).
+def step(state, dt, n_steps=1, gravity=GRAVITY, ground=0.0, integrator="semi_implicit_euler"):
+    gravity = np.asarray(gravity, dtype=float)
+    if integrator != "semi_implicit_euler":
+        return _step_with(integrators.get(integrator).step, state, dt, n_steps, gravity, ground)
+    kernel = kernels.compiled("projectile", len(state))
+    if kernel is not None:
+        on_ground = np.empty(len(state), dtype=bool)
+        kernel(state, dt, n_steps, np.ascontiguousarray(gravity, dtype=float), float(ground), on_ground)
+        return on_ground
+    flying = ~landed(state, ground)
+    for _ in range(n_steps):
+        if not flying.any():
+            break
+        state[flying, VELOCITY] += gravity * dt
+        state[flying, POSITION] += state[flying, VELOCITY] * dt
+        hit = flying & (state[:, 1] <= ground)
+        if hit.any():
+            state[hit, 1] = ground
+            flying &= ~hit
+    return ~flying
+
+
+# step() with another integrator, on a copy of the bodies still flying
+def _step_with(advance, state, dt, n_steps, gravity, ground):
+    flying = np.flatnonzero(~landed(state, ground))
+    bodies = state[flying]
+    for _ in range(n_steps):
+        if not len(flying):
+            break
+        advance(bodies[:, POSITION], bodies[:, VELOCITY], dt, lambda q, v: gravity)
+        hit = bodies[:, 1] <= ground
+        if hit.any():
+            bodies[hit, 1] = ground
+            state[flying[hit]] = bodies[hit]
+            flying = flying[~hit]
+            bodies = bodies[~hit]
+    state[flying] = bodies
+    return landed(state, ground)
+
+
+# Closed-form flight of projectiles launched from height with speed at an
+# elevation angle in degrees, under gravity g (positive, pointing down).
+# All arguments broadcast, so whole grids of launch parameters are solved
+# in one call, e.g. flight(h, speeds[None, :], angles[:, None]). Launches
+# that never reach the ground give nan.
+def flight(height, speed, angle, g=9.81, ground=0.0):
+    theta = np.radians(angle)
+    vx = speed * np.cos(theta)
+    vy = speed * np.sin(theta)
+    drop = np.asarray(height, dtype=float) - ground
+    with np.errstate(invalid="ignore"):
+        time = (vy + np.sqrt(vy * vy + 2 * g * drop)) / g
+    apex_time = np.clip(vy / g, 0.0, time)
+    apex = height + vy * apex_time - 0.5 * g * apex_time * apex_time
+    return Flight(time, vx * time, apex, apex_time)
+
+
+# Time at which bodies in state first reach the ground under a gravity
+# vector whose y component is negative; nan for bodies that never do
+def impact_time(state, gravity=GRAVITY, ground=0.0):
+    g = -np.asarray(gravity, dtype=float)[1]
+    drop = state[:, 1] - ground
+    vy = state[:, 4]
+    with np.errstate(invalid="ignore"):
+        return (vy + np.sqrt(vy * vy + 2 * g * drop)) / g
+
+
+# Where the bodies in state hit the ground, as an (n, 3) array
+def impact_point(state, gravity=GRAVITY, ground=0.0):
+    t = impact_time(state, gravity, ground)[:, None]
+    return state[:, POSITION] + state[:, VELOCITY] * t + 0.5 * np.asarray(gravity) * t * t
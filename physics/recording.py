@@ -0,0 +1,143 @@
+import json
+import mmap
+import os
+
+import numpy as np
+
+# Simulation runs on disk, one fixed-size record per physics step:
+#
+#   magic (8 bytes) | JSON header, space-padded to HEADER_SIZE | records...
+#
+# Each record holds the simulated time, the whole state array and the
+# step parameters named in the header, so record i starts at a known
+# byte offset and any step can be read without touching the others. The
+# record count comes from the file size, so a run cut short by a crash
+# is still readable up to its last complete record.
+MAGIC = b"PHYSREC1"
+HEADER_SIZE = 4096
+BUFFER_RECORDS = 256  # records collected in memory between writes
+
+
+def record_dtype(state_shape, params):
+    fields = [("time", "<f8"), ("state", "<f8", tuple(state_shape))]
+    fields += [(name, "<f8", tuple(shape)) for name, shape in params.items()]
+    return np.dtype(fields)
+
+
+class Recorder:
+    # Appends records to a recording file. params maps each recorded step
+    # parameter to its shape, () for scalars. dt is the simulated seconds
+    # per step, used for the record times.
+    def __init__(self, path, state_shape, dt, params=None, **metadata):
+        self.path = path
+        self.dt = dt
+        self.params = dict(params or {})
+        self.dtype = record_dtype(state_shape, self.params)
+        header = json.dumps({
+            "state_shape": list(state_shape),
+            "params": {name: list(shape) for name, shape in self.params.items()},
+            "dt": dt,
+            **metadata,
+        }).encode()
+        if len(header) > HEADER_SIZE - len(MAGIC):
+            raise ValueError("Recording metadata does not fit in the header")
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.file = open(path, "wb")
+        self.file.write(MAGIC + header.ljust(HEADER_SIZE - len(MAGIC)))
+        self.buffer = np.zeros(BUFFER_RECORDS, dtype=self.dtype)
+        self.buffered = 0
+        self.count = 0
+
+    def append(self, state, **params):
+        record = self.buffer[self.buffered]
+        record["time"] = self.count * self.dt
+        record["state"] = state
+        for name in self.params:
+            record[name] = params[name]
+        self.buffered += 1
+        self.count += 1
+        if self.buffered == len(self.buffer):
+            self.flush()
+
+    # A step function with the same signature as step that records the
+    # state after every single step it takes. Records reach the file at
+    # the end of every call, so a scene that is closed without stopping
+    # the recorder loses nothing.
+    def wrap(self, step):
+        def recorded(state, dt, n_steps=1, **params):
+            result = None
+            for _ in range(n_steps):
+                result = step(state, dt, 1, **params)
+                self.append(state, **params)
+            self.flush()
+            return result
+        return recorded
+
+    def flush(self):
+        if not self.buffered:
+            return
+        self.file.write(self.buffer[:self.buffered].tobytes())
+        self.file.flush()
+        self.buffered = 0
+
+    def close(self):
+        if not self.file.closed:
+            self.flush()
+            self.file.close()
+
+
+class Recording:
+    # A recording file mapped read-only into memory. Indexing reads only
+    # the pages holding the records asked for, so seeking is constant
+    # time. Readahead is switched off and trim() releases the pages read
+    # so far, which keeps resident memory bounded however long the run
+    # was. records is a structured array over the mapping; the same file
+    # opens with np.memmap(path, dtype=recording.dtype, offset=HEADER_SIZE).
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f"{path} is not a recording")
+            self.header = json.loads(f.read(HEADER_SIZE - len(MAGIC)).decode().rstrip())
+        self.dt = self.header["dt"]
+        self.params = {name: tuple(shape) for name, shape in self.header["params"].items()}
+        self.dtype = record_dtype(self.header["state_shape"], self.params)
+        self._map = None
+        self.records = np.zeros(0, dtype=self.dtype)
+        self.refresh()
+
+    # Pick up records appended since the file was opened
+    def refresh(self):
+        count = max(0, (os.path.getsize(self.path) - HEADER_SIZE) // self.dtype.itemsize)
+        if count == len(self.records):
+            return
+        self.close()
+        with open(self.path, "rb") as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if hasattr(self._map, "madvise"):
+            self._map.madvise(mmap.MADV_RANDOM)
+        self.records = np.frombuffer(self._map, dtype=self.dtype, count=count, offset=HEADER_SIZE)
+
+    # Drop the pages read so far from this process; they are read back
+    # from the file (or the page cache) if needed again
+    def trim(self):
+        if self._map is not None and hasattr(self._map, "madvise"):
+            self._map.madvise(mmap.MADV_DONTNEED)
+
+    def close(self):
+        self.records = np.zeros(0, dtype=self.dtype)
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+
+    def __len__(self):
+        return len(self.records)
+
+    def __getitem__(self, index):
+        return self.records[index]
+
+    # Evenly spaced records from start up to stop, at most
+    # limit of them, for drawing a long history without reading all of it
+    def sample(self, field, stop, start=0, limit=2000):
+        stride = max(1, (stop - start + 1) // limit)
+        return self.records[field][start:stop + 1:stride]
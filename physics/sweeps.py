@@ -0,0 +1,96 @@
+import numpy as np
+
+from . import bounce, pendulum, projectile
+
+# Models for parameter sweeps. Each takes one 1-D array per parameter,
+# one element per run, and returns a dict of 1-D result arrays. All the
+# runs passed in one call are simulated together as rows of one state.
+# Parameters not swept keep their defaults, which match the scenes; any
+# of them may be scalars, and the runs are as many as the longest array.
+# The settings in STEP_SETTINGS fix the number of steps, which all runs
+# of a call share, so they are always scalars.
+STEP_SETTINGS = ("dt", "frame_time", "duration", "max_time")
+
+
+# The physical parameters of a model as 1-D arrays of one value per run
+def per_run(*values):
+    return np.broadcast_arrays(*(np.atleast_1d(np.asarray(value, dtype=float)) for value in values))
+
+
+# Launch from height at speed and angle (degrees) until landing
+# (Scripts/4.py). Runs that have not landed by max_time give nan.
+def projectile_range(angle=45.0, speed=10.0, height=1.0, dt=1e-3, max_time=60.0):
+    angle, speed, height = per_run(angle, speed, height)
+    theta = np.radians(angle)
+    state = np.zeros((len(theta), 6))
+    state[:, 1] = height
+    state[:, 3] = speed * np.cos(theta)
+    state[:, 4] = speed * np.sin(theta)
+    time = np.full(len(theta), np.nan)
+    apex = state[:, 1].copy()
+    landed = projectile.landed(state)
+    time[landed] = 0.0
+    for i in range(1, int(max_time / dt) + 1):
+        now = projectile.step(state, dt, gravity=projectile.GRAVITY)
+        np.maximum(apex, state[:, 1], out=apex)
+        time[now & ~landed] = i * dt
+        landed = now
+        if landed.all():
+            break
+    return {"range": np.where(landed, state[:, 0], np.nan), "flight_time": time, "apex": apex}
+
+
+# Swing of a damped pendulum released at rest (Scripts/2.py, which counts
+# time in frames of 1/60 s). Gives the amplitude left after duration
+# seconds, the time until the amplitude first halves (nan if it never
+# does) and the number of swings, counted as changes of direction.
+def pendulum_decay(damping=0.99, amplitude=45.0, length=0.5, gravity=0.0005, duration=60.0,
+                   frame_time=1 / 60, dt=0.5):
+    damping, amplitude, length, gravity = per_run(damping, amplitude, length, gravity)
+    theta0 = np.radians(amplitude)
+    state = pendulum.initial_state(theta0)
+    k = gravity / length
+    half_life = np.full(len(state), np.nan)
+    swings = np.zeros(len(state), dtype=int)
+    omega = state[:, pendulum.OMEGA]
+    previous_omega = omega.copy()
+    amplitude_now = theta0.copy()
+    steps = int(duration / frame_time / dt)
+    for i in range(1, steps + 1):
+        pendulum.step(state, dt, gravity=gravity, length=length, damping=damping)
+        swings += (previous_omega * omega) < 0
+        previous_omega[:] = omega
+        # Amplitude the pendulum's energy would reach at rest
+        energy = 0.5 * omega * omega + k * (1 - np.cos(state[:, pendulum.THETA]))
+        amplitude_now = np.arccos(np.clip(1 - energy / k, -1.0, 1.0))
+        halved = np.isnan(half_life) & (amplitude_now <= theta0 / 2)
+        half_life[halved] = i * dt * frame_time
+    return {"final_amplitude": np.degrees(amplitude_now), "half_life": half_life, "swings": swings}
+
+
+# Bounces of a body dropped from height in Scripts/3.py's units, where the
+# scene's gravity value is scaled by GRAVITY_SCALE per frame. A bounce
+# only counts while the body still leaves the floor at min_speed; rest
+# time is when the last counted bounce happened.
+def bounce_count(gravity=9.8, restitution=0.8, height=0.9, floor=-0.9, gravity_scale=0.0001,
+                 duration=30.0, frame_time=1 / 60, dt=0.5, min_speed=1e-3):
+    gravity, restitution, height, floor = per_run(gravity, restitution, height, floor)
+    state = bounce.initial_state(np.zeros(len(gravity)), height)
+    bounces = np.zeros(len(gravity), dtype=int)
+    rest_time = np.zeros(len(gravity))
+    vy = state[:, bounce.VY]
+    steps = int(duration / frame_time / dt)
+    for i in range(1, steps + 1):
+        before = vy.copy()
+        bounce.step(state, dt, gravity=-gravity * gravity_scale, floor=floor, restitution=restitution)
+        counted = (before < 0) & (vy > min_speed)
+        bounces += counted
+        rest_time[counted] = i * dt * frame_time
+    return {"bounces": bounces, "rest_time": rest_time}
+
+
+MODELS = {
+    "range": projectile_range,
+    "decay": pendulum_decay,
+    "bounces": bounce_count,
+}
@@ -1,23 +1,47 @@
+import os
+import sys
+import time
 import pygame
 from pygame.locals import *
 from OpenGL.GL import *
 from OpenGL.GLU import *
 import numpy as np
 
+from graphics.batch import PrimitiveBatch
+from graphics.meshes import SphereCache
+from graphics.replay import ReplayControls
+from graphics.salvo import Salvo
+from graphics.text import TextRenderer
+from graphics.trails import TrailBuffer
+from physics import drag, integrators, projectile
+from physics.recording import Recorder, Recording
+from physics.clock import SimulationClock
+from scene_host import FRAME_RATE, run_scene
+
 # Constants
 WINDOW_WIDTH = 1200
 WINDOW_HEIGHT = 800
+WINDOW_SIZE = (WINDOW_WIDTH, WINDOW_HEIGHT)
+FIELD_OF_VIEW = 45
 
 # Projectile parameters
 initial_position = np.array([-5.0, 0.0, 0.0], dtype=float)  # Start position at origin
 initial_velocity = np.array([10.0, 10.0, 0.0], dtype=float)  # Initial velocity in (x, y, z) direction
 gravity = np.array([0.0, -9.8, 0.0], dtype=float)           # Gravity affecting only y direction
 
+# Air resistance: D cycles the drag model, B toggles a crosswind along Z
+DRAG_COEFFICIENTS = {"none": 0.0, "linear": 0.3, "quadratic": 0.02}
+WIND = (0.0, 0.0, 3.0)
+drag_model = "none"
+wind_on = False
+
 # Simulation parameters
-time_step = 0.05  # Time step for simulation
+time_step = 0.0125  # Simulated seconds per physics step
+time_scale = 3.0  # Simulated seconds per second of wall time
 
 # Interactive parameters
-is_paused = False
+is_paused = False  # SPACE, which pauses the salvo too
+has_landed = False  # the projectile rests on the ground until R
 selected_component = None
 
 # Camera parameters
@@ -26,63 +50,87 @@ camera_rot_y = 0
 camera_distance = 25
 mouse_last_pos = None
 
+# Axes and ground, queued in 3D and drawn together
+scenery = PrimitiveBatch(3)
+
 # Ground parameters
 ground_level = 0.0
 
+# Text rendering, cached sphere meshes and the salvo
+text_renderer = None
+spheres = None
+salvo = None
+help_block = None
+
+# position and velocity are views into the simulated state
+state = projectile.initial_state(initial_position, initial_velocity)
+position = state[0, projectile.POSITION]
+velocity = state[0, projectile.VELOCITY]
+previous = state.copy()
+path = TrailBuffer(simplify=True)
+
+# Physics runs in fixed steps independent of the display rate. Each flight
+# is solved ahead with adaptive steps and the clock plays it back, so the
+# step size only sets how often the path gets a point.
+sim_clock = SimulationClock(time_step, time_scale)
+flight = None
+
+# Salvos are stepped with a fixed-step integrator; I picks the next one
+salvo_integrator = integrators.configured("semi_implicit_euler")
+
+# Recording to disk (C) and replaying the last recording (P)
+RECORDING_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "recordings")
+recorder = None
+last_recording = None
+replay = None
+
 def init():
-    pygame.init()
-    pygame.display.set_mode((WINDOW_WIDTH, WINDOW_HEIGHT), DOUBLEBUF | OPENGL)
-    glEnable(GL_DEPTH_TEST)
-    glMatrixMode(GL_PROJECTION)
-    glLoadIdentity()
-    gluPerspective(45, (WINDOW_WIDTH / WINDOW_HEIGHT), 0.1, 100.0)
-    glMatrixMode(GL_MODELVIEW)
-    glTranslatef(0.0, -2.0, -camera_distance)  # Adjust the camera to see the motion horizontally
+    global text_renderer, spheres, salvo, help_block
+    text_renderer = TextRenderer(WINDOW_SIZE)
+    spheres = SphereCache(FIELD_OF_VIEW, WINDOW_HEIGHT)
+    salvo = Salvo(spheres, time_step, timer=lambda: sim_clock.timer())
+
+    # Usage help never changes, so it is uploaded once
+    help_block = text_renderer.block([
+        (10, 680, "Use Arrow keys to change X and Y velocity, W/S to change Z velocity"),
+        (10, 650, "Use Mouse to adjust velocity components: Left (X), Middle (Y), Right (Z)"),
+        (10, 620, "Scroll Mouse to Zoom In/Out"),
+        (10, 590, "Press R to Reset, C to start/stop recording, P to replay the recording"),
+        (10, 470, "Press V to fire a salvo from the start point, - and = to change its size, I its integrator"),
+    ])
+    sim_clock.reset()
 
 def draw_axes():
-    glBegin(GL_LINES)
     # X axis in red
-    glColor3f(1, 0, 0)
-    glVertex3f(-10, 0, 0)
-    glVertex3f(10, 0, 0)
+    scenery.color(1, 0, 0)
+    scenery.line((-10, 0, 0), (10, 0, 0))
     # Y axis in green
-    glColor3f(0, 1, 0)
-    glVertex3f(0, -5, 0)
-    glVertex3f(0, 5, 0)
-    glEnd()
+    scenery.color(0, 1, 0)
+    scenery.line((0, -5, 0), (0, 5, 0))
 
 def draw_projectile(position):
-    glPushMatrix()
     glColor3f(1, 0, 0)  # Red color for the projectile
-    glTranslatef(position[0], position[1], position[2])
-    # Draw a sphere using quadric object
-    quadric = gluNewQuadric()
-    gluSphere(quadric, 0.1, 20, 20)
-    gluDeleteQuadric(quadric)
-    glPopMatrix()
+    # Cached sphere mesh, finer the closer the camera is
+    spheres.draw(position, 0.1, camera_distance)
 
 def draw_trajectory(path):
-    glBegin(GL_LINE_STRIP)
     glColor3f(0, 0, 1)  # Blue color for the trajectory
-    for pos in path:
-        glVertex3f(pos[0], pos[1], pos[2])
-    glEnd()
+    path.draw()
+
+def draw_recorded_path(points):
+    glColor3f(0, 0, 1)
+    glEnableClientState(GL_VERTEX_ARRAY)
+    glVertexPointer(3, GL_DOUBLE, 0, np.ascontiguousarray(points))
+    glDrawArrays(GL_LINE_STRIP, 0, len(points))
+    glDisableClientState(GL_VERTEX_ARRAY)
 
 def draw_ground():
-    glColor3f(0.5, 0.5, 0.5)  # Gray color for the ground
-    glBegin(GL_QUADS)
-    glVertex3f(-10, ground_level, -10)
-    glVertex3f(-10, ground_level, 10)
-    glVertex3f(10, ground_level, 10)
-    glVertex3f(10, ground_level, -10)
-    glEnd()
+    scenery.color(0.5, 0.5, 0.5)  # Gray color for the ground
+    scenery.quad((-10, ground_level, -10), (-10, ground_level, 10),
+                 (10, ground_level, 10), (10, ground_level, -10))
 
 def draw_text(position, text_string):
-    font = pygame.font.Font(None, 24)
-    text_surface = font.render(text_string, True, (255, 255, 255, 255), (0, 0, 0, 255))
-    text_data = pygame.image.tostring(text_surface, "RGBA", True)
-    glWindowPos2d(position[0], position[1])
-    glDrawPixels(text_surface.get_width(), text_surface.get_height(), GL_RGBA, GL_UNSIGNED_BYTE, text_data)
+    text_renderer.draw(position[0], position[1], text_string)
 
 def handle_mouse_events(event):
     global mouse_last_pos, camera_rot_x, camera_rot_y, camera_distance
@@ -103,93 +151,186 @@ def handle_mouse_events(event):
             camera_rot_y += dx
             mouse_last_pos = event.pos
 
-def main():
-    global is_paused, initial_velocity, selected_component, camera_distance
-
-    init()
-    clock = pygame.time.Clock()
-
-    position = initial_position.copy()
-    velocity = initial_velocity.copy()
-    path = []
-
-    running = True
-    while running:
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                running = False
-            elif event.type == KEYDOWN:
-                if event.key == K_ESCAPE:
-                    running = False
-                elif event.key == K_SPACE:
-                    is_paused = not is_paused
-                elif event.key == K_r:
-                    # Reset the simulation
-                    position = initial_position.copy()
-                    velocity = initial_velocity.copy()
-                    path.clear()
-                    is_paused = False
-                elif event.key == K_UP:
-                    velocity[1] += 1  # Increase y velocity
-                elif event.key == K_DOWN:
-                    velocity[1] -= 1  # Decrease y velocity
-                elif event.key == K_LEFT:
-                    velocity[0] -= 1  # Decrease x velocity
-                elif event.key == K_RIGHT:
-                    velocity[0] += 1  # Increase x velocity
-                elif event.key == K_w:
-                    velocity[2] += 1  # Increase z velocity
-                elif event.key == K_s:
-                    velocity[2] -= 1  # Decrease z velocity
-            handle_mouse_events(event)
-
-        if not is_paused:
-            # Update position and velocity
-            velocity += gravity * time_step
-            position += velocity * time_step
-            path.append(position.copy())
-
-            # Collision with ground
-            if position[1] <= ground_level:
-                position[1] = ground_level
-                velocity[0] = 0
-                velocity[1] = 0
-                velocity[2] = 0
-                is_paused = True
-
-        glClear(GL_COLOR_BUFFER_BIT | GL_DEPTH_BUFFER_BIT)
-
-        # Apply camera transformations
-        glLoadIdentity()
-        gluLookAt(0, 0, camera_distance, 0, 0, 0, 0, 1, 0)
-        glRotatef(camera_rot_x, 1, 0, 0)
-        glRotatef(camera_rot_y, 0, 1, 0)
-
-        # Draw axes
-        draw_axes()
-
-        # Draw ground
-        draw_ground()
+# Solve the rest of the flight from the current state
+def launch():
+    global flight
+    flight = drag.solve(state[0], gravity, drag_model, DRAG_COEFFICIENTS[drag_model],
+                        WIND if wind_on else (0.0, 0.0, 0.0), ground_level)
+
+def toggle_recording():
+    global recorder, last_recording
+    if recorder:
+        recorder.close()
+        recorder = None
+    else:
+        last_recording = os.path.join(RECORDING_DIR, time.strftime("samp_%Y%m%d_%H%M%S.rec"))
+        recorder = Recorder(last_recording, state.shape, sim_clock.dt,
+                            params={"gravity": (3,), "ground": ()}, scene="Projectile Sandbox")
+
+def toggle_replay():
+    global replay
+    if replay:
+        replay.recording.close()
+        replay = None
+        sim_clock.reset()
+    elif last_recording:
+        if recorder:
+            toggle_recording()
+        recording = Recording(last_recording)
+        if len(recording):
+            replay = ReplayControls(WINDOW_SIZE, recording, timer=lambda: sim_clock.timer())
 
+def handle_event(event):
+    global is_paused, has_landed, flight, drag_model, wind_on, salvo_integrator
+    if replay and replay.handle_event(event):
+        return
+    if event.type == KEYDOWN and event.key == K_p:
+        toggle_replay()
+    elif event.type == KEYDOWN and not replay:
+        # Anything that changes the flight has it solved again
+        if event.key in (K_r, K_UP, K_DOWN, K_LEFT, K_RIGHT, K_w, K_s, K_d, K_b):
+            flight = None
+        if event.key == K_c:
+            toggle_recording()
+        elif event.key == K_SPACE:
+            is_paused = not is_paused
+        elif event.key == K_r:
+            # Reset the simulation
+            position[:] = initial_position
+            velocity[:] = initial_velocity
+            previous[:] = state
+            path.clear()
+            salvo.clear()
+            is_paused = False
+            has_landed = False
+        elif event.key == K_UP:
+            velocity[1] += 1  # Increase y velocity
+        elif event.key == K_DOWN:
+            velocity[1] -= 1  # Decrease y velocity
+        elif event.key == K_LEFT:
+            velocity[0] -= 1  # Decrease x velocity
+        elif event.key == K_RIGHT:
+            velocity[0] += 1  # Increase x velocity
+        elif event.key == K_w:
+            velocity[2] += 1  # Increase z velocity
+        elif event.key == K_s:
+            velocity[2] -= 1  # Decrease z velocity
+        elif event.key == K_d:
+            drag_model = drag.MODELS[(drag.MODELS.index(drag_model) + 1) % len(drag.MODELS)]
+        elif event.key == K_b:
+            wind_on = not wind_on
+        elif event.key == K_v:
+            salvo.fire(initial_position, initial_velocity)
+        elif event.key == K_EQUALS:
+            salvo.bigger()
+        elif event.key == K_MINUS:
+            salvo.smaller()
+        elif event.key == K_i:
+            salvo_integrator = integrators.next_after(salvo_integrator)
+        elif event.key == K_LEFTBRACKET:
+            sim_clock.time_scale /= 2  # Slow motion
+        elif event.key == K_RIGHTBRACKET:
+            sim_clock.time_scale *= 2  # Fast forward
+    handle_mouse_events(event)
+
+def update():
+    global has_landed
+    if replay:
+        replay.update()
+        return
+
+    salvo.update(sim_clock.time_scale, is_paused, gravity=gravity, ground=ground_level, integrator=salvo_integrator)
+
+    # Update position and velocity with the steps that are due
+    if flight is None:
+        launch()
+    sim_clock.paused = is_paused or has_landed
+    step = recorder.wrap(flight.step) if recorder else flight.step
+    landed = sim_clock.step(step, state, previous, gravity=gravity, ground=ground_level)
+    if landed is not None:
+        path.append(position)
+
+        # Collision with ground
+        if landed[0]:
+            velocity[:] = 0
+            previous[:] = state
+            has_landed = True
+
+# Drawn at full rate while anything flies or a replay plays, and only on
+# input once the projectile has landed or is paused
+def frame_rate():
+    if replay:
+        return FRAME_RATE if replay.playing and replay.frame < len(replay.recording) - 1 else 0
+    return FRAME_RATE if not is_paused and (not has_landed or salvo.in_flight) else 0
+
+def render():
+    glEnable(GL_DEPTH_TEST)
+    glMatrixMode(GL_PROJECTION)
+    glLoadIdentity()
+    gluPerspective(FIELD_OF_VIEW, (WINDOW_WIDTH / WINDOW_HEIGHT), 0.1, 100.0)
+    glMatrixMode(GL_MODELVIEW)
+    glClear(GL_COLOR_BUFFER_BIT | GL_DEPTH_BUFFER_BIT)
+
+    # Apply camera transformations
+    glLoadIdentity()
+    gluLookAt(0, 0, camera_distance, 0, 0, 0, 0, 1, 0)
+    glRotatef(camera_rot_x, 1, 0, 0)
+    glRotatef(camera_rot_y, 0, 1, 0)
+
+    # Draw axes
+    draw_axes()
+
+    # Draw ground, in the same draw calls as the axes
+    draw_ground()
+    scenery.flush()
+
+    if replay:
+        # The recorded step and the path up to it, sampled from the file
+        shown = replay.record["state"]
+        draw_projectile(shown[0, projectile.POSITION])
+        draw_recorded_path(replay.recording.sample("state", replay.frame)[:, 0, projectile.POSITION])
+        replay.draw(text_renderer)
+    else:
+        shown = state
         # Draw projectile
-        draw_projectile(position)
+        draw_projectile(sim_clock.interpolate(previous, state)[0, projectile.POSITION])
 
         # Draw trajectory
         draw_trajectory(path)
 
-        # Draw velocity components
-        draw_text((10, 770), f"Velocity X: {velocity[0]:.2f}")
-        draw_text((10, 740), f"Velocity Y: {velocity[1]:.2f}")
-        draw_text((10, 710), f"Velocity Z: {velocity[2]:.2f}")
-        draw_text((10, 680), "Use Arrow keys to change X and Y velocity, W/S to change Z velocity")
-        draw_text((10, 650), "Use Mouse to adjust velocity components: Left (X), Middle (Y), Right (Z)")
-        draw_text((10, 620), "Scroll Mouse to Zoom In/Out")
-        draw_text((10, 590), "Press R to Reset")
+        # Every projectile of the salvo in one draw, and all their trails in another
+        glColor3f(1, 0.5, 0)
+        salvo.draw(0.1, camera_distance)
+    shown_velocity = shown[0, projectile.VELOCITY]
 
-        pygame.display.flip()
-        clock.tick(60)  # Cap frame rate at 60 FPS
+    # Draw velocity components
+    draw_text((10, 770), f"Velocity X: {shown_velocity[0]:.2f}")
+    draw_text((10, 740), f"Velocity Y: {shown_velocity[1]:.2f}")
+    draw_text((10, 710), f"Velocity Z: {shown_velocity[2]:.2f}")
+    if recorder:
+        draw_text((10, 500), f"Recording: {recorder.count} steps")
+    draw_text((10, 440), f"Salvo: {salvo.count} ({len(salvo)} fired, {salvo.in_flight} in flight), "
+                         f"{integrators.get(salvo_integrator).label}")
 
-    pygame.quit()
+    if replay or flight is None or flight.impact is None:
+        # Exact drag-free landing point for the shown state
+        landing = projectile.impact_point(shown, gravity, ground_level)[0]
+        draw_text((10, 560), f"Landing point (no drag): X {landing[0]:.2f}, Z {landing[2]:.2f}")
+    else:
+        # Where the solved flight crosses the ground, found inside its last step
+        hit, landing = flight.impact
+        draw_text((10, 560), f"Landing point: X {landing[0]:.4f}, Z {landing[2]:.4f} at {hit:.4f} s")
+    if flight is not None:
+        draw_text((10, 410), f"Drag: {drag_model} (k {DRAG_COEFFICIENTS[drag_model]}), "
+                             f"wind {'on' if wind_on else 'off'} (D and B to change)")
+        draw_text((10, 380), f"RK45: {flight.steps} steps, {flight.rejected} rejected, "
+                             f"{flight.evaluations} evaluations")
+    draw_text((10, 530), f"Time scale: x{sim_clock.time_scale:.2f} ([ and ] to change)")
+    text_renderer.draw_block(help_block)
+    text_renderer.flush()
+
+def main():
+    run_scene(sys.modules[__name__])
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,388 @@
+import importlib.util
+import math
+import os
+import sys
+import threading
+import time
+
+import pygame
+from pygame.locals import *
+from OpenGL.GL import *
+
+from frame_timing import CpuMeter, FrameTimer
+from graphics.text import TextRenderer
+from physics import kernels
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+# Scenes the host can load, under the names the launcher uses
+SCENES = {
+    "Simple Motion": os.path.join(ROOT, "Scripts", "1.py"),
+    "Simple Pendulum": os.path.join(ROOT, "Scripts", "2.py"),
+    "Gravity": os.path.join(ROOT, "Scripts", "3.py"),
+    "Projectile Motion": os.path.join(ROOT, "Scripts", "4.py"),
+    "Projectile Sandbox": os.path.join(ROOT, "samp.py"),
+    "Double Pendulum": os.path.join(ROOT, "Scripts", "5.py"),
+}
+HOST_WINDOW_SIZE = (1200, 800)
+SCENE_KEYS = (K_F1, K_F2, K_F3, K_F4, K_F5, K_F6)
+FRAME_RATE = 60
+IDLE_WAIT_MS = 1000  # longest sleep while every scene is idle
+
+# Frame timing: F8 shows the overlay, F9 starts and stops streaming frame
+# records to CSV and F10 starts and stops a cProfile capture. Timing is
+# only switched on while one of them is in use.
+TIMING_KEY, CSV_KEY, PROFILE_KEY = K_F8, K_F9, K_F10
+TIMING_REFRESH = 30  # frames between overlay updates
+
+# Posted when a scene name arrives on stdin
+COMMAND_EVENT = pygame.USEREVENT + 1
+
+# A scene is a module providing:
+#   WINDOW_SIZE          the window size its layout is written for
+#   init()               create GL resources; called once, with the context current
+#   handle_event(event)  mouse positions arrive in the scene's own window coordinates
+#   update()             advance the simulation
+#   render()             draw one frame, setting up its own projection
+# and optionally:
+#   frame_rate()         frames per second the scene needs right now; 0 when
+#                        nothing it draws changes until the next event.
+#                        Scenes without it are drawn at FRAME_RATE.
+#   close()              release what the scene holds outside the GL context,
+#                        such as worker processes; called once when the host exits
+# A frame is drawn when any scene asks for one, when an event arrives and
+# once more after the scenes go quiet. In between, the host sleeps in
+# pygame.event.wait, so an idle window wakes only for input.
+# The host gives every scene a viewport with the scene's aspect ratio and
+# restores the GL state after it, so scenes can share one context.
+
+_loaded = {}
+
+
+def close_scenes(scenes):
+    for scene in scenes:
+        close = getattr(scene, "close", None)
+        if close:
+            close()
+
+
+# Import a scene module once and initialise it in the current GL context
+def load_scene(name):
+    path = SCENES[name]
+    scene = _loaded.get(path)
+    if scene is None:
+        module_name = "scene_" + os.path.splitext(os.path.basename(path))[0]
+        spec = importlib.util.spec_from_file_location(module_name, path)
+        scene = importlib.util.module_from_spec(spec)
+        sys.modules[module_name] = scene
+        spec.loader.exec_module(scene)
+        scene.init()
+        _loaded[path] = scene
+    return scene
+
+
+class SceneHost:
+    # Runs one or more scenes side by side in a single window
+    def __init__(self, window_size, scenes, switchable=False, timing=False, csv_path=None):
+        self.window_size = window_size
+        self.scenes = list(scenes)
+        self.switchable = switchable
+        self.focus = 0
+        self.running = True
+        self.timer = None
+        self.show_timing = False
+        self.timing_text = None
+        self.timing_lines = []
+        self.cpu = CpuMeter()
+        self.waiting = []  # an event that woke the host, handled next frame
+        if timing:
+            self.toggle_timing()
+        if csv_path:
+            self.toggle_csv(csv_path)
+        self.layout()
+
+    # Split the window into a grid and fit each scene into its cell,
+    # keeping the scene's aspect ratio. Rects are (x, y, w, h) with y up.
+    def layout(self):
+        count = len(self.scenes)
+        cols = math.ceil(math.sqrt(count))
+        rows = math.ceil(count / cols)
+        cell_w = self.window_size[0] / cols
+        cell_h = self.window_size[1] / rows
+        self.rects = []
+        for i, scene in enumerate(self.scenes):
+            col, row = i % cols, i // cols
+            scale = min(cell_w / scene.WINDOW_SIZE[0], cell_h / scene.WINDOW_SIZE[1])
+            w = int(scene.WINDOW_SIZE[0] * scale)
+            h = int(scene.WINDOW_SIZE[1] * scale)
+            x = int(col * cell_w + (cell_w - w) / 2)
+            y = int(self.window_size[1] - (row + 1) * cell_h + (cell_h - h) / 2)
+            self.rects.append((x, y, w, h))
+
+    def show(self, name):
+        scene = load_scene(name)
+        if scene in self.scenes:
+            self.focus = self.scenes.index(scene)
+        else:
+            self.scenes[self.focus] = scene
+            self.layout()
+
+    def scene_at(self, pos):
+        px, py = pos[0], self.window_size[1] - pos[1]
+        for i, (x, y, w, h) in enumerate(self.rects):
+            if x <= px < x + w and y <= py < y + h:
+                return i
+        return None
+
+    # Mouse positions from window pixels to the focused scene's own window
+    def to_scene(self, event):
+        if not hasattr(event, "pos"):
+            return event
+        scene = self.scenes[self.focus]
+        x, y, w, h = self.rects[self.focus]
+        top = self.window_size[1] - (y + h)
+        sx = scene.WINDOW_SIZE[0] / w
+        sy = scene.WINDOW_SIZE[1] / h
+        attributes = dict(event.dict)
+        attributes["pos"] = (int((event.pos[0] - x) * sx), int((event.pos[1] - top) * sy))
+        if "rel" in attributes:
+            attributes["rel"] = (int(event.rel[0] * sx), int(event.rel[1] * sy))
+        return pygame.event.Event(event.type, attributes)
+
+    # The timer exists only while the overlay, CSV or profiler needs it
+    def _update_timer(self):
+        if self.show_timing or (self.timer and (self.timer.recording or self.timer.profiling)):
+            self.timer = self.timer or FrameTimer()
+        elif self.timer:
+            self.timer.close()
+            self.timer = None
+
+    def toggle_timing(self):
+        self.show_timing = not self.show_timing
+        self._update_timer()
+
+    def toggle_csv(self, path=None):
+        self.timer = self.timer or FrameTimer()
+        if self.timer.recording:
+            self.timer.stop_csv()
+            print("Stopped recording frame times")
+        else:
+            path = path or time.strftime("frame_times_%Y%m%d_%H%M%S.csv")
+            self.timer.start_csv(path)
+            print(f"Recording frame times to {path}")
+        self._update_timer()
+
+    def toggle_profile(self):
+        self.timer = self.timer or FrameTimer()
+        if self.timer.profiling:
+            path = time.strftime("profile_%Y%m%d_%H%M%S.prof")
+            print(self.timer.stop_profile(path))
+            print(f"Profile saved to {path}")
+        else:
+            self.timer.start_profile()
+            print("Profiling started")
+        self._update_timer()
+
+    def handle_event(self, event):
+        if event.type == QUIT or (event.type == KEYDOWN and event.key == K_ESCAPE):
+            self.running = False
+            return
+        if event.type == KEYDOWN and event.key in (TIMING_KEY, CSV_KEY, PROFILE_KEY):
+            {TIMING_KEY: self.toggle_timing, CSV_KEY: self.toggle_csv, PROFILE_KEY: self.toggle_profile}[event.key]()
+            return
+        if event.type == COMMAND_EVENT:
+            self.show(event.scene)
+            return
+        if event.type == KEYDOWN and event.key == K_TAB and len(self.scenes) > 1:
+            self.focus = (self.focus + 1) % len(self.scenes)
+            return
+        if self.switchable and event.type == KEYDOWN and event.key in SCENE_KEYS:
+            names = list(SCENES)
+            index = SCENE_KEYS.index(event.key)
+            if index < len(names):
+                self.show(names[index])
+            return
+        if event.type == MOUSEBUTTONDOWN:
+            under = self.scene_at(event.pos)
+            if under is not None:
+                self.focus = under
+        self.scenes[self.focus].handle_event(self.to_scene(event))
+
+    # The highest rate any scene needs
+    def frame_rate(self):
+        return max((getattr(scene, "frame_rate", lambda: FRAME_RATE)() for scene in self.scenes), default=0)
+
+    # Wait for the next frame: the usual frame cap at full rate, and below
+    # it a sleep that input cuts short
+    def pace(self, clock, rate, drawn):
+        if rate >= FRAME_RATE or (drawn and not rate):
+            clock.tick(FRAME_RATE)
+            return
+        timeout = IDLE_WAIT_MS if not rate else max(int(1000 / rate - clock.get_rawtime()), 1)
+        event = pygame.event.wait(timeout)
+        if event.type != NOEVENT:
+            self.waiting.append(event)
+        clock.tick()
+
+    def render(self):
+        glDisable(GL_SCISSOR_TEST)
+        glViewport(0, 0, *self.window_size)
+        glClearColor(0, 0, 0, 1)
+        glClear(GL_COLOR_BUFFER_BIT | GL_DEPTH_BUFFER_BIT)
+        for scene, rect in zip(self.scenes, self.rects):
+            glPushAttrib(GL_ALL_ATTRIB_BITS)
+            glViewport(*rect)
+            glScissor(*rect)
+            glEnable(GL_SCISSOR_TEST)
+            glMatrixMode(GL_PROJECTION)
+            glPushMatrix()
+            glMatrixMode(GL_MODELVIEW)
+            glPushMatrix()
+            scene.render()
+            glMatrixMode(GL_PROJECTION)
+            glPopMatrix()
+            glMatrixMode(GL_MODELVIEW)
+            glPopMatrix()
+            glPopAttrib()
+
+        # Outline the scene that receives input when there is a choice
+        if len(self.scenes) > 1:
+            x, y, w, h = self.rects[self.focus]
+            glMatrixMode(GL_PROJECTION)
+            glLoadIdentity()
+            glOrtho(0, self.window_size[0], 0, self.window_size[1], -1, 1)
+            glMatrixMode(GL_MODELVIEW)
+            glLoadIdentity()
+            glColor3f(0.5, 0.5, 0.5)
+            glBegin(GL_LINE_LOOP)
+            glVertex2f(x + 0.5, y + 0.5)
+            glVertex2f(x + w - 0.5, y + 0.5)
+            glVertex2f(x + w - 0.5, y + h - 0.5)
+            glVertex2f(x + 0.5, y + h - 0.5)
+            glEnd()
+
+        if self.show_timing:
+            self.draw_timing()
+
+    # Rolling p50/p99 per phase in the top right corner
+    def draw_timing(self):
+        if self.timing_text is None:
+            self.timing_text = TextRenderer(self.window_size)
+        if self.timer.count % TIMING_REFRESH == 1 or not self.timing_lines:
+            stats = self.timer.percentiles()
+            self.timing_lines = ["phase      p50 ms   p99 ms"] + [
+                f"{column:<8} {p50:8.2f} {p99:8.2f}" for column, (p50, p99) in stats.items()]
+            self.timing_lines.append(f"cpu {self.cpu.share * 100:5.1f}%  {self.cpu.fps:5.1f} fps")
+            if self.timer.recording:
+                self.timing_lines.append("recording CSV")
+            if self.timer.profiling:
+                self.timing_lines.append("profiling")
+        width = max(self.timing_text.measure(line, size=20)[0] for line in self.timing_lines)
+        for i, line in enumerate(self.timing_lines):
+            self.timing_text.draw(self.window_size[0] - width - 10, self.window_size[1] - 20 - 18 * i,
+                                  line, size=20, color=(1.0, 1.0, 0.3, 1.0))
+        self.timing_text.flush()
+
+    # Frame times exclude the wait for the next frame. With CPU_BENCHMARK
+    # set, the host prints its CPU share and frame rate every second and
+    # quits after that many seconds.
+    def run(self):
+        clock = pygame.time.Clock()
+        # The startup benchmark only needs the time the first frame is shown
+        report_first_frame = bool(os.environ.get("STARTUP_BENCHMARK"))
+        cpu_seconds = float(os.environ.get("CPU_BENCHMARK", 0))
+        active = True  # the first frame is always drawn
+        try:
+            while self.running:
+                timer = self.timer
+                if timer:
+                    timer.begin_frame()
+                    text_ns = TextRenderer.flush_ns
+                events = self.waiting + pygame.event.get()
+                self.waiting = []
+                for event in events:
+                    self.handle_event(event)
+                if timer:
+                    timer.mark("events")
+                for scene in self.scenes:
+                    scene.update()
+                if timer:
+                    timer.mark("update")
+                rate = self.frame_rate()
+                # Draw the frame that shows what the last active one left
+                drawn = bool(events) or rate > 0 or active
+                active = rate > 0
+                if drawn:
+                    self.render()
+                    if timer:
+                        timer.mark("draw")
+                        timer.move("draw", "text", TextRenderer.flush_ns - text_ns)
+                    pygame.display.flip()
+                    if timer:
+                        timer.mark("flip")
+                        timer.end_frame()
+                    if report_first_frame:
+                        print(f"first frame {time.time():.6f}", flush=True)
+                        return
+                if self.cpu.tick(drawn):
+                    # The overlay shows the new reading on the next frame
+                    active = active or self.show_timing
+                    if cpu_seconds:
+                        print(f"cpu {self.cpu.share:.4f} fps {self.cpu.fps:.1f}", flush=True)
+                        self.running = self.cpu.readings < cpu_seconds / self.cpu.period
+                self.pace(clock, rate, drawn)
+        finally:
+            if self.timer:
+                self.timer.close()
+
+
+# Run a single scene module in a window of its own size; --timing on the
+# script's command line starts with the frame timing overlay shown
+def run_scene(scene):
+    print(f"Physics kernels: {kernels.describe()}")
+    pygame.init()
+    pygame.display.set_mode(scene.WINDOW_SIZE, DOUBLEBUF | OPENGL)
+    scene.init()
+    try:
+        SceneHost(scene.WINDOW_SIZE, [scene], timing="--timing" in sys.argv).run()
+    finally:
+        close_scenes([scene])
+        pygame.quit()
+
+
+# Scene names sent one per line on stdin switch the focused viewport,
+# which lets the launcher reuse one running host
+def _read_commands():
+    for line in sys.stdin:
+        name = line.strip()
+        if name in SCENES:
+            pygame.event.post(pygame.event.Event(COMMAND_EVENT, scene=name))
+
+
+def main(argv):
+    csv_path = None
+    if "--csv" in argv:
+        index = argv.index("--csv")
+        csv_path = argv[index + 1]
+        argv = argv[:index] + argv[index + 2:]
+    names = [name for name in argv if name not in ("--stdin", "--timing")] or [next(iter(SCENES))]
+    unknown = [name for name in names if name not in SCENES]
+    if unknown:
+        sys.exit(f"Unknown scene(s): {', '.join(unknown)}. Choose from: {', '.join(SCENES)}")
+    print(f"Physics kernels: {kernels.describe()}")
+    pygame.init()
+    pygame.display.set_mode(HOST_WINDOW_SIZE, DOUBLEBUF | OPENGL)
+    pygame.display.set_caption("Physics Visualization")
+    if "--stdin" in argv:
+        threading.Thread(target=_read_commands, daemon=True).start()
+    try:
+        host = SceneHost(HOST_WINDOW_SIZE, [load_scene(name) for name in names], switchable=True,
+                         timing="--timing" in argv, csv_path=csv_path)
+        host.run()
+    finally:
+        close_scenes(_loaded.values())
+        pygame.quit()
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
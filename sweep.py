@@ -0,0 +1,249 @@
+# Run a simulation model over a grid of parameters on all cores and
+# stream the results to disk as they come in:
+#
+#   python sweep.py range --grid angle=0:90:91 speed=1:30:59 height=0,1,2 --out range.npz
+#   python sweep.py decay --grid damping=0.95:1:51 amplitude=10:170:17 --out decay.csv
+#   python sweep.py bounces --grid gravity=1:20:39 restitution=0.5:0.9:5 --out bounces.csv
+#   python sweep.py range --grid angle=0:90:901 speed=1:30:30 --scaling
+#
+# Grid values are start:stop:count (evenly spaced, both ends included),
+# a comma-separated list or a single value; --set fixes any other model
+# parameter. Every combination is one run. Runs are split into chunks
+# that the worker processes simulate as one vectorized batch each.
+# Running the same command again resumes: chunks already in the output
+# are skipped. .npz output holds one member per chunk (load it with
+# load_results()); .csv output has one row per run.
+import argparse
+import csv
+import inspect
+import io
+import json
+import os
+import sys
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+from physics import kernels
+from physics.sweeps import MODELS, STEP_SETTINGS
+
+META_MEMBER = "sweep.json"
+
+
+def parse_values(text):
+    if ":" in text:
+        start, stop, count = text.split(":")
+        return np.linspace(float(start), float(stop), int(count))
+    return np.array([float(value) for value in text.split(",")])
+
+
+def parse_assignments(items):
+    assignments = {}
+    for item in items:
+        name, _, values = item.partition("=")
+        if not values:
+            raise SystemExit(f"Expected name=values, got {item!r}")
+        assignments[name] = values
+    return assignments
+
+
+class Grid:
+    # The cartesian product of the swept values. Run i has the values at
+    # np.unravel_index(i, shape), so any chunk can be rebuilt from its
+    # index range alone.
+    def __init__(self, values):
+        self.names = list(values)
+        self.values = [values[name] for name in self.names]
+        self.shape = tuple(len(v) for v in self.values)
+        self.size = int(np.prod(self.shape))
+
+    def params(self, start, stop):
+        indices = np.unravel_index(np.arange(start, stop), self.shape)
+        return {name: v[i] for name, v, i in zip(self.names, self.values, indices)}
+
+
+# Worker: simulate one chunk of runs, returning its rows and compute time
+def run_chunk(model_name, grid, fixed, chunk, start, stop):
+    begin = time.perf_counter()
+    params = grid.params(start, stop)
+    outputs = MODELS[model_name](**params, **fixed)
+    columns = {"index": np.arange(start, stop), **params, **outputs}
+    rows = np.empty(stop - start, dtype=[(name, np.asarray(c).dtype) for name, c in columns.items()])
+    for name, column in columns.items():
+        rows[name] = column
+    return chunk, rows, time.perf_counter() - begin
+
+
+class NpzOutput:
+    # One .npy member per finished chunk, appended to a zip archive that is
+    # closed after every chunk so an interruption loses at most that chunk
+    def __init__(self, path, meta):
+        self.path = path
+        if os.path.exists(path):
+            with zipfile.ZipFile(path) as archive:
+                if json.loads(archive.read(META_MEMBER)) != meta:
+                    raise SystemExit(f"{path} holds a different sweep; choose another --out")
+                self.done = {int(name[6:12]) for name in archive.namelist() if name.startswith("chunk_")}
+        else:
+            with zipfile.ZipFile(path, "w") as archive:
+                archive.writestr(META_MEMBER, json.dumps(meta))
+            self.done = set()
+
+    def write(self, chunk, rows):
+        buffer = io.BytesIO()
+        np.save(buffer, rows)
+        with zipfile.ZipFile(self.path, "a", zipfile.ZIP_DEFLATED) as archive:
+            archive.writestr(f"chunk_{chunk:06d}.npy", buffer.getvalue())
+
+    def close(self):
+        pass
+
+
+class CsvOutput:
+    # One row per run with its chunk number. On resume, rows of chunks that
+    # were only partly written are dropped and those chunks run again.
+    def __init__(self, path, meta, chunk_sizes):
+        self.path = path
+        self.header = None
+        self.done = set()
+        if os.path.exists(path):
+            with open(path, newline="") as f:
+                lines = list(csv.reader(f))
+            if not lines or lines[0][:1] != ["# " + json.dumps(meta)]:
+                raise SystemExit(f"{path} holds a different sweep; choose another --out")
+            self.header = lines[1] if len(lines) > 1 else None
+            rows = [row for row in lines[2:] if self.header and len(row) == len(self.header)]
+            counts = {}
+            for row in rows:
+                counts[int(row[0])] = counts.get(int(row[0]), 0) + 1
+            self.done = {chunk for chunk, count in counts.items() if count == chunk_sizes[chunk]}
+            with open(path, "w", newline="") as f:
+                writer = csv.writer(f)
+                writer.writerow(lines[0])
+                if self.header:
+                    writer.writerow(self.header)
+                    writer.writerows(row for row in rows if int(row[0]) in self.done)
+        else:
+            with open(path, "w", newline="") as f:
+                csv.writer(f).writerow(["# " + json.dumps(meta)])
+        self.file = open(path, "a", newline="")
+        self.writer = csv.writer(self.file)
+
+    def write(self, chunk, rows):
+        if self.header is None:
+            self.header = ["chunk", *rows.dtype.names]
+            self.writer.writerow(self.header)
+        self.writer.writerows([chunk, *row.tolist()] for row in rows)
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+
+# All chunks of a .npz sweep as one structured array in run order
+def load_results(path):
+    with zipfile.ZipFile(path) as archive:
+        chunks = [np.load(io.BytesIO(archive.read(name)))
+                  for name in sorted(archive.namelist()) if name.startswith("chunk_")]
+    return np.concatenate(chunks) if chunks else None
+
+
+def run(model_name, grid, fixed, chunks, workers, output=None, progress=True):
+    start = time.perf_counter()
+    busy = 0.0
+    done_runs = 0
+    total_runs = sum(stop - begin for _, begin, stop in chunks)
+    last_report = start
+    # Compiled kernels in every worker share the cores between them
+    threads = max(os.cpu_count() // workers, 1)
+    with ProcessPoolExecutor(workers, initializer=kernels.set_threads, initargs=(threads,)) as pool:
+        futures = [pool.submit(run_chunk, model_name, grid, fixed, chunk, begin, stop)
+                   for chunk, begin, stop in chunks]
+        for future in as_completed(futures):
+            chunk, rows, seconds = future.result()
+            if output:
+                output.write(chunk, rows)
+            busy += seconds
+            done_runs += len(rows)
+            now = time.perf_counter()
+            if progress and now - last_report > 1.0:
+                print(f"  {done_runs}/{total_runs} runs, {done_runs / (now - start):.0f} runs/s", flush=True)
+                last_report = now
+    return done_runs, time.perf_counter() - start, busy
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Multi-core parameter sweeps over the physics models.")
+    parser.add_argument("model", choices=list(MODELS))
+    parser.add_argument("--grid", nargs="+", default=[], metavar="NAME=VALUES", help="swept parameters")
+    parser.add_argument("--set", nargs="+", default=[], metavar="NAME=VALUE", help="fixed parameters")
+    parser.add_argument("--out", help="results file, .npz or .csv")
+    parser.add_argument("--chunk", type=int, default=256, help="runs per chunk")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--scaling", action="store_true",
+                        help="measure runs/s for 1, 2, 4 ... workers instead of writing results")
+    args = parser.parse_args(argv)
+
+    model = MODELS[args.model]
+    known = inspect.signature(model).parameters
+    swept = parse_assignments(args.grid)
+    fixed = {name: float(value) for name, value in parse_assignments(args.set).items()}
+    unknown = [name for name in [*swept, *fixed] if name not in known]
+    if unknown:
+        raise SystemExit(f"{args.model} has no parameter {', '.join(unknown)}; it takes {', '.join(known)}")
+    if not swept:
+        raise SystemExit("Nothing to sweep; give at least one --grid parameter")
+    shared = [name for name in swept if name in STEP_SETTINGS]
+    if shared:
+        raise SystemExit(f"{', '.join(shared)} cannot be swept, since all runs of a chunk share it; use --set")
+
+    grid = Grid({name: parse_values(values) for name, values in swept.items()})
+    chunks = [(i, begin, min(begin + args.chunk, grid.size))
+              for i, begin in enumerate(range(0, grid.size, args.chunk))]
+    print(f"{args.model}: {grid.size} runs over {' x '.join(map(str, grid.shape))} "
+          f"({', '.join(grid.names)}) in {len(chunks)} chunks")
+    print(f"Physics kernels: {kernels.describe()}")
+
+    if args.scaling:
+        # The same chunks with more and more workers
+        sample = chunks[:max(4 * args.workers, 8)]
+        base = None
+        workers = 1
+        while True:
+            runs, wall, _ = run(args.model, grid, fixed, sample, workers, progress=False)
+            rate = runs / wall
+            base = base or rate
+            print(f"{workers:3d} workers: {rate:10.0f} runs/s, speedup {rate / base:5.2f}, "
+                  f"efficiency {rate / base / workers:6.1%}")
+            if workers >= args.workers:
+                break
+            workers = min(workers * 2, args.workers)
+        return 0
+
+    if not args.out:
+        raise SystemExit("Give --out for the results, or --scaling to only measure")
+    meta = {"model": args.model, "grid": swept, "set": fixed, "chunk": args.chunk}
+    if args.out.endswith(".npz"):
+        output = NpzOutput(args.out, meta)
+    elif args.out.endswith(".csv"):
+        output = CsvOutput(args.out, meta, {i: stop - begin for i, begin, stop in chunks})
+    else:
+        raise SystemExit("--out must end in .npz or .csv")
+    todo = [chunk for chunk in chunks if chunk[0] not in output.done]
+    if len(todo) < len(chunks):
+        print(f"Resuming: {len(chunks) - len(todo)} of {len(chunks)} chunks already done")
+    try:
+        runs, wall, busy = run(args.model, grid, fixed, todo, args.workers, output)
+    finally:
+        output.close()
+    if runs:
+        # Speedup is worker compute time over wall time
+        print(f"{runs} runs in {wall:.2f} s: {runs / wall:.0f} runs/s on {args.workers} workers, "
+              f"speedup {busy / wall:.2f}, efficiency {busy / wall / args.workers:.1%}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,6 @@
+import os
+import sys
+
+# The tests import the physics and graphics packages from the repository root
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
@@ -0,0 +1,49 @@
+import numpy as np
+import pytest
+
+from physics.analytics import SlidingSpectrum
+
+
+def fed(spectrum, samples):
+    for x in samples.T:
+        spectrum.update(x)
+    return spectrum
+
+
+# After every hop the bins are the FFT of the window's samples, oldest first
+@pytest.mark.parametrize("total", [64, 256, 1000, 5000])
+def test_bins_match_rfft_of_the_window(total):
+    samples = np.random.default_rng(total).standard_normal((3, total))
+    spectrum = fed(SlidingSpectrum(3, 0.01, window=512, hop=64), samples)
+    done = total // 64 * 64
+    window = np.zeros((3, 512))
+    last = samples[:, max(done - 512, 0):done]
+    window[:, 512 - last.shape[1]:] = last
+    np.testing.assert_allclose(spectrum.bins, np.fft.rfft(window, axis=1), atol=1e-9)
+
+
+# The taper applied to the bins is a periodic Hann window on the samples
+def test_magnitudes_match_hann_window():
+    samples = np.random.default_rng(0).standard_normal((2, 1024))
+    spectrum = fed(SlidingSpectrum(2, 0.01, window=1024, hop=128), samples)
+    hann = 0.5 - 0.5 * np.cos(2 * np.pi * np.arange(1024) / 1024)
+    expected = np.abs(np.fft.rfft(samples * hann, axis=1))
+    np.testing.assert_allclose(spectrum.magnitudes[:, 1:-1], expected[:, 1:-1], atol=1e-9)
+
+
+def test_peak_frequency_of_sines():
+    dt, frequencies = 0.005, np.array([0.7, 3.3, 12.1])
+    t = np.arange(5000) * dt
+    samples = np.sin(2 * np.pi * frequencies[:, None] * t + 0.3)
+    spectrum = SlidingSpectrum(3, dt, window=2048, hop=256)
+    fed(spectrum, samples[:, :2000])
+    assert np.isnan(spectrum.peak_frequency()).all()
+    fed(spectrum, samples[:, 2000:])
+    np.testing.assert_allclose(spectrum.peak_frequency(), frequencies, rtol=0.02)
+
+
+def test_reset_forgets_samples():
+    spectrum = fed(SlidingSpectrum(1, 0.01, window=128, hop=32), np.ones((1, 300)))
+    spectrum.reset()
+    fed(spectrum, np.zeros((1, 128)))
+    np.testing.assert_array_equal(spectrum.bins, 0)
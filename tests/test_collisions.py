@@ -0,0 +1,72 @@
+import numpy as np
+import pytest
+
+from physics import collisions
+
+BOUNDS = (-1.0, 1.0, -1.0, 1.0)
+
+
+# Every pair closer than the broad phase's cell size, by testing them all
+def brute_force_pairs(position, reach):
+    i, j = np.triu_indices(len(position), k=1)
+    close = np.linalg.norm(position[i] - position[j], axis=1) < reach
+    return set(zip(i[close].tolist(), j[close].tolist()))
+
+
+def candidate_pairs(position, radius, bounds=BOUNDS):
+    first, second = collisions.broad_phase(position, radius, bounds)
+    pairs = [(min(a, b), max(a, b)) for a, b in zip(first.tolist(), second.tolist())]
+    assert all(a != b for a, b in pairs)
+    assert len(set(pairs)) == len(pairs), "a pair came up twice"
+    return set(pairs)
+
+
+@pytest.mark.parametrize("n, radius", [(2, 0.3), (50, 0.05), (2000, 0.01), (3000, 0.002)])
+def test_finds_every_close_pair(n, radius):
+    position = np.random.default_rng(n).uniform(-1, 1, (n, 2))
+    assert brute_force_pairs(position, 2 * radius) <= candidate_pairs(position, radius)
+
+
+# Balls of several sizes, some of them outside the box, which count in its
+# edge cells
+def test_mixed_radii_and_balls_outside_bounds():
+    rng = np.random.default_rng(1)
+    position = rng.uniform(-1.2, 1.2, (1500, 2))
+    radius = rng.uniform(0.005, 0.03, 1500)
+    candidates = candidate_pairs(position, radius)
+    i, j = np.triu_indices(len(position), k=1)
+    touching = np.linalg.norm(position[i] - position[j], axis=1) < radius[i] + radius[j]
+    assert set(zip(i[touching].tolist(), j[touching].tolist())) <= candidates
+
+
+# A settled pile, where most balls touch several others
+def test_settled_pile():
+    state = collisions.fill(1000, 0.02, BOUNDS)
+    collisions.step(state, 0.005, 200, radius=0.02, bounds=BOUNDS)
+    position = state[:, collisions.POSITION]
+    close = brute_force_pairs(position, 0.04)
+    assert len(close) > 1000
+    assert close <= candidate_pairs(position, 0.02)
+
+
+# Far apart balls are never paired up
+def test_candidates_are_neighbours():
+    position = np.random.default_rng(2).uniform(-1, 1, (2000, 2))
+    radius = 0.01
+    for a, b in candidate_pairs(position, radius):
+        assert np.all(np.abs(position[a] - position[b]) < 2 * (2 * radius))
+
+
+# The grid is widened by the margin, so every pair that step() treats as
+# near comes up, however the radii vary
+def test_margin_finds_every_near_pair():
+    rng = np.random.default_rng(3)
+    position = rng.uniform(-1, 1, (2000, 2))
+    radius = rng.uniform(0.005, 0.015, 2000)
+    margin = collisions.NEAR_MARGIN
+    first, second = collisions.broad_phase(position, radius, BOUNDS, margin)
+    candidates = {(min(a, b), max(a, b)) for a, b in zip(first.tolist(), second.tolist())}
+    i, j = np.triu_indices(len(position), k=1)
+    near = np.linalg.norm(position[i] - position[j], axis=1) < (radius[i] + radius[j]) * (1 + margin)
+    assert set(zip(i[near].tolist(), j[near].tolist())) <= candidates
+    assert len(candidates) == len(first)
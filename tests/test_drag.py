@@ -0,0 +1,70 @@
+import numpy as np
+import pytest
+
+from physics import drag, projectile
+
+
+def launch(height, speed, angle, heading=0.0):
+    velocity = projectile.launch_velocity(speed, angle)
+    heading = np.radians(heading)
+    velocity = np.array([velocity[0] * np.cos(heading), velocity[1], velocity[0] * np.sin(heading)])
+    return np.r_[0.0, height, 0.0, velocity]
+
+
+@pytest.mark.parametrize("height, speed, angle", [
+    (0.0, 10.0, 45.0), (0.0, 30.0, 80.0), (5.0, 12.0, 0.0), (50.0, 20.0, -30.0), (1.0, 0.5, 10.0)])
+def test_ground_event_matches_drag_free_flight(height, speed, angle):
+    y0 = launch(height, speed, angle, heading=30.0)
+    trajectory = drag.solve(y0, model="none")
+    assert trajectory.impact is not None
+    time, state = trajectory.impact
+    expected = projectile.impact_time(y0[None, :])[0]
+    point = projectile.impact_point(y0[None, :])[0]
+    assert time == pytest.approx(expected, rel=1e-9, abs=1e-9)
+    np.testing.assert_allclose(state[:3], point, rtol=1e-9, atol=1e-9)
+    np.testing.assert_allclose(state[3:], y0[3:] + projectile.GRAVITY * expected, rtol=1e-9, atol=1e-9)
+    assert trajectory.end == time
+
+
+# A drag-free flight is a parabola, which the solver's steps and the cubic
+# between them follow exactly
+def test_trajectory_between_steps_is_the_parabola():
+    y0 = launch(2.0, 15.0, 60.0)
+    trajectory = drag.solve(y0, model="none")
+    for t in np.linspace(0.0, trajectory.end, 37):
+        expected = y0[:3] + y0[3:] * t + 0.5 * projectile.GRAVITY * t * t
+        np.testing.assert_allclose(trajectory.at(t)[:3], expected, atol=1e-9)
+
+
+# Linear drag in a wind also has a closed form: the velocity relaxes
+# towards the wind plus the terminal fall speed at rate k
+def test_linear_drag_matches_closed_form():
+    k, wind = 0.3, np.array([2.0, 0.0, -1.0])
+    y0 = launch(1.0, 25.0, 40.0)
+    terminal = wind + projectile.GRAVITY / k
+
+    def position(t):
+        return y0[:3] + terminal * t + (y0[3:] - terminal) * (1 - np.exp(-k * t)) / k
+
+    trajectory = drag.solve(y0, model="linear", k=k, wind=wind, rtol=1e-9, atol=1e-12)
+    lo, hi = 0.0, 2 * trajectory.end  # bisect the closed form's own landing time
+    for _ in range(100):
+        mid = (lo + hi) / 2
+        lo, hi = (mid, hi) if position(mid)[1] > 0 else (lo, mid)
+    time, state = trajectory.impact
+    assert time == pytest.approx(lo, rel=1e-8)
+    np.testing.assert_allclose(state[:3], position(lo), atol=1e-7)
+    for t in np.linspace(0.0, time, 11):
+        np.testing.assert_allclose(trajectory.at(t)[:3], position(t), atol=1e-5)
+
+
+def test_body_on_the_ground_moving_down_does_not_fly():
+    trajectory = drag.solve(launch(0.0, 5.0, -20.0), model="quadratic", k=0.1)
+    assert trajectory.impact[0] == 0.0
+    assert trajectory.steps == 0
+
+
+def test_flight_that_never_lands_stops_at_t_max():
+    trajectory = drag.solve(launch(10.0, 5.0, 30.0), gravity=(0.0, 0.0, 0.0), model="none", t_max=3.0)
+    assert trajectory.impact is None
+    assert trajectory.end == pytest.approx(3.0)
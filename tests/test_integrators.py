@@ -0,0 +1,76 @@
+import numpy as np
+import pytest
+
+from physics import integrators
+
+
+# A batch of harmonic oscillators, a = -omega^2 q, run for a fixed time;
+# returns the largest error against the exact solution and the number of
+# acceleration evaluations
+def oscillator_error(step, n_steps, duration=2.0):
+    omega = np.array([0.5, 1.0, 2.0])
+    q, v = np.ones(3), np.zeros(3)
+    calls = [0]
+
+    def acceleration(q, v):
+        calls[0] += 1
+        return -omega * omega * q
+
+    for _ in range(n_steps):
+        step(q, v, duration / n_steps, acceleration)
+    exact = np.cos(omega * duration)
+    return np.max(np.abs(q - exact)), calls[0]
+
+
+@pytest.mark.parametrize("name", integrators.INTEGRATORS)
+def test_convergence_order(name):
+    integrator = integrators.get(name)
+    errors = [oscillator_error(integrator.step, n)[0] for n in (40, 80, 160, 320)]
+    orders = np.log2(np.array(errors[:-1]) / np.array(errors[1:]))
+    np.testing.assert_allclose(orders, integrator.order, atol=0.15)
+
+
+@pytest.mark.parametrize("name", integrators.INTEGRATORS)
+def test_evaluations_per_step(name):
+    integrator = integrators.get(name)
+    assert oscillator_error(integrator.step, 10)[1] == 10 * integrator.evaluations
+
+
+# Energy of an oscillator after many periods, from 0.5 at the start
+def energy_after_long_run(name):
+    q, v = np.ones(1), np.zeros(1)
+    for _ in range(20000):
+        integrators.get(name).step(q, v, 0.05, lambda q, v: -q)
+    return 0.5 * (q[0] ** 2 + v[0] ** 2)
+
+
+# Symplectic schemes keep it bounded, where explicit Euler's grows without end
+@pytest.mark.parametrize("name", [name for name, integrator in integrators.INTEGRATORS.items()
+                                  if integrator.symplectic])
+def test_symplectic_energy_stays_bounded(name):
+    assert abs(energy_after_long_run(name) - 0.5) < 0.05
+
+
+def test_euler_energy_grows():
+    assert energy_after_long_run("euler") > 1.0
+
+
+def test_unknown_name():
+    with pytest.raises(ValueError, match="unknown integrator"):
+        integrators.get("verlet")
+
+
+def test_next_after_cycles_through_all():
+    name, seen = "euler", []
+    for _ in integrators.INTEGRATORS:
+        seen.append(name)
+        name = integrators.next_after(name)
+    assert name == "euler"
+    assert sorted(seen) == sorted(integrators.INTEGRATORS)
+
+
+def test_configured_reads_environment(monkeypatch):
+    monkeypatch.setenv("PHYSICS_INTEGRATOR", "rk4")
+    assert integrators.configured("leapfrog") == "rk4"
+    monkeypatch.delenv("PHYSICS_INTEGRATOR")
+    assert integrators.configured("leapfrog") == "leapfrog"
@@ -0,0 +1,48 @@
+import numpy as np
+import pytest
+
+from physics import nbody
+
+
+# Largest error of the tree's accelerations relative to the typical
+# acceleration from the direct sum
+def tree_error(state, theta):
+    position, mass = state[:, nbody.POSITION], state[:, nbody.MASS]
+    direct = nbody.direct_accelerations(position, mass)
+    tree = nbody.tree_accelerations(position, mass, theta=theta)
+    return np.max(np.linalg.norm(tree - direct, axis=1)) / np.median(np.linalg.norm(direct, axis=1))
+
+
+@pytest.mark.parametrize("n", [2, 9, 500, 3000])
+def test_tree_matches_direct_sum_at_small_theta(n):
+    assert tree_error(nbody.galaxy(n), theta=0.05) < 1e-3
+
+
+def test_tree_error_shrinks_with_theta():
+    state = nbody.galaxy(2000)
+    errors = [tree_error(state, theta) for theta in (0.5, 0.2, 0.05, 0.01)]
+    assert errors == sorted(errors, reverse=True)
+    assert errors[-1] < 1e-6
+
+
+# A clump of bodies at one point fills the tree to its deepest level, and
+# is a heavy node no bigger than a point next to groups of ordinary size
+def test_tree_handles_coincident_bodies():
+    rng = np.random.default_rng(0)
+    x, y = rng.uniform(-1, 1, 300), rng.uniform(-1, 1, 300)
+    x[:40], y[:40] = 0.25, -0.5
+    state = nbody.initial_state(x, y, mass=rng.uniform(0.5, 1.5, 300))
+    assert tree_error(state, theta=0.05) < 1e-3
+
+
+def test_direct_sum_of_a_pair():
+    state = nbody.initial_state([0.0, 2.0], [0.0, 0.0], mass=[3.0, 1.0])
+    acceleration = nbody.direct_accelerations(state[:, nbody.POSITION], state[:, nbody.MASS], G=2.0, softening=1e-9)
+    np.testing.assert_allclose(acceleration, [[0.5, 0.0], [-1.5, 0.0]])
+
+
+def test_tree_steps_follow_direct_steps():
+    tree, direct = nbody.galaxy(400), nbody.galaxy(400)
+    nbody.step(tree, 1e-3, 50, theta=0.05)
+    nbody.step(direct, 1e-3, 50, method="direct")
+    np.testing.assert_allclose(tree[:, nbody.POSITION], direct[:, nbody.POSITION], atol=1e-6)
@@ -0,0 +1,42 @@
+import numpy as np
+import pytest
+
+from physics import bounce, motion, pendulum, projectile
+
+# Each model with a batch of bodies and the parameters of its step
+MODELS = {
+    "motion": (lambda rng: motion.initial_state(rng.uniform(-1, 1, 20), rng.uniform(0, 2, 20), rng.uniform(-1, 1, 20)),
+               motion.step, {"reset_on_wrap": True}),
+    "pendulum": (lambda rng: pendulum.initial_state(rng.uniform(-3, 3, 20), rng.uniform(-1, 1, 20)),
+                 pendulum.step, {"gravity": 9.81, "damping": 0.999}),
+    "bounce": (lambda rng: bounce.initial_state(rng.uniform(-1, 1, 20), rng.uniform(-1, 1, 20),
+                                                rng.uniform(-1, 1, 20), rng.uniform(-1, 1, 20)),
+               bounce.step, {}),
+    "projectile": (lambda rng: projectile.salvo((0.0, 1.0, 0.0), (5.0, 8.0, 0.0), 20, rng=rng),
+                   projectile.step, {}),
+}
+
+
+# Taking n steps in one call is the same as taking them one at a time
+@pytest.mark.parametrize("model", MODELS)
+def test_n_steps_match_single_steps(model):
+    make, step, params = MODELS[model]
+    state = make(np.random.default_rng(0))
+    batched, single = state.copy(), state.copy()
+    step(batched, 0.01, 150, **params)
+    for _ in range(150):
+        step(single, 0.01, 1, **params)
+    np.testing.assert_allclose(batched, single, rtol=0, atol=1e-12)
+
+
+# A body in a batch moves exactly as it does on its own
+@pytest.mark.parametrize("model", MODELS)
+def test_batch_matches_bodies_alone(model):
+    make, step, params = MODELS[model]
+    state = make(np.random.default_rng(1))
+    batch = state.copy()
+    step(batch, 0.01, 150, **params)
+    for row, expected in zip(state, batch):
+        alone = row[None, :].copy()
+        step(alone, 0.01, 150, **params)
+        np.testing.assert_allclose(alone[0], expected, rtol=0, atol=1e-12)
@@ -0,0 +1,80 @@
+import numpy as np
+import pytest
+
+from graphics.plot import Series
+
+
+# (level, slot, first sample, stop) of every bucket that holds only
+# samples still in the ring, the newest one possibly not yet full
+def live_buckets(series):
+    for k in range(1, len(series.lows)):
+        for bucket in range(-(-series.first >> k), ((series.count - 1) >> k) + 1):
+            yield k, bucket & ((series.capacity >> k) - 1), bucket << k, min((bucket + 1) << k, series.count)
+
+
+def assert_same_pyramid(series, other):
+    assert (series.count, series.first) == (other.count, other.first)
+    for k, slot, _, _ in live_buckets(series):
+        assert series.lows[k][slot] == other.lows[k][slot]
+        assert series.highs[k][slot] == other.highs[k][slot]
+
+
+# Every bucket holds the lowest and highest of its samples
+def assert_pyramid_matches_samples(series, history):
+    for k, slot, start, stop in live_buckets(series):
+        values = np.float32(history[start:stop])
+        assert series.lows[k][slot] == values.min()
+        assert series.highs[k][slot] == values.max()
+
+
+@pytest.mark.parametrize("capacity, total", [(64, 50), (64, 64), (64, 1000), (1024, 5000)])
+def test_extend_matches_append(capacity, total):
+    rng = np.random.default_rng(total)
+    history = np.cumsum(rng.standard_normal(total))
+    appended, extended, chunked = Series(capacity), Series(capacity), Series(capacity)
+    for value in history:
+        appended.append(value)
+    extended.extend(history)
+    start = 0
+    while start < total:
+        stop = start + int(rng.integers(1, 3 * capacity))
+        chunked.extend(history[start:stop])
+        start = stop
+    assert_same_pyramid(appended, extended)
+    assert_same_pyramid(appended, chunked)
+    assert_pyramid_matches_samples(appended, history)
+    np.testing.assert_array_equal(appended.samples, extended.samples)
+
+
+# A history with long flat stretches, where append stops early at the
+# first level its value does not widen
+def test_append_on_plateaus():
+    history = np.repeat(np.random.default_rng(0).integers(-3, 3, 300), 7).astype(float)
+    appended, extended = Series(256), Series(256)
+    for value in history:
+        appended.append(value)
+    extended.extend(history)
+    assert_same_pyramid(appended, extended)
+    assert_pyramid_matches_samples(appended, history)
+
+
+def test_clear_starts_again():
+    series = Series(64)
+    series.extend(np.arange(100.0))
+    series.clear()
+    series.extend([5.0, -1.0, 2.0])
+    assert len(series) == 3
+    assert_pyramid_matches_samples(series, [5.0, -1.0, 2.0])
+
+
+# However the window is drawn, its columns span exactly the samples in it
+@pytest.mark.parametrize("width", [7, 100, 5000])
+def test_columns_cover_the_window(width):
+    history = np.sin(np.arange(4096) * 0.01) + np.random.default_rng(width).standard_normal(4096) * 0.1
+    series = Series(4096)
+    series.extend(history)
+    x, low, high = series.columns(0, 4096, width)
+    assert np.all(np.diff(x) > 0) and x[0] >= 0 and x[-1] < width
+    assert low.min() == np.float32(history).min()
+    assert high.max() == np.float32(history).max()
+    assert np.all(low <= high)
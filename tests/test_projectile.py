@@ -0,0 +1,83 @@
+import numpy as np
+
+from physics import projectile
+
+DT = 1e-4
+
+
+# Launch heights, speeds and angles for a grid of flights, as flat arrays
+def launches():
+    height, speed, angle = np.meshgrid([0.0, 1.0, 20.0], [3.0, 15.0, 40.0], [-30.0, 0.0, 20.0, 45.0, 80.0],
+                                       indexing="ij")
+    keep = (height > 0) | (angle > 0)  # launched down from the ground, a flight never starts
+    return height[keep], speed[keep], angle[keep]
+
+
+def launch_states(height, speed, angle):
+    velocity = np.stack([projectile.launch_velocity(s, a) for s, a in zip(speed, angle)])
+    return projectile.initial_state(np.stack([np.zeros_like(height), height, np.zeros_like(height)], axis=1),
+                                    velocity)
+
+
+# Step every flight with leapfrog, which is exact under constant gravity,
+# and note the step after which each one is on the ground
+def stepped_landings(state):
+    state = state.copy()
+    steps = np.zeros(len(state), dtype=int)
+    apex = state[:, 1].copy()
+    for n in range(1, 200000):
+        landed = projectile.step(state, DT, integrator="leapfrog")
+        apex = np.maximum(apex, state[:, 1])
+        steps[~landed] = n + 1
+        if landed.all():
+            break
+    return state, steps * DT, apex
+
+
+def test_flight_matches_stepped_flight():
+    height, speed, angle = launches()
+    state, time, apex = stepped_landings(launch_states(height, speed, angle))
+    flight = projectile.flight(height, speed, angle)
+    # Landing is checked after each step, so it is found up to a step late
+    assert np.all(flight.time <= time + 1e-9)
+    assert np.all(flight.time > time - DT - 1e-9)
+    np.testing.assert_allclose(flight.range, state[:, 0], atol=speed.max() * DT)
+    np.testing.assert_allclose(flight.apex, apex, atol=speed.max() * DT)
+
+
+def test_flight_broadcasts_grids():
+    speeds, angles = np.array([5.0, 10.0, 20.0]), np.array([15.0, 45.0])
+    grid = projectile.flight(2.0, speeds[None, :], angles[:, None])
+    assert grid.range.shape == (2, 3)
+    for i, angle in enumerate(angles):
+        for j, speed in enumerate(speeds):
+            assert grid.range[i, j] == projectile.flight(2.0, speed, angle).range
+
+
+def test_flight_that_never_lands_is_nan():
+    assert np.isnan(projectile.flight(-1.0, 1.0, 10.0).time)
+
+
+def test_impact_matches_flight():
+    height, speed, angle = launches()
+    state = launch_states(height, speed, angle)
+    flight = projectile.flight(height, speed, angle)
+    np.testing.assert_allclose(projectile.impact_time(state), flight.time, rtol=1e-12)
+    point = projectile.impact_point(state)
+    np.testing.assert_allclose(point[:, 0], flight.range, rtol=1e-12, atol=1e-12)
+    np.testing.assert_allclose(point[:, 1], 0.0, atol=1e-9)
+    np.testing.assert_allclose(point[:, 2], 0.0)
+
+
+# Away from the launch, under another gravity and ground: the impact point
+# is where a stepped body comes down
+def test_impact_point_matches_stepped_body():
+    gravity, ground = np.array([0.5, -3.0, -0.2]), -2.0
+    state = projectile.salvo((1.0, 4.0, -1.0), (3.0, 5.0, 2.0), 10, rng=np.random.default_rng(0))
+    point = projectile.impact_point(state, gravity, ground)
+    time = projectile.impact_time(state, gravity, ground)
+    stepped = state.copy()
+    for _ in range(int(time.max() / DT) + 2):
+        projectile.step(stepped, DT, gravity=gravity, ground=ground, integrator="leapfrog")
+    assert projectile.landed(stepped, ground).all()
+    np.testing.assert_allclose(stepped[:, projectile.POSITION], point, atol=20 * DT)
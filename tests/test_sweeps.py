@@ -0,0 +1,33 @@
+import numpy as np
+import pytest
+
+from physics import sweeps
+
+
+# Durations too short for a single step leave every run as it was released
+@pytest.mark.parametrize("duration", [0.0, 1e-3])
+def test_pendulum_decay_without_steps(duration):
+    result = sweeps.pendulum_decay(amplitude=[10.0, 45.0], duration=duration)
+    np.testing.assert_allclose(result["final_amplitude"], [10.0, 45.0])
+    assert np.isnan(result["half_life"]).all()
+    np.testing.assert_array_equal(result["swings"], 0)
+
+
+def test_bounce_count_without_steps():
+    result = sweeps.bounce_count(restitution=[0.5, 0.9], duration=0.0)
+    np.testing.assert_array_equal(result["bounces"], 0)
+
+
+# Runs are sized from every parameter, not only the first
+def test_runs_from_any_parameter():
+    assert len(sweeps.projectile_range(speed=[5.0, 10.0, 15.0])["range"]) == 3
+    assert len(sweeps.pendulum_decay(amplitude=[10.0, 20.0], duration=1.0)["swings"]) == 2
+    assert len(sweeps.bounce_count(gravity=[9.8, 1.6], duration=1.0)["bounces"]) == 2
+
+
+def test_pendulum_decay_matches_single_runs():
+    together = sweeps.pendulum_decay(amplitude=[10.0, 60.0], damping=[0.99, 0.999], duration=20.0)
+    for i, (amplitude, damping) in enumerate([(10.0, 0.99), (60.0, 0.999)]):
+        alone = sweeps.pendulum_decay(amplitude=amplitude, damping=damping, duration=20.0)
+        for name, values in together.items():
+            np.testing.assert_allclose(values[i], alone[name][0])
@@ -0,0 +1,38 @@
+import numpy as np
+
+from graphics.trails import TrailBuffer
+
+
+# Points round a circle, which no tolerance can reduce to a straight line
+def circle(n, turns=3.0):
+    angle = np.linspace(0.0, 2 * np.pi * turns, n)
+    return np.stack([np.cos(angle), np.sin(angle), angle * 0.01], axis=1).astype(np.float32)
+
+
+def test_decimation_keeps_first_and_last_points():
+    trail = TrailBuffer(capacity=64, simplify=True, tolerance=1e-6)
+    points = circle(2000)
+    for count in (63, 64, 65, 200, 2000):  # decimations with odd and even fills
+        trail.clear()
+        trail.extend(points[:count])
+        assert len(trail) <= trail.capacity
+        np.testing.assert_array_equal(trail.points()[0], points[0])
+        np.testing.assert_array_equal(trail.points()[-1], points[count - 1])
+
+
+def test_decimation_keeps_points_in_order():
+    trail = TrailBuffer(capacity=32, simplify=True, tolerance=1e-6)
+    points = circle(1000)
+    trail.extend(points)
+    kept = trail.points()
+    index = [int(np.flatnonzero((points == point).all(axis=1))[0]) for point in kept]
+    assert index == sorted(index)
+    assert index[0] == 0 and index[-1] == len(points) - 1
+
+
+def test_without_simplify_the_oldest_points_go():
+    trail = TrailBuffer(capacity=16)
+    points = circle(40)
+    trail.extend(points[:30])
+    trail.extend(points[30:])
+    np.testing.assert_array_equal(trail.points(), points[-16:])